@@ -174,6 +174,13 @@ def configureCeleryApp(app, workerConfig: PeekFileConfigWorkerMixin,
             worker_concurrency=workerConfig.celeryWorkerCount,
         )
 
+        # Apply prefetch changes made to config.json, for the consumers created after
+        # the change. This only happens if the service has started the config watcher.
+        workerConfig.subscribe(
+            'celeryTaskPrefetch',
+            lambda oldValue, newValue:
+            app.conf.update(worker_prefetch_multiplier=newValue))
+
         if workerConfig.celeryReplaceWorkerAfterTaskCount:
             app.conf.update(
                 # The number of tasks a worker will process before it's replaced
@@ -1,11 +1,39 @@
+import hashlib
+import inspect
 import logging
 
 import os
 from abc import ABCMeta, abstractmethod
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def _classCodeHash(cls) -> str:
+    """ Class Code Hash
+
+    :return: A hash of the source files of the class and its base classes, or the
+        module files they were loaded from.
+
+    """
+    hash_ = hashlib.sha256()
+
+    for baseCls in cls.__mro__:
+        if baseCls is object:
+            continue
+
+        try:
+            with open(inspect.getfile(baseCls), 'rb') as f:
+                hash_.update(f.read())
+
+        except (TypeError, OSError):
+            # Builtin or missing module files, fall back to the class name
+            hash_.update(baseCls.__qualname__.encode())
+
+    return hash_.hexdigest()[:16]
+
+
 class BuilderABC(metaclass=ABCMeta):
 
     def _writeFileIfRequired(self, dir, fileName, contents):
@@ -37,6 +65,19 @@ class BuilderABC(metaclass=ABCMeta):
         """
         pass
 
+    @property
+    def _syncFileHookVersion(self) -> str:
+        """ Sync File Hook Version
+
+        Identifies what _syncFileHook does, files that were synced with a different
+        version are synced again, see FrontendFileSyncIndex
+
+        The version is a hash of the code of this builder class and its base classes,
+        so any change to the hook, or the code it calls in those modules, changes it.
+
+        """
+        return '%s %s' % (self.__class__.__name__, _classCodeHash(self.__class__))
+
     def _recompileRequiredCheck(self, feBuildDir: str, hashFileName: str) -> bool:
         """ Recompile Check
 
@@ -50,7 +91,7 @@ class BuilderABC(metaclass=ABCMeta):
 
         """
 
-        excludeFilesEndWith = (".git", ".idea", '.lastHash')
+        excludeFilesEndWith = (".git", ".idea", '.lastHash', '.peekSyncIndex')
         excludeFilesStartWith = ()
 
         def dirCheck(path):
@@ -0,0 +1,44 @@
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+MODULE_NAME = 'peek_builder_hook_test'
+
+BUILDER = '''
+from peek_platform.build_common.BuilderABC import BuilderABC
+
+
+class TestBuilder(BuilderABC):
+    def _syncFileHook(self, fileName, contents):
+        return contents%s
+'''
+
+
+class BuilderABCTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        sys.path.insert(0, self._dir)
+
+    def tearDown(self):
+        sys.path.remove(self._dir)
+        sys.modules.pop(MODULE_NAME, None)
+        shutil.rmtree(self._dir)
+
+    def _hookVersion(self, hookSuffix: str) -> str:
+        with open(os.path.join(self._dir, MODULE_NAME + '.py'), 'w') as f:
+            f.write(BUILDER % hookSuffix)
+
+        sys.modules.pop(MODULE_NAME, None)
+        importlib.invalidate_caches()
+        return importlib.import_module(MODULE_NAME).TestBuilder()._syncFileHookVersion
+
+    def testHookVersionFollowsTheHookCode(self):
+        version = self._hookVersion('')
+        self.assertTrue(version.startswith('TestBuilder '))
+
+        self.assertEqual(self._hookVersion(''), version)
+        self.assertNotEqual(self._hookVersion(".replace(b'a', b'b')"), version)
@@ -82,7 +82,8 @@ class DocBuilderABC(BuilderABC):
         if not os.path.isdir(docProjectDir):
             raise Exception("%s doesn't exist" % docProjectDir)
 
-        self.fileSync = FrontendFileSync(lambda f, c: self._syncFileHook(f, c))
+        self.fileSync = FrontendFileSync(lambda f, c: self._syncFileHook(f, c),
+                                         self._syncFileHookVersion)
         self._dirSyncMap = list()
 
     def _loadPluginConfigs(self) -> [PluginDocDetail]:
@@ -93,10 +93,18 @@ class FrontendBuilderABC(BuilderABC):
         if not os.path.isdir(frontendProjectDir):
             raise Exception("% doesn't exist" % frontendProjectDir)
 
-        self.fileSync = FrontendFileSync(lambda f, c: self._syncFileHook(f, c))
+        self.fileSync = FrontendFileSync(lambda f, c: self._syncFileHook(f, c),
+                                         self._syncFileHookVersion,
+                                         self._jsonCfg.feSyncFilesThreadCount,
+                                         self._jsonCfg.feSyncFilesQuietSeconds)
         self._dirSyncMap = list()
         self._fileWatchdogObserver = None
 
+    @property
+    def _syncFileHookVersion(self) -> str:
+        # The web builders hook depends on the build type
+        return '%s %s' % (BuilderABC._syncFileHookVersion.fget(self), self._buildType)
+
     def _loadPluginConfigs(self) -> [PluginDetail]:
         pluginDetails = []
 
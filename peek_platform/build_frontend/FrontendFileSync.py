@@ -2,13 +2,21 @@ import logging
 import os
 import re
 import shutil
+import threading
+import time
 from collections import namedtuple
-from typing import Callable, Optional, List, Dict, Set
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, List, Dict, Set, Tuple, Pattern
 
 from twisted.internet import reactor
+from twisted.internet.threads import deferToThread
+from vortex.DeferUtil import vortexLogFailure
 from watchdog.events import FileSystemEventHandler, FileMovedEvent, FileModifiedEvent, \
     FileDeletedEvent, FileCreatedEvent
 
+from peek_platform.build_frontend.FrontendFileSyncIndex import FrontendFileSyncIndex, \
+    contentHash
+
 logger = logging.getLogger(__name__)
 
 # Quiten the file watchdog
@@ -23,6 +31,20 @@ FileSyncCfg = namedtuple('FileSyncCfg',
                           'preSyncCallback', 'postSyncCallback',
                           'excludeFilesRegex'])
 
+
+def _compileExcludeRegex(excludeFilesRegex: List[str]) -> Optional[Pattern]:
+    """ Compile Exclude Regex
+
+    :return: One regex that matches if any of the excludeFilesRegex match,
+        or None if there are none.
+
+    """
+    if not excludeFilesRegex:
+        return None
+
+    return re.compile('|'.join('(?:%s)' % r for r in excludeFilesRegex))
+
+
 from watchdog.utils import platform
 
 if platform.is_darwin():
@@ -54,12 +76,45 @@ class FrontendFileSync:
     This class is used to syncronise the frontend files from the plugins into the
         frontend build dirs.
 
+    Each destination dir has a `FrontendFileSyncIndex`, so files that haven't
+    changed since the last sync are skipped with out reading them.
+
+    The files are copied by a pool of copyThreadCount threads, the directories are
+    created before the copying starts, and the obsolete files are deleted after it
+    has finished.
+
     """
 
-    def __init__(self, syncFileHookCallable: SyncFileHookCallable):
+    DEFAULT_COPY_THREAD_COUNT = 8
+
+    DEFAULT_WATCH_QUIET_SECONDS = 0.5
+
+    def __init__(self, syncFileHookCallable: SyncFileHookCallable,
+                 syncFileHookVersion: str = '',
+                 copyThreadCount: int = DEFAULT_COPY_THREAD_COUNT,
+                 watchQuietSeconds: float = DEFAULT_WATCH_QUIET_SECONDS):
+        """ Constructor
+
+        :param syncFileHookCallable: Transforms the contents of each file as it's
+                synced, it's called from the copy threads.
+
+        :param syncFileHookVersion: Identifies what the sync file hook does, files are
+                synced again when this changes.
+
+        :param copyThreadCount: The number of threads that copy files in syncFiles,
+                1 copies them in the calling thread.
+
+        :param watchQuietSeconds: The file sync watcher applies the changes once there
+                have been none for this many seconds.
+
+        """
         self._syncFileHookCallable = syncFileHookCallable
+        self._syncFileHookVersion = syncFileHookVersion
+        self._copyThreadCount = max(1, copyThreadCount)
+        self._watchQuietSeconds = watchQuietSeconds
         self._dirSyncMap = list()
         self._fileWatchdogObserver = None
+        self._fileChangeHandlers = []
 
     def addSyncMapping(self, srcDir, dstDir,
                        parentMustExist=False,
@@ -122,9 +177,10 @@ class FrontendFileSync:
         self._fileWatchdogObserver = WatchdogObserver()
 
         for cfg in self._dirSyncMap:
-            self._fileWatchdogObserver.schedule(
-                _FileChangeHandler(self._syncFileHookCallable, cfg),
-                cfg.srcDir, recursive=True)
+            handler = _FileChangeHandler(self._syncFileHookCallable, cfg,
+                                         self._watchQuietSeconds)
+            self._fileChangeHandlers.append(handler)
+            self._fileWatchdogObserver.schedule(handler, cfg.srcDir, recursive=True)
 
         self._fileWatchdogObserver.start()
 
@@ -135,33 +191,43 @@ class FrontendFileSync:
         self._fileWatchdogObserver.stop()
         self._fileWatchdogObserver.join()
         self._fileWatchdogObserver = None
+
+        for handler in self._fileChangeHandlers:
+            handler.cancel()
+        self._fileChangeHandlers = []
         logger.debug("Stopped frontend file watchers")
 
     def syncFiles(self):
+        if self._copyThreadCount == 1:
+            self._syncFiles(None)
+            return
 
-        for cfg in self._dirSyncMap:
-            parentDstDir = os.path.dirname(cfg.dstDir)
-            if cfg.parentMustExist and not os.path.isdir(parentDstDir):
+        with ThreadPoolExecutor(max_workers=self._copyThreadCount,
+                                thread_name_prefix='FrontendFileSync') as executor:
+            self._syncFiles(executor)
+
+    def _syncFiles(self, executor: Optional[ThreadPoolExecutor]):
+        srcFilesByCfg, allDstFilePaths = self._buildUnionIndex()
+
+        for cfg, srcFiles in zip(self._dirSyncMap, srcFilesByCfg):
+            if srcFiles is None:
                 logger.debug("Skipping sink, parent doesn't exist. dstDir=%s", cfg.dstDir)
                 continue
 
             if cfg.preSyncCallback:
                 cfg.preSyncCallback()
 
-            # Create lists of files relative to the dstDir and srcDir
+            # Create lists of files relative to the dstDir
             existingFiles = set(self._listFiles(cfg.dstDir))
-            srcFiles = set(self._listFiles(cfg.srcDir))
             destCompiledFiles = set()
 
-            for regexp in cfg.excludeFilesRegex:
-                rexp = re.compile(regexp)
-                srcFiles = set(filter(lambda l: not rexp.match(l), srcFiles))
+            index = FrontendFileSyncIndex(cfg.srcDir, cfg.dstDir,
+                                          self._syncFileHookVersion)
 
-            # Remove any files that the next overlay on the same dst directory
-            # will write.
-            srcFiles -= self._loadFollowingOverlayFileSet(cfg)
+            copies = []
+            dstFileDirs = set()
 
-            for srcFile in srcFiles:
+            for srcFile, srcEntry in srcFiles.items():
                 srcFilePath = os.path.join(cfg.srcDir, srcFile)
                 dstFilePath = os.path.join(cfg.dstDir, srcFile)
 
@@ -177,14 +243,31 @@ class FrontendFileSync:
                     for ext in cfg.keepCompiledFilePatterns[srcFileExt]:
                         destCompiledFiles.add("%s.%s" % (srcFileNoExt, ext))
 
-                dstFileDir = os.path.dirname(dstFilePath)
+                dstFileDirs.add(os.path.dirname(dstFilePath))
+                copies.append((srcFilePath, dstFilePath, srcFile, srcEntry))
+
+            # Create the directories before any files are copied into them
+            for dstFileDir in sorted(dstFileDirs):
                 os.makedirs(dstFileDir, exist_ok=True)
-                self._fileCopier(srcFilePath, dstFilePath)
+
+            def syncFile(copy):
+                self._syncFile(*copy, index=index)
+
+            if executor:
+                # Wait for all the copies, this raises the first exception
+                list(executor.map(syncFile, copies))
+            else:
+                for copy in copies:
+                    syncFile(copy)
 
             if cfg.deleteExtraDstFiles:
-                for obsoleteFile in existingFiles - srcFiles - destCompiledFiles:
+                for obsoleteFile in existingFiles - set(srcFiles) - destCompiledFiles:
                     obsoleteFile = os.path.join(cfg.dstDir, obsoleteFile)
 
+                    # Another mapping writes this file
+                    if os.path.normpath(obsoleteFile) in allDstFilePaths:
+                        continue
+
                     if os.path.islink(obsoleteFile):
                         os.remove(obsoleteFile)
 
@@ -194,28 +277,62 @@ class FrontendFileSync:
                     else:
                         os.remove(obsoleteFile)
 
+            index.save()
+
             if cfg.postSyncCallback:
                 cfg.postSyncCallback()
 
-    def _loadFollowingOverlayFileSet(self, cfg: FileSyncCfg) -> Set[str]:
-        results = set()
-        cfgs: List[FileSyncCfg] = self._dirSyncMap[self._dirSyncMap.index(cfg) + 1:]
-        for cfgIter in cfgs:
-            if cfg.dstDir == cfgIter.dstDir:
-                results.update(self._listFiles(cfg.srcDir))
+    def _isSyncEnabled(self, cfg: FileSyncCfg) -> bool:
+        parentDstDir = os.path.dirname(cfg.dstDir)
+        return not cfg.parentMustExist or os.path.isdir(parentDstDir)
 
-            elif cfg.dstDir in cfgIter.dstDir:
-                pathPart = cfgIter.dstDir[len(cfg.dstDir):]
-                results.update(self._listFiles(cfgIter.srcDir + pathPart))
+    def _buildUnionIndex(self) -> Tuple[List[Optional[Dict[str, os.DirEntry]]],
+                                        Set[str]]:
+        """ Build Union Index
 
-            elif cfgIter.dstDir in cfg.dstDir:
-                pathPart = cfg.dstDir[len(cfgIter.dstDir):]
-                results.update(self._listFiles(cfgIter.srcDir + pathPart))
+        Walk each source dir once, and resolve which mapping writes each destination
+        file. Mappings overlay the mappings before them, EG feFrontendSrcOverlayDir,
+        so the last mapping that has a file for a destination path wins.
 
-            else:
+        :return: A tuple of
+                the files each mapping writes, relative to its srcDir, with their
+                    DirEntry, or None if the mapping is skipped,
+                the normalised paths of all the destination files that are written.
+
+        """
+        filesByScan: Dict[tuple, Dict[str, os.DirEntry]] = {}
+        candidateFilesByCfg: List[Optional[Dict[str, os.DirEntry]]] = []
+        cfgIndexByDstFilePath: Dict[str, int] = {}
+
+        for cfgIndex, cfg in enumerate(self._dirSyncMap):
+            if not self._isSyncEnabled(cfg):
+                candidateFilesByCfg.append(None)
                 continue
 
-        return results
+            scanKey = (cfg.srcDir, tuple(cfg.excludeFilesRegex))
+            if scanKey not in filesByScan:
+                filesByScan[scanKey] = self._scanFiles(
+                    cfg.srcDir, _compileExcludeRegex(cfg.excludeFilesRegex))
+
+            srcFiles = filesByScan[scanKey]
+            candidateFilesByCfg.append(srcFiles)
+
+            for srcFile in srcFiles:
+                dstFilePath = os.path.normpath(os.path.join(cfg.dstDir, srcFile))
+                cfgIndexByDstFilePath[dstFilePath] = cfgIndex
+
+        srcFilesByCfg = []
+        for cfgIndex, (cfg, srcFiles) in enumerate(zip(self._dirSyncMap,
+                                                       candidateFilesByCfg)):
+            if srcFiles is not None:
+                srcFiles = {srcFile: srcEntry
+                            for srcFile, srcEntry in srcFiles.items()
+                            if cfgIndexByDstFilePath[os.path.normpath(
+                                os.path.join(cfg.dstDir, srcFile))] == cfgIndex}
+
+            srcFilesByCfg.append(srcFiles)
+
+        return srcFilesByCfg, set(cfgIndexByDstFilePath)
 
     def _writeFileIfRequired(self, dir, fileName, contents):
         fullFilePath = os.path.join(dir, fileName)
@@ -233,42 +350,136 @@ class FrontendFileSync:
         with open(fullFilePath, 'w') as f:
             f.write(contents)
 
-    def _fileCopier(self, src, dst):
+    def _syncFile(self, srcFilePath: str, dstFilePath: str, relPath: str,
+                  srcEntry: os.DirEntry, index: FrontendFileSyncIndex):
+        # Skip the file if it's unchanged since the last sync.
+        # The DirEntry caches the stat, on windows it came with the directory listing.
+        srcStat = srcEntry.stat()
+        if index.isUpToDate(relPath, srcStat, dstFilePath):
+            return
+
+        self._fileCopier(srcFilePath, dstFilePath, index, relPath, srcStat)
+
+    def _fileCopier(self, src, dst, index: FrontendFileSyncIndex, relPath: str,
+                    srcStat: os.stat_result):
         with open(src, 'rb') as f:
             contents = f.read()
 
         contents = self._syncFileHookCallable(dst, contents)
+        hash_ = contentHash(contents)
 
-        # If the contents hasn't change, don't write it
-        if os.path.isfile(dst):
+        # If the contents hasn't change, don't write it.
+        # The index knows the dst contents if it hasn't changed since the last sync.
+        dstHash = index.dstHash(relPath, dst)
+        if dstHash is not None:
+            upToDate = dstHash == hash_
+
+        elif os.path.isfile(dst):
             with open(dst, 'rb') as f:
-                if f.read() == contents:
-                    return
+                upToDate = f.read() == contents
 
-        with open(dst, 'wb') as f:
-            f.write(contents)
+        else:
+            upToDate = False
+
+        if not upToDate:
+            with open(dst, 'wb') as f:
+                f.write(contents)
+
+        index.record(relPath, srcStat, dst, hash_)
+
+    def _listFiles(self, dir) -> List[str]:
+        return list(self._scanFiles(dir))
+
+    def _scanFiles(self, dir: str,
+                   excludeRexp: Optional[Pattern] = None) -> Dict[str, os.DirEntry]:
+        """ Scan Files
+
+        List the files under dir with os.scandir. Like os.walk, symlinked directories
+        are not descended into.
+
+        :param dir: The directory to list.
+        :param excludeRexp: Files with relative paths that match this are skipped.
+            Directories are pruned, with out being listed, if their relative path
+            with a trailing separator matches, EG r'.*__pycache__.*'
+
+        :return: The DirEntry of each file, by its path relative to dir.
+
+        """
+        ignoreFiles = {'.lastHash', '.DS_Store', FrontendFileSyncIndex.FILE_NAME,
+                       FrontendFileSyncIndex.FILE_NAME + '.tmp'}
+        entriesByRelPath = {}
+
+        dirsToScan = [(dir, '')]
+        while dirsToScan:
+            path, relPath = dirsToScan.pop()
+
+            try:
+                with os.scandir(path) as scanIter:
+                    entries = list(scanIter)
+
+            except OSError as e:
+                # os.walk ignores the directories it can't list too
+                logger.debug("Failed to list %s, %s", path, e)
+                continue
+
+            for entry in entries:
+                entryRelPath = os.path.join(relPath, entry.name) if relPath else entry.name
+
+                if entry.is_dir():
+                    if entry.is_symlink():
+                        continue
 
-    def _listFiles(self, dir):
-        ignoreFiles = {'.lastHash', '.DS_Store'}
-        paths = []
-        for (path, directories, filenames) in os.walk(dir):
+                    if excludeRexp and excludeRexp.match(entryRelPath + os.sep):
+                        continue
 
-            for filename in filenames:
-                if filename in ignoreFiles:
+                    dirsToScan.append((entry.path, entryRelPath))
                     continue
-                paths.append(os.path.join(path[len(dir) + 1:], filename))
 
-        return paths
+                if entry.name in ignoreFiles:
+                    continue
+
+                if excludeRexp and excludeRexp.match(entryRelPath):
+                    continue
+
+                entriesByRelPath[entryRelPath] = entry
+
+        return entriesByRelPath
 
 
 class _FileChangeHandler(FileSystemEventHandler):
-    def __init__(self, syncFileHook, cfg: FileSyncCfg):
+    """ File Change Handler
+
+    This class syncs the files in one mapping as they change.
+
+    The events are collected until there have been none for quietSeconds, then the
+    last event for each file is applied, as one batch. A git checkout fires thousands
+    of events, this way the callbacks fire once, and each file is written at most once.
+
+    The events are received on the watchdog thread, they only record the time of the
+    last event. One reactor callLater waits for the deadline, and waits again if an
+    event has pushed it back. The batches are applied in a reactor thread, one at a
+    time.
+
+    """
+
+    _UPDATE = 'update'
+    _DELETE = 'delete'
+
+    def __init__(self, syncFileHook, cfg: FileSyncCfg, quietSeconds: float):
         self._syncFileHook = syncFileHook
         self._srcDir = cfg.srcDir
         self._dstDir = cfg.dstDir
         self._cfg = cfg
+        self._quietSeconds = quietSeconds
 
-        self._rexp = [re.compile(r) for r in cfg.excludeFilesRegex]
+        self._excludeRexp = _compileExcludeRegex(cfg.excludeFilesRegex)
+
+        self._lock = threading.Lock()
+        self._applyLock = threading.Lock()
+        self._pendingActionBySrcPath: Dict[str, str] = {}
+        self._lastEventTime = 0.0
+        self._batchScheduled = False
+        self._batchCall = None
 
     def _makeSrcFileRelPath(self, srcFilePath: str) -> str:
         return srcFilePath[len(self._srcDir):]
@@ -276,13 +487,71 @@ class _FileChangeHandler(FileSystemEventHandler):
     def _makeDestPath(self, srcFilePath: str) -> str:
         return self._dstDir + self._makeSrcFileRelPath(srcFilePath)
 
-    def _updateFileContents(self, srcFilePath):
+    def _queue(self, srcFilePath: str, action: str) -> None:
+        with self._lock:
+            # Only the last event for each file matters
+            self._pendingActionBySrcPath.pop(srcFilePath, None)
+            self._pendingActionBySrcPath[srcFilePath] = action
 
-        relativeSrcFilePath = self._makeSrcFileRelPath(srcFilePath)
-        for r in self._rexp:
-            if r.match(relativeSrcFilePath):
+            # Each event pushes the deadline back
+            self._lastEventTime = time.monotonic()
+
+            if self._batchScheduled:
                 return
+            self._batchScheduled = True
+
+        reactor.callFromThread(self._waitForQuiet, self._quietSeconds)
 
+    def cancel(self) -> None:
+        """ Cancel
+
+        Drop the pending events, call this from the reactor thread.
+
+        """
+        with self._lock:
+            self._pendingActionBySrcPath = {}
+            self._batchScheduled = False
+
+        if self._batchCall and self._batchCall.active():
+            self._batchCall.cancel()
+        self._batchCall = None
+
+    def _waitForQuiet(self, seconds: float) -> None:
+        self._batchCall = reactor.callLater(seconds, self._deadlineReached)
+
+    def _deadlineReached(self) -> None:
+        with self._lock:
+            remaining = self._lastEventTime + self._quietSeconds - time.monotonic()
+            if 0 < remaining:
+                batch = None
+            else:
+                batch = self._pendingActionBySrcPath
+                self._pendingActionBySrcPath = {}
+                self._batchScheduled = False
+
+        if batch is None:
+            self._waitForQuiet(remaining)
+            return
+
+        self._batchCall = None
+        if not batch:
+            return
+
+        d = deferToThread(self._applyBatch, batch)
+        d.addErrback(vortexLogFailure, logger, consumeError=True)
+
+    def _applyBatch(self, batch: Dict[str, str]) -> None:
+        try:
+            # The next batch waits for this one to be written
+            with self._applyLock:
+                self._applyActions(batch)
+
+        except Exception as e:
+            logger.error("Failed to sync %s changed files into %s",
+                         len(batch), self._dstDir)
+            logger.exception(e)
+
+    def _applyActions(self, batch: Dict[str, str]) -> None:
         parentDstDir = os.path.dirname(self._dstDir)
         if self._cfg.parentMustExist and not os.path.isdir(parentDstDir):
             logger.debug("Skipping sync, parent doesn't exist. dstDir=%s", self._dstDir)
@@ -291,9 +560,30 @@ class _FileChangeHandler(FileSystemEventHandler):
         if self._cfg.preSyncCallback:
             self._cfg.preSyncCallback()
 
+        changedCount = 0
+        for srcFilePath, action in batch.items():
+            if action == self._UPDATE:
+                changed = self._updateFileContents(srcFilePath)
+            else:
+                changed = self._removeFile(srcFilePath)
+
+            changedCount += int(changed)
+
+        logger.debug("Synced %s changed files of %s events into %s",
+                     changedCount, len(batch), self._dstDir)
+
+        if changedCount and self._cfg.postSyncCallback:
+            self._cfg.postSyncCallback()
+
+    def _updateFileContents(self, srcFilePath) -> bool:
+
+        relativeSrcFilePath = self._makeSrcFileRelPath(srcFilePath)
+        if self._excludeRexp and self._excludeRexp.match(relativeSrcFilePath):
+            return False
+
         # if the file had vanished, then do nothing
         if not os.path.exists(srcFilePath):
-            return
+            return False
 
         dstFilePath = self._makeDestPath(srcFilePath)
 
@@ -312,7 +602,7 @@ class _FileChangeHandler(FileSystemEventHandler):
         if os.path.isfile(dstFilePath):
             with open(dstFilePath, 'rb') as f:
                 if f.read() == contents:
-                    return
+                    return False
 
         logger.debug("Syncing %s -> %s", srcFilePath[len(self._srcDir) + 1:],
                      self._dstDir)
@@ -326,27 +616,19 @@ class _FileChangeHandler(FileSystemEventHandler):
         with open(dstFilePath, 'wb') as f:
             f.write(contents)
 
-        if self._cfg.postSyncCallback:
-            self._cfg.postSyncCallback()
-
-    def on_created(self, event):
-        if not isinstance(event, FileCreatedEvent) or event.src_path.endswith("__"):
-            return
-
-        self._updateFileContents(event.src_path)
-
-    def on_deleted(self, event):
-        if not isinstance(event, FileDeletedEvent) or event.src_path.endswith("__"):
-            return
+        return True
 
+    def _removeFile(self, srcFilePath) -> bool:
         # If the file still exists, then do nothing. This can occur on macOS
-        if os.path.exists(event.src_path):
-            return
+        if os.path.exists(srcFilePath):
+            return False
 
-        dstFilePath = self._makeDestPath(event.src_path)
+        dstFilePath = self._makeDestPath(srcFilePath)
 
+        removed = False
         if os.path.exists(dstFilePath):
             os.remove(dstFilePath)
+            removed = True
 
         # If this is a typescript file, make sure we remove the associated js and js.map
         # files.
@@ -359,14 +641,28 @@ class _FileChangeHandler(FileSystemEventHandler):
             if os.path.exists(jsMapFile):
                 os.remove(jsMapFile)
 
-        logger.debug("Removing %s -> %s", event.src_path[len(self._srcDir) + 1:],
+        logger.debug("Removing %s -> %s", srcFilePath[len(self._srcDir) + 1:],
                      self._dstDir)
 
+        return removed
+
+    def on_created(self, event):
+        if not isinstance(event, FileCreatedEvent) or event.src_path.endswith("__"):
+            return
+
+        self._queue(event.src_path, self._UPDATE)
+
+    def on_deleted(self, event):
+        if not isinstance(event, FileDeletedEvent) or event.src_path.endswith("__"):
+            return
+
+        self._queue(event.src_path, self._DELETE)
+
     def on_modified(self, event):
         if not isinstance(event, FileModifiedEvent) or event.src_path.endswith("__"):
             return
 
-        self._updateFileContents(event.src_path)
+        self._queue(event.src_path, self._UPDATE)
 
     def on_moved(self, event):
         if (not isinstance(event, FileMovedEvent)
@@ -374,8 +670,5 @@ class _FileChangeHandler(FileSystemEventHandler):
             or event.dest_path.endswith("__")):
             return
 
-        self._updateFileContents(event.dest_path)
-
-        oldDestFilePath = self._makeDestPath(event.src_path)
-        if os.path.exists(oldDestFilePath):
-            os.remove(oldDestFilePath)
+        self._queue(event.dest_path, self._UPDATE)
+        self._queue(event.src_path, self._DELETE)
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def contentHash(contents: bytes) -> str:
+    return hashlib.sha256(contents).hexdigest()
+
+
+def _statKey(stat: os.stat_result) -> list:
+    return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+
+class FrontendFileSyncIndex:
+    """ Frontend File Sync Index
+
+    This class records what was synced from a source directory into a destination
+    directory, so the next sync can skip the files that haven't changed, with out
+    opening them.
+
+    The index is stored in the destination directory, in FILE_NAME. For each file it
+    records the source stat (size, mtime, inode), the destination stat, the hash of
+    the contents written to the destination and the version of the sync file hook.
+
+    A file is up to date if its source stat and the hook version are unchanged, and
+    the destination file hasn't been changed since it was written.
+
+    Several mappings can sync into the same destination directory, so the entries are
+    stored by source directory.
+
+    The files can be checked and recorded from several threads.
+
+    """
+
+    FILE_NAME = '.peekSyncIndex'
+
+    VERSION = 1
+
+    def __init__(self, srcDir: str, dstDir: str, hookVersion: str):
+        self._filePath = os.path.join(dstDir, self.FILE_NAME)
+        self._srcDir = srcDir
+        self._hookVersion = hookVersion
+
+        self._entriesBySrcDir: Dict[str, Dict[str, dict]] = {}
+        self._entries: Dict[str, dict] = {}
+        self._newEntries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self._filePath, 'r') as f:
+                data = json.load(f)
+
+        except FileNotFoundError:
+            return
+
+        except (OSError, ValueError) as e:
+            logger.debug("Ignoring the unreadable sync index %s, %s", self._filePath, e)
+            return
+
+        if not isinstance(data, dict) or data.get('version') != self.VERSION:
+            return
+
+        self._entriesBySrcDir = data.get('mappings', {})
+        self._entries = self._entriesBySrcDir.get(self._srcDir, {})
+
+    def isUpToDate(self, relPath: str, srcStat: os.stat_result,
+                   dstFilePath: str) -> bool:
+        """ Is Up To Date
+
+        :return: True if the destination file was synced from this source file, as it
+            is now, by the current sync file hook.
+
+        """
+        entry = self._entries.get(relPath)
+        if (not entry
+                or entry['hookVersion'] != self._hookVersion
+                or entry['src'] != _statKey(srcStat)
+                or self._dstHash(entry, dstFilePath) is None):
+            return False
+
+        with self._lock:
+            self._newEntries[relPath] = entry
+        return True
+
+    def dstHash(self, relPath: str, dstFilePath: str) -> Optional[str]:
+        """ Dst Hash
+
+        :return: The hash of the destination files contents, if it's unchanged since
+            it was last synced, otherwise None.
+
+        """
+        entry = self._entries.get(relPath)
+        if not entry:
+            return None
+
+        return self._dstHash(entry, dstFilePath)
+
+    def _dstHash(self, entry: dict, dstFilePath: str) -> Optional[str]:
+        try:
+            dstStat = os.stat(dstFilePath)
+        except FileNotFoundError:
+            return None
+
+        if entry['dst'] != _statKey(dstStat):
+            return None
+
+        return entry['hash']
+
+    def record(self, relPath: str, srcStat: os.stat_result, dstFilePath: str,
+               hash_: str) -> None:
+        """ Record
+
+        Record that the file has been synced, call this after the destination file is
+        written, or found to be up to date.
+
+        """
+        entry = {
+            'src': _statKey(srcStat),
+            'dst': _statKey(os.stat(dstFilePath)),
+            'hash': hash_,
+            'hookVersion': self._hookVersion
+        }
+
+        with self._lock:
+            self._newEntries[relPath] = entry
+
+    def save(self) -> None:
+        """ Save
+
+        Write the index, if it's changed. Files that weren't recorded in this sync are
+        dropped from it.
+
+        """
+        if self._newEntries == self._entries:
+            return
+
+        if not os.path.isdir(os.path.dirname(self._filePath)):
+            return
+
+        self._entriesBySrcDir[self._srcDir] = self._newEntries
+
+        # Write the index atomically, a partial index would be ignored anyway
+        tmpFilePath = self._filePath + '.tmp'
+        with open(tmpFilePath, 'w') as f:
+            json.dump({'version': self.VERSION, 'mappings': self._entriesBySrcDir}, f)
+
+        os.replace(tmpFilePath, self._filePath)
+
+        self._entries = self._newEntries
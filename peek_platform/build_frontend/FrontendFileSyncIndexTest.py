@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from peek_platform.build_frontend.FrontendFileSyncIndex import FrontendFileSyncIndex, \
+    contentHash
+
+FILE_NAME = 'app.component.ts'
+
+CONTENTS = b'export class AppComponent {}\n'
+
+
+class FrontendFileSyncIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._srcDir = os.path.join(self._dir, 'src')
+        self._dstDir = os.path.join(self._dir, 'dst')
+        os.makedirs(self._srcDir)
+        os.makedirs(self._dstDir)
+
+        self._srcFilePath = os.path.join(self._srcDir, FILE_NAME)
+        self._dstFilePath = os.path.join(self._dstDir, FILE_NAME)
+
+        for filePath in (self._srcFilePath, self._dstFilePath):
+            with open(filePath, 'wb') as f:
+                f.write(CONTENTS)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _index(self, hookVersion: str = 'hook 1') -> FrontendFileSyncIndex:
+        return FrontendFileSyncIndex(self._srcDir, self._dstDir, hookVersion)
+
+    def _recordSync(self) -> None:
+        index = self._index()
+        index.record(FILE_NAME, os.stat(self._srcFilePath), self._dstFilePath,
+                     contentHash(CONTENTS))
+        index.save()
+
+    def _isUpToDate(self, index: FrontendFileSyncIndex) -> bool:
+        return index.isUpToDate(FILE_NAME, os.stat(self._srcFilePath),
+                                self._dstFilePath)
+
+    def testRecordedFilesAreUpToDate(self):
+        self.assertFalse(self._isUpToDate(self._index()))
+
+        self._recordSync()
+
+        index = self._index()
+        self.assertTrue(self._isUpToDate(index))
+        self.assertEqual(index.dstHash(FILE_NAME, self._dstFilePath),
+                         contentHash(CONTENTS))
+
+    def testHookVersionChangeResyncs(self):
+        self._recordSync()
+        self.assertFalse(self._isUpToDate(self._index('hook 2')))
+
+    def testChangedFilesResync(self):
+        self._recordSync()
+
+        with open(self._dstFilePath, 'ab') as f:
+            f.write(b'// Edited\n')
+
+        index = self._index()
+        self.assertFalse(self._isUpToDate(index))
+        self.assertIsNone(index.dstHash(FILE_NAME, self._dstFilePath))
+
+    def testUnrecordedFilesAreDropped(self):
+        self._recordSync()
+
+        # A sync that doesn't find the file any more
+        index = self._index()
+        index.record('other.ts', os.stat(self._srcFilePath), self._dstFilePath,
+                     contentHash(CONTENTS))
+        index.save()
+
+        self.assertFalse(self._isUpToDate(self._index()))
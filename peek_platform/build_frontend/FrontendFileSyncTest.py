@@ -0,0 +1,178 @@
+import os
+import shutil
+import tempfile
+
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks
+from twisted.internet.task import deferLater
+from twisted.trial import unittest
+from watchdog.events import FileDeletedEvent, FileModifiedEvent
+
+from peek_platform.build_frontend.FrontendFileSync import FileSyncCfg, \
+    FrontendFileSync, _FileChangeHandler, _compileExcludeRegex
+
+QUIET_SECONDS = 0.1
+
+
+class FrontendFileSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._srcDir = os.path.join(self._dir, 'src')
+        self._dstDir = os.path.join(self._dir, 'dst')
+        os.makedirs(self._srcDir)
+        os.makedirs(self._dstDir)
+
+        self._hookedFilePaths = []
+        self._preSyncCount = 0
+        self._postSyncCount = 0
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _syncFileHook(self, fileName: str, contents: bytes) -> bytes:
+        self._hookedFilePaths.append(fileName)
+        return contents
+
+    def _preSync(self) -> None:
+        self._preSyncCount += 1
+
+    def _postSync(self) -> None:
+        self._postSyncCount += 1
+
+    def _readDstFile(self, relPath: str) -> bytes:
+        with open(os.path.join(self._dstDir, relPath), 'rb') as f:
+            return f.read()
+
+    def _writeSrcFile(self, relPath: str, contents: bytes) -> str:
+        filePath = os.path.join(self._srcDir, relPath)
+        os.makedirs(os.path.dirname(filePath), exist_ok=True)
+        with open(filePath, 'wb') as f:
+            f.write(contents)
+        return filePath
+
+    def _fileChangeHandler(self) -> _FileChangeHandler:
+        cfg = FileSyncCfg(self._srcDir, self._dstDir, False, True, {},
+                          None, self._postSync, [])
+        handler = _FileChangeHandler(self._syncFileHook, cfg, QUIET_SECONDS)
+        self.addCleanup(handler.cancel)
+        return handler
+
+    def _sleep(self, seconds: float):
+        return deferLater(reactor, seconds, lambda: None)
+
+    @inlineCallbacks
+    def testEventsAreAppliedAsOneBatch(self):
+        handler = self._fileChangeHandler()
+
+        filePaths = [self._writeSrcFile('app/file%s.ts' % num, b'%d' % num)
+                     for num in range(20)]
+
+        # Events keep arriving, the batch waits until they stop
+        for _ in range(3):
+            for filePath in filePaths:
+                handler.on_modified(FileModifiedEvent(filePath))
+            yield self._sleep(QUIET_SECONDS / 2)
+
+        self.assertEqual(self._postSyncCount, 0)
+
+        yield self._sleep(QUIET_SECONDS * 5)
+
+        self.assertEqual(self._postSyncCount, 1)
+        self.assertEqual(len(self._hookedFilePaths), len(filePaths))
+
+        with open(os.path.join(self._dstDir, 'app', 'file7.ts'), 'rb') as f:
+            self.assertEqual(f.read(), b'7')
+
+    @inlineCallbacks
+    def testLastEventForAFileWins(self):
+        handler = self._fileChangeHandler()
+
+        filePath = self._writeSrcFile('removed.ts', b'removed')
+        with open(os.path.join(self._dstDir, 'removed.ts'), 'wb') as f:
+            f.write(b'removed')
+
+        handler.on_modified(FileModifiedEvent(filePath))
+        os.remove(filePath)
+        handler.on_deleted(FileDeletedEvent(filePath))
+
+        yield self._sleep(QUIET_SECONDS * 5)
+
+        self.assertEqual(self._hookedFilePaths, [])
+        self.assertFalse(os.path.exists(os.path.join(self._dstDir, 'removed.ts')))
+
+    @inlineCallbacks
+    def testCancelDropsThePendingEvents(self):
+        handler = self._fileChangeHandler()
+
+        handler.on_modified(FileModifiedEvent(self._writeSrcFile('file.ts', b'')))
+        yield self._sleep(0)
+        handler.cancel()
+
+        yield self._sleep(QUIET_SECONDS * 3)
+        self.assertEqual(self._postSyncCount, 0)
+
+    def testSyncFilesCopiesInParallel(self):
+        for num in range(50):
+            self._writeSrcFile('app/dir%s/file%s.ts' % (num % 5, num), b'%d' % num)
+
+        with open(os.path.join(self._dstDir, 'obsolete.ts'), 'wb') as f:
+            f.write(b'obsolete')
+
+        fileSync = FrontendFileSync(self._syncFileHook, 'hook 1', copyThreadCount=4)
+        fileSync.addSyncMapping(self._srcDir, self._dstDir,
+                                preSyncCallback=self._preSync,
+                                postSyncCallback=self._postSync)
+        fileSync.syncFiles()
+
+        self.assertEqual((self._preSyncCount, self._postSyncCount), (1, 1))
+        self.assertEqual(len(self._hookedFilePaths), 50)
+        self.assertEqual(self._readDstFile('app/dir3/file13.ts'), b'13')
+        self.assertFalse(os.path.exists(os.path.join(self._dstDir, 'obsolete.ts')))
+
+        # The index skips the unchanged files
+        fileSync.syncFiles()
+        self.assertEqual(len(self._hookedFilePaths), 50)
+
+    def testOverlaysWriteEachFileOnce(self):
+        overlayDir = os.path.join(self._dir, 'overlay')
+
+        self._writeSrcFile('app/shared.ts', b'plugin')
+        self._writeSrcFile('app/plugin.ts', b'plugin')
+
+        os.makedirs(os.path.join(overlayDir, 'app'))
+        for fileName in ('shared.ts', 'overlay.ts'):
+            with open(os.path.join(overlayDir, 'app', fileName), 'wb') as f:
+                f.write(b'overlay')
+
+        fileSync = FrontendFileSync(self._syncFileHook, 'hook 1')
+        fileSync.addSyncMapping(self._srcDir, self._dstDir)
+        fileSync.addSyncMapping(overlayDir, self._dstDir)
+        fileSync.syncFiles()
+
+        self.assertEqual(self._readDstFile('app/shared.ts'), b'overlay')
+        self.assertEqual(self._readDstFile('app/plugin.ts'), b'plugin')
+        self.assertEqual(self._readDstFile('app/overlay.ts'), b'overlay')
+
+        # The overlay won shared.ts, the plugin mapping doesn't write it first
+        sharedDstFilePath = os.path.join(self._dstDir, 'app', 'shared.ts')
+        self.assertEqual(self._hookedFilePaths.count(sharedDstFilePath), 1)
+
+    def testScanFilesPrunesExcludedDirs(self):
+        self._writeSrcFile('app/file.ts', b'')
+        self._writeSrcFile('app/__pycache__/file.cpython-39.pyc', b'')
+        self._writeSrcFile('app/file.pyc', b'')
+        self._writeSrcFile('.DS_Store', b'')
+
+        linkedDir = os.path.join(self._dir, 'linked')
+        os.makedirs(linkedDir)
+        with open(os.path.join(linkedDir, 'linked.ts'), 'wb'):
+            pass
+        os.symlink(linkedDir, os.path.join(self._srcDir, 'app', 'linked'))
+
+        fileSync = FrontendFileSync(self._syncFileHook, 'hook 1')
+        excludeRexp = _compileExcludeRegex([r'.*__pycache__.*', r'.*[.]pyc$'])
+
+        self.assertEqual(sorted(fileSync._scanFiles(self._srcDir, excludeRexp)),
+                         [os.path.join('app', 'file.ts')])
+        self.assertEqual(len(fileSync._scanFiles(self._srcDir)), 3)
@@ -16,11 +16,21 @@
 import logging
 import os
 from abc import ABCMeta
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
-from jsoncfg.functions import save_config, ConfigWithWrapper
+from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+from vortex.DeferUtil import vortexLogFailure
+
+from peek_platform.file_config.PeekFileConfigSettings import PeekFileConfigSettings, \
+    compileSettings
+from peek_platform.file_config.PeekFileConfigSnapshot import PeekFileConfigSnapshot
 
 logger = logging.getLogger(__name__)
 
+ConfigSubscriberCallable = Callable[[Any, Any], None]
+
 
 class PeekFileConfigABC(metaclass=ABCMeta):
     """
@@ -44,6 +54,11 @@ class PeekFileConfigABC(metaclass=ABCMeta):
         '''
         Constructor
         '''
+        # This is a singleton, keep the snapshot and subscriptions if it's constructed
+        # again.
+        if '_cfg' in self.__dict__:
+            return
+
         from peek_platform import PeekPlatformConfig
         assert PeekPlatformConfig.componentName is not None
 
@@ -62,15 +77,253 @@ class PeekFileConfigABC(metaclass=ABCMeta):
             with open(self._configFilePath, 'w') as fobj:
                 fobj.write('{}')
 
-        self._cfg = ConfigWithWrapper(self._configFilePath)
+        # Reads are served from memory, the file is only read again when it changes.
+        self._cfg = PeekFileConfigSnapshot(self._configFilePath,
+                                           self.DEFAULT_FILE_CHMOD)
 
         self._hp = '%(' + self._homePath + ')s'
 
+        self._settings = None
+        self._settingsGeneration = None
+        self._settingsJson = None
+
+        # The directories that _chkDir has already verified or created.
+        self._verifiedDirs = set()
+
+        self._subscribersBySettingName: Dict[str, List[ConfigSubscriberCallable]] = \
+            defaultdict(list)
+        self._subscribedSettings = None
+        self._configWatcherLoopingCall = None
+
+    @property
+    def homePath(self) -> str:
+        """ Home Path
+
+        :return: The services home directory, EG ~/peek-server.home
+
+        """
+        return self._homePath
+
+    def configTransaction(self):
+        """ Config Transaction
+
+        Use this to group several setter calls into one write of config.json ::
+
+            with config.configTransaction():
+                config.platformVersion = '1.2.3'
+                config.pluginsEnabled = pluginNames
+
+        """
+        return self._cfg.transaction()
+
+    @property
+    def configSaveCount(self) -> int:
+        """ Config Save Count
+
+        :return: The number of times config.json has been written by this process.
+
+        """
+        return self._cfg.saveCount
+
+    @property
+    def settings(self) -> PeekFileConfigSettings:
+        """ Settings
+
+        :return: The compiled, read only settings, see `compileSettings`.
+            These are recompiled when the content of config.json changes.
+
+        """
+        if self._settings is None:
+            return self.compileSettings()
+
+        if self._settingsGeneration != self._cfg.generation:
+            if self._settingsJson == self._cfg.savedJson:
+                self._settingsGeneration = self._cfg.generation
+            else:
+                self.compileSettings()
+
+        return self._settings
+
+    def compileSettings(self) -> PeekFileConfigSettings:
+        """ Compile Settings
+
+        Read and validate the settings listed in the SETTING_NAMES of the mixins of
+        this config, and store them in an immutable object for fast attribute access.
+
+        If none of the values have changed, the current settings object is kept.
+
+        This should be called when the service starts.
+
+        """
+        # Any defaults that are filled in are written in one go
+        with self._cfg.transaction():
+            settings = compileSettings(self, PeekFileConfigABC)
+
+        if self._settings is None or self._settings._asDict() != settings._asDict():
+            self._settings = settings
+
+        self._settingsGeneration = self._cfg.generation
+        self._settingsJson = self._cfg.savedJson
+        return self._settings
+
+    def enableConfigInstrumentation(self, enabled: bool = True) -> None:
+        """ Enable Config Instrumentation
+
+        Record the reads, writes, saves and time spent for each config property.
+        See `logConfigAccessStats`
+
+        """
+        self._cfg.enableInstrumentation(enabled)
+
+    def configAccessStats(self) -> Dict[str, Dict[str, float]]:
+        """ Config Access Stats
+
+        :return: A dict of property name to a dict of the reads, writes, saves and
+            seconds recorded for it.
+
+        """
+        return {name: stat.toDict()
+                for name, stat in self._cfg.accessStats().items()}
+
+    def logConfigAccessStats(self) -> None:
+        """ Log Config Access Stats
+
+        Log a table of the recorded config access stats, the most time consuming
+        first.
+
+        """
+        from peek_platform.util.MemUtil import rpad, lpad
+
+        stats = sorted(self._cfg.accessStats().items(),
+                       key=lambda i: i[1].seconds, reverse=True)
+
+        text = "Config access stats, %s saves in total\n" % self.configSaveCount
+        text += (' ' + rpad("READS", 10) + ' ' + rpad("WRITES", 10)
+                 + ' ' + rpad("SAVES", 10) + ' ' + rpad("MS", 10)
+                 + ' ' + "PROPERTY" + '\n')
+
+        for name, stat in stats:
+            text += (' ' + rpad(stat.reads, 10)
+                     + ' ' + rpad(stat.writes, 10)
+                     + ' ' + rpad(stat.saves, 10)
+                     + ' ' + lpad('%.1f' % (stat.seconds * 1000), 10)
+                     + ' ' + name + '\n')
+
+        logger.info(text)
+
+    def subscribe(self, settingName: str,
+                  callback: ConfigSubscriberCallable) -> None:
+        """ Subscribe
+
+        Call the callback when the value of a setting changes, while the config watcher
+        is running. See `startConfigWatcher`
+
+        :param settingName: The name of the config property, EG "loggingLevel"
+        :param callback: This is called with the old value and the new value.
+
+        """
+        if settingName not in type(self.settings).__slots__:
+            raise KeyError("%s is not a setting of %s"
+                           % (settingName, type(self).__name__))
+
+        self._subscribersBySettingName[settingName].append(callback)
+
+    def startConfigWatcher(self, interval: float = 5.0) -> None:
+        """ Start Config Watcher
+
+        Check config.json for changes, and notify the subscribers of any settings
+        that have changed, so they can be applied with out a restart.
+
+        :param interval: The number of seconds between checks.
+
+        """
+        from peek_platform.file_config.PeekFileConfigPlatformMixin import \
+            PeekFileConfigPlatformMixin
+
+        if self._configWatcherLoopingCall:
+            return
+
+        if isinstance(self, PeekFileConfigPlatformMixin):
+            self.subscribe('loggingLevel', self._applyLoggingLevel)
+            self.subscribe('twistedThreadPoolSize', self._applyTwistedThreadPoolSize)
+            self.subscribe('twistedThreadPoolMinSize',
+                           self._applyTwistedThreadPoolMinSize)
+
+        self._subscribedSettings = self.settings
+
+        self._configWatcherLoopingCall = LoopingCall(self._checkConfigChanged)
+        d = self._configWatcherLoopingCall.start(interval, now=False)
+        d.addErrback(vortexLogFailure, logger, consumeError=True)
+
+        reactor.addSystemEventTrigger('before', 'shutdown', self.stopConfigWatcher)
+
+    def stopConfigWatcher(self) -> None:
+        if self._configWatcherLoopingCall:
+            self._configWatcherLoopingCall.stop()
+            self._configWatcherLoopingCall = None
+
+    def _checkConfigChanged(self) -> None:
+        self._cfg.reloadIfChanged(force=True)
+
+        oldSettings = self._subscribedSettings
+        newSettings = self.settings
+        if newSettings is oldSettings:
+            return
+
+        self._subscribedSettings = newSettings
+
+        for settingName, callbacks in self._subscribersBySettingName.items():
+            oldValue = getattr(oldSettings, settingName)
+            newValue = getattr(newSettings, settingName)
+            if oldValue == newValue:
+                continue
+
+            logger.info("Config setting %s has changed from %s to %s",
+                        settingName, oldValue, newValue)
+
+            for callback in callbacks:
+                try:
+                    callback(oldValue, newValue)
+
+                except Exception as e:
+                    logger.error("Failed to apply the new value for %s", settingName)
+                    logger.exception(e)
+
     def _save(self):
-        save_config(self._configFilePath, self._cfg)
+        self._cfg.save()
+
+    def ensureDirs(self, pluginNames: Optional[Iterable[str]] = None) -> None:
+        """ Ensure Dirs
+
+        Create and verify all the configured directories when the service starts,
+        so the path properties don't need to touch the disk after this.
+
+        :param pluginNames: The plugins to create data directories for, this
+            defaults to the enabled plugins.
+
+        """
+        with self._cfg.transaction():
+            self.compileSettings()
+
+            # Reading the directory properties creates the directories
+            for cls in type(self).__mro__:
+                for name in cls.__dict__.get('DIR_SETTING_NAMES', ()):
+                    getattr(self, name)
+
+            if pluginNames is None:
+                pluginNames = getattr(self, 'pluginsEnabled', [])
+
+            for pluginName in pluginNames:
+                self.pluginDataPath(pluginName)
 
     def _chkDir(self, path):
+        # The cache is keyed by path, so a newly configured path is checked again.
+        if path in self._verifiedDirs:
+            return path
+
         if not os.path.isdir(path):
             assert not os.path.exists(path)
             os.makedirs(path, self.DEFAULT_DIR_CHMOD)
+
+        self._verifiedDirs.add(path)
         return path
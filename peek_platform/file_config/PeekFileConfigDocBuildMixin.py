@@ -6,6 +6,12 @@ logger = logging.getLogger(__name__)
 
 
 class PeekFileConfigDocBuildMixin:
+    #: The plain value settings, compiled by `PeekFileConfigABC.compileSettings`
+    SETTING_NAMES = (
+        'docBuildPrepareEnabled',
+        'docSyncFilesForDebugEnabled',
+        'docBuildEnabled',
+    )
 
     @property
     def docBuildPrepareEnabled(self) -> bool:
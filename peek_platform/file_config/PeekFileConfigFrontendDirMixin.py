@@ -1,12 +1,28 @@
 import logging
 import os
 
-from jsoncfg.value_mappers import require_bool, require_string
+from jsoncfg.value_mappers import require_bool, require_string, require_integer, \
+    require_number
 
 logger = logging.getLogger(__name__)
 
 
 class PeekFileConfigFrontendDirMixin:
+    #: The plain value settings, compiled by `PeekFileConfigABC.compileSettings`
+    SETTING_NAMES = (
+        'feSyncFilesForDebugEnabled',
+        'feSyncFilesThreadCount',
+        'feSyncFilesQuietSeconds',
+        'feWebBuildPrepareEnabled',
+        'feWebBuildEnabled',
+    )
+
+    #: The directory settings, created by `PeekFileConfigABC.ensureDirs`
+    DIR_SETTING_NAMES = (
+        'feFrontendSrcOverlayDir',
+        'feFrontendNodeModuleOverlayDir',
+    )
+
     # --- Platform Logging
 
     @property
@@ -43,6 +59,28 @@ class PeekFileConfigFrontendDirMixin:
         with self._cfg as c:
             return c.frontend.syncFilesForDebugEnabled(False, require_bool)
 
+    @property
+    def feSyncFilesThreadCount(self) -> int:
+        """ Sync Files Thread Count
+
+        :return The number of threads that copy the frontend files into the build
+            dirs, 1 copies them one at a time.
+
+        """
+        with self._cfg as c:
+            return max(1, c.frontend.syncFilesThreadCount(8, require_integer))
+
+    @property
+    def feSyncFilesQuietSeconds(self) -> float:
+        """ Sync Files Quiet Seconds
+
+        :return The file sync watcher waits until the files have stopped changing for
+            this many seconds, then syncs all the changes at once.
+
+        """
+        with self._cfg as c:
+            return float(c.frontend.syncFilesQuietSeconds(0.5, require_number))
+
 
     @property
     def feWebBuildPrepareEnabled(self) -> bool:
@@ -11,6 +11,13 @@ logger = logging.getLogger(__name__)
 
 
 class PeekFileConfigHttpMixin:
+    #: The plain value settings, compiled by `PeekFileConfigABC.compileSettings`
+    SETTING_NAMES = (
+        'sitePort',
+        'enableHttps',
+        'redirectFromHttpPort',
+    )
+
     def __init__(self, config: PeekFileConfigPlatformMixin, name: str, defaultPort: int):
         self._config = config
         self._name = name
@@ -6,6 +6,10 @@ from peek_platform.WindowsPatch import isWindows
 
 
 class PeekFileConfigOsMixin(metaclass=ABCMeta):
+    #: The plain value settings, compiled by `PeekFileConfigABC.compileSettings`
+    SETTING_NAMES = (
+        'bashLocation',
+    )
 
     _bashDefault = "C:\\Program Files\\Git\\bin\\bash.exe" if isWindows else "/bin/bash"
 
@@ -4,6 +4,12 @@ from jsoncfg.value_mappers import require_string, require_integer
 
 
 class PeekFileConfigPeekServerClientMixin(metaclass=ABCMeta):
+    #: The plain value settings, compiled by `PeekFileConfigABC.compileSettings`
+    SETTING_NAMES = (
+        'peekServerHttpPort',
+        'peekServerVortexTcpPort',
+        'peekServerHost',
+    )
 
     ### SERVER SECTION ###
     @property
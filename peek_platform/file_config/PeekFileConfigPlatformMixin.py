@@ -1,15 +1,50 @@
 import logging
 import os
 from abc import ABCMeta
-from typing import Optional
+from typing import Dict, List, Optional
 
 from jsoncfg.value_mappers import require_string, RequireType, require_list, require_bool, \
-    require_integer
+    require_integer, require_dict
 
 logger = logging.getLogger(__name__)
 
 
 class PeekFileConfigPlatformMixin(metaclass=ABCMeta):
+    #: The plain value settings, compiled by `PeekFileConfigABC.compileSettings`
+    SETTING_NAMES = (
+        'loggingDebugMemoryMask',
+        'loggingLevel',
+        'logToStdout',
+        'loggingRotateSizeMb',
+        'loggingRotationsToKeep',
+        'loggingLogToSyslogHost',
+        'loggingLogToSyslogPort',
+        'loggingLogToSyslogFacility',
+        'twistedThreadPoolSize',
+        'twistedThreadPoolAdaptive',
+        'twistedThreadPoolMinSize',
+        'autoPackageUpdate',
+        'platformVersion',
+        'pluginsEnabled',
+        'pluginPrecompile',
+        'pluginBytecodeInvalidationMode',
+        'pluginZipImport',
+        'pluginLazyImport',
+        'pluginLazyImportExclude',
+        'pluginEndpointIndex',
+        'pluginWarmReload',
+        'pluginLoadInParallel',
+        'pluginStartupProfile',
+    )
+
+    #: The directory settings, created by `PeekFileConfigABC.ensureDirs`
+    DIR_SETTING_NAMES = (
+        'tmpPath',
+        'platformSoftwarePath',
+        'pluginSoftwarePath',
+        'pluginZipPath',
+    )
+
     # --- Platform Logging
 
     @property
@@ -59,18 +94,60 @@ class PeekFileConfigPlatformMixin(metaclass=ABCMeta):
 
     @property
     def twistedThreadPoolSize(self) -> int:
+        """ Twisted Thread Pool Size
+
+        :return: The size of the reactors thread pool, or the maximum size if
+            twistedThreadPoolAdaptive is enabled.
+
+        """
         with self._cfg as c:
             count = c.twisted.threadPoolSize(500, require_integer)
 
-        # Ensure the thread count is high
+        # The adaptive maximum is right sized by measurement, so it's used as set
+        if self.twistedThreadPoolAdaptive:
+            return max(count, self.twistedThreadPoolMinSize)
+
+        # Ensure the thread count is high, this is also a compiled setting, so it
+        # doesn't write the upgraded value back to the config.
         if count < 50:
-            logger.info("Upgrading thread count from %s to %s", count, 500)
+            logger.debug("Upgrading thread count from %s to %s", count, 500)
             count = 500
-            with self._cfg as c:
-                c.twisted.threadPoolSize = count
 
         return count
 
+    @property
+    def twistedThreadPoolAdaptive(self) -> bool:
+        """ Twisted Thread Pool Adaptive
+
+        :return: True if the reactors thread pool grows and shrinks between
+            twistedThreadPoolMinSize and twistedThreadPoolSize, based on how long
+            work waits for a thread.
+
+        """
+        with self._cfg as c:
+            return c.twisted.threadPoolAdaptive(False, require_bool)
+
+    @property
+    def twistedThreadPoolMinSize(self) -> int:
+        with self._cfg as c:
+            return max(1, c.twisted.threadPoolMinSize(10, require_integer))
+
+    def _applyLoggingLevel(self, oldValue: str, newValue: str) -> None:
+        logging.root.setLevel(newValue)
+
+    def _applyTwistedThreadPoolSize(self, oldValue: int, newValue: int) -> None:
+        from twisted.internet import reactor
+        from peek_platform.util.ThreadPoolUtil import AdaptiveThreadPool
+
+        pool = reactor.getThreadPool()
+        if isinstance(pool, AdaptiveThreadPool):
+            pool.setLimits(self.settings.twistedThreadPoolMinSize, newValue)
+        else:
+            reactor.suggestThreadPoolSize(newValue)
+
+    def _applyTwistedThreadPoolMinSize(self, oldValue: int, newValue: int) -> None:
+        self._applyTwistedThreadPoolSize(None, self.settings.twistedThreadPoolSize)
+
     @property
     def autoPackageUpdate(self):
         with self._cfg as c:
@@ -130,6 +207,33 @@ class PeekFileConfigPlatformMixin(metaclass=ABCMeta):
         with self._cfg as c:
             c.plugin[pluginName].version = version
 
+    def pluginVersions(self) -> Dict[str, Optional[str]]:
+        """ Plugin Versions
+
+        The last versions that we know about, for all plugins, read in one access.
+
+        :return: A dict of {pluginName: version}
+
+        """
+        with self._cfg as c:
+            pluginCfg = c.plugin({}, require_dict)
+
+        return {name: value.get('version')
+                for name, value in pluginCfg.items()
+                if isinstance(value, dict) and 'version' in value}
+
+    def setPluginVersions(self, versionsByPluginName: Dict[str, str]) -> None:
+        """ Set Plugin Versions
+
+        Set the versions of many plugins, with one write of the config.
+
+        :param versionsByPluginName: A dict of {pluginName: version}
+
+        """
+        with self._cfg.transaction(), self._cfg as c:
+            for pluginName, version in versionsByPluginName.items():
+                c.plugin[pluginName].version = version
+
     # --- Plugins Installed
     @property
     def pluginsEnabled(self):
@@ -140,3 +244,165 @@ class PeekFileConfigPlatformMixin(metaclass=ABCMeta):
     def pluginsEnabled(self, value):
         with self._cfg as c:
             c.plugin.enabled = value
+
+    def pluginStartTimeout(self, pluginName: str) -> float:
+        """ Plugin Start Timeout
+
+        :return: The seconds to wait for the plugin to start, before starting the
+            other plugins with out it, plugin.startTimeout or the plugins own
+            plugin.<pluginName>.startTimeout
+
+        """
+        return self._pluginTimeout(pluginName, 'startTimeout')
+
+    def pluginStopTimeout(self, pluginName: str) -> float:
+        """ Plugin Stop Timeout
+
+        :return: The seconds to wait for the plugin to stop, plugin.stopTimeout or
+            the plugins own plugin.<pluginName>.stopTimeout
+
+        """
+        return self._pluginTimeout(pluginName, 'stopTimeout')
+
+    def pluginIsolated(self, pluginName: str) -> bool:
+        """ Plugin Isolated
+
+        :return: True if the plugin is run in its own process, with its own reactor,
+            plugin.<pluginName>.isolated, see `PluginIsolatedChild` for the plugins
+            that can be isolated.
+
+        """
+        with self._cfg as c:
+            pluginCfg = c.plugin({}, require_dict).get(pluginName)
+
+        if isinstance(pluginCfg, dict):
+            return bool(pluginCfg.get('isolated', False))
+
+        return False
+
+    def _pluginTimeout(self, pluginName: str, key: str) -> float:
+        with self._cfg as c:
+            default = c.plugin[key](60, require_integer)
+            pluginCfg = c.plugin({}, require_dict).get(pluginName)
+
+        if isinstance(pluginCfg, dict) and key in pluginCfg:
+            return float(pluginCfg[key])
+
+        return float(default)
+
+    @property
+    def pluginPrecompile(self) -> bool:
+        """ Plugin Precompile
+
+        :return: True if the platform and plugin packages are compiled to bytecode
+            when they are installed.
+
+        """
+        with self._cfg as c:
+            return c.plugin.precompile(True, require_bool)
+
+    @property
+    def pluginBytecodeInvalidationMode(self) -> str:
+        """ Plugin Bytecode Invalidation Mode
+
+        :return: How precompiled .pyc files are checked against their source,
+            "timestamp", "checked-hash" or "unchecked-hash"
+
+        """
+        from peek_platform.util.BytecodeUtil import INVALIDATION_MODES
+
+        with self._cfg as c:
+            mode = c.plugin.bytecodeInvalidationMode('checked-hash', require_string)
+
+        if mode in INVALIDATION_MODES:
+            return mode
+
+        logger.warning("Bytecode invalidation mode %s is not valid,"
+                       " defaulting to checked-hash", mode)
+        return 'checked-hash'
+
+    @property
+    def pluginZipImport(self) -> bool:
+        """ Plugin Zip Import
+
+        :return: True if each plugin's modules are packed into one zip file when it's
+            installed, and imported from it.
+
+        """
+        with self._cfg as c:
+            return c.plugin.zipImport(False, require_bool)
+
+    @property
+    def pluginZipPath(self) -> str:
+        default = os.path.join(self._homePath, 'plugin_zip')
+        with self._cfg as c:
+            return self._chkDir(c.plugin.zipPath(default, require_string))
+
+    @property
+    def pluginLazyImport(self) -> bool:
+        """ Plugin Lazy Import
+
+        :return: True if plugin submodules are only executed when they are first
+            used, rather than when they are imported.
+
+        """
+        with self._cfg as c:
+            return c.plugin.lazyImport(False, require_bool)
+
+    @property
+    def pluginLazyImportExclude(self) -> List[str]:
+        """ Plugin Lazy Import Exclude
+
+        :return: fnmatch patterns of plugin modules that are always imported normally.
+            Modules that declare tuples are always imported normally as well.
+
+        """
+        with self._cfg as c:
+            return c.plugin.lazyImportExclude(['*tuples*'], require_list)
+
+    @property
+    def pluginEndpointIndex(self) -> bool:
+        """ Plugin Endpoint Index
+
+        :return: True if payloads are only checked against the endpoints of the
+            plugin in their filter, see `PluginEndpointIndex`
+
+        """
+        with self._cfg as c:
+            return c.plugin.endpointIndex(False, require_bool)
+
+    @property
+    def pluginWarmReload(self) -> bool:
+        """ Plugin Warm Reload
+
+        :return: True if updated plugins are loaded along side the running version,
+            and switched to once they've loaded, see `PluginLoaderABC.warmReloadPlugin`
+
+        """
+        with self._cfg as c:
+            return c.plugin.warmReload(False, require_bool)
+
+    @property
+    def pluginStartupProfile(self) -> bool:
+        """ Plugin Startup Profile
+
+        :return: True if the time and memory each plugin takes to import, load, start
+            and stop is recorded, and written to plugin_startup_profile.json,
+            see `PluginStartupProfiler`
+
+        """
+        with self._cfg as c:
+            return c.plugin.startupProfile(False, require_bool)
+
+    @property
+    def pluginLoadInParallel(self) -> bool:
+        """ Plugin Load In Parallel
+
+        :return: True if plugins that don't depend on each other are imported and
+            started concurrently. Only enable this when every plugin declares the
+            plugins it needs in the "requiresPlugins" list of its plugin_package.json,
+            plugins that don't are treated as requiring nothing.
+
+        """
+        with self._cfg as c:
+            return c.plugin.loadInParallel(False, require_bool)
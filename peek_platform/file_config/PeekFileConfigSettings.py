@@ -0,0 +1,114 @@
+import logging
+from types import MappingProxyType
+from typing import Any, Dict, List, Type
+
+logger = logging.getLogger(__name__)
+
+
+class PeekFileConfigSettings:
+    """ Peek File Config Settings
+
+    This is the base class of the compiled settings objects, see `compileSettings`.
+
+    Each compiled settings class has one slot per setting listed in the SETTING_NAMES
+    of the file config class it was compiled from. The values are resolved and validated once,
+    so hot code can read them as plain attributes, with no jsoncfg lookups.
+
+    """
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Compiled settings are read only, set %s on the"
+                             " file config instead" % name)
+
+    def __delattr__(self, name):
+        raise AttributeError("Compiled settings are read only")
+
+    def _asDict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__,
+                           ', '.join('%s=%r' % i for i in self._asDict().items()))
+
+
+_settingsClassesByConfigClass: Dict[type, Type[PeekFileConfigSettings]] = {}
+
+
+def _settingNames(configClass: type, excludeClasses: tuple) -> List[str]:
+    names = []
+    for cls in reversed(configClass.__mro__):
+        if cls is object or cls in excludeClasses:
+            continue
+
+        for name in cls.__dict__.get('SETTING_NAMES', ()):
+            if not isinstance(getattr(configClass, name, None), property):
+                raise AttributeError("Setting %s of %s is not a property"
+                                     % (name, cls.__name__))
+
+            if name not in names:
+                names.append(name)
+
+    return names
+
+
+def _settingsClass(configClass: type,
+                   excludeClasses: tuple) -> Type[PeekFileConfigSettings]:
+    settingsClass = _settingsClassesByConfigClass.get(configClass)
+    if settingsClass:
+        return settingsClass
+
+    settingsClass = type('%sSettings' % configClass.__name__,
+                         (PeekFileConfigSettings,),
+                         {'__slots__': tuple(_settingNames(configClass,
+                                                           excludeClasses))})
+
+    _settingsClassesByConfigClass[configClass] = settingsClass
+    return settingsClass
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+
+    return value
+
+
+def compileSettings(config, *excludeClasses: type) -> PeekFileConfigSettings:
+    """ Compile Settings
+
+    Read the settings listed in the SETTING_NAMES of each class the config object is
+    composed of, and store the values in a new immutable settings object.
+
+    Only plain value properties are listed, properties that create directories or
+    rewrite the config are read directly from the config object.
+
+    Reading the properties runs their value mappers, so this validates those settings
+    at once.
+
+    :param config: The file config object, EG the services PeekFileConfig instance.
+    :param excludeClasses: Classes in the config classes MRO to not read properties
+        from.
+
+    :return: A new instance of the compiled settings class for this config class.
+
+    """
+    settingsClass = _settingsClass(type(config), excludeClasses)
+    settings = object.__new__(settingsClass)
+
+    for name in settingsClass.__slots__:
+        try:
+            value = _freeze(getattr(config, name))
+
+        except Exception as e:
+            logger.error("Config setting %s.%s is invalid",
+                         type(config).__name__, name)
+            logger.exception(e)
+            raise
+
+        object.__setattr__(settings, name, value)
+
+    return settings
@@ -0,0 +1,454 @@
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from jsoncfg.config_classes import ConfigJSONArray, ConfigJSONObject
+from jsoncfg.functions import load_config, config_to_json_str
+from twisted.internet import reactor
+
+logger = logging.getLogger(__name__)
+
+
+class PeekFileConfigAccessStat:
+    """ Peek File Config Access Stat
+
+    The access counts for one config property, see
+    `PeekFileConfigSnapshot.enableInstrumentation`
+
+    """
+    __slots__ = ('reads', 'writes', 'saves', 'seconds')
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self.saves = 0
+        self.seconds = 0.0
+
+    def toDict(self) -> Dict[str, float]:
+        return dict(reads=self.reads, writes=self.writes,
+                    saves=self.saves, seconds=self.seconds)
+
+
+class _TrackedDict(OrderedDict):
+    """ Tracked Dict
+
+    Replaces the dict of each ConfigJSONObject in a snapshot, to tell the snapshot
+    when the config is changed.
+
+    """
+
+    def __init__(self, snapshot: 'PeekFileConfigSnapshot', items):
+        OrderedDict.__init__(self)
+        self._snapshot = snapshot
+        for key, value in items:
+            OrderedDict.__setitem__(self, key, value)
+
+    def __setitem__(self, key, value):
+        OrderedDict.__setitem__(self, key, value)
+        self._snapshot._nodeChanged(value)
+
+    def __delitem__(self, key):
+        OrderedDict.__delitem__(self, key)
+        self._snapshot._nodeChanged()
+
+
+class _TrackedList(list):
+    """ Tracked List
+
+    Replaces the list of each ConfigJSONArray in a snapshot, to tell the snapshot
+    when the config is changed.
+
+    """
+
+    def __init__(self, snapshot: 'PeekFileConfigSnapshot', items):
+        list.__init__(self, items)
+        self._snapshot = snapshot
+
+    def append(self, value):
+        list.append(self, value)
+        self._snapshot._nodeChanged(value)
+
+    def insert(self, index, value):
+        list.insert(self, index, value)
+        self._snapshot._nodeChanged(value)
+
+    def extend(self, values):
+        values = list(values)
+        list.extend(self, values)
+        self._snapshot._nodeChanged(values)
+
+    def __setitem__(self, index, value):
+        list.__setitem__(self, index, value)
+        self._snapshot._nodeChanged(value)
+
+    def __delitem__(self, index):
+        list.__delitem__(self, index)
+        self._snapshot._nodeChanged()
+
+    def pop(self, *args):
+        value = list.pop(self, *args)
+        self._snapshot._nodeChanged()
+        return value
+
+    def remove(self, value):
+        list.remove(self, value)
+        self._snapshot._nodeChanged()
+
+
+class PeekFileConfigSnapshot:
+    """ Peek File Config Snapshot
+
+    This class keeps the parsed config.json in memory and serves the
+    ``with self._cfg as c:`` blocks of the file config mixins from it.
+
+    The file is only parsed again when its inode, mtime or size changes on disk,
+    and it's only written when the content of the snapshot has changed.
+
+    The dicts and lists of the snapshots jsoncfg nodes are replaced with ones that
+    count the changes made to them, so a change made through any jsoncfg method is
+    saved, and reads don't serialise the config. Changes are saved even if the with
+    block raises an exception, the same as jsoncfg's ConfigWithWrapper.
+
+    Writes are deferred, all the changes made in one reactor iteration, or in one
+    `transaction()` block, are written to disk with one atomic file replace.
+
+    """
+
+    #: How often (in seconds) the config file is stat'd to see if it has changed.
+    STAT_CHECK_INTERVAL = 2.0
+
+    def __init__(self, configFilePath: str, fileChmod: int = 0o600):
+        self._configFilePath = configFilePath
+        self._fileChmod = fileChmod
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._transactionDepth = 0
+        self._savePending = False
+        self._changeCount = 0
+        self._savedChangeCount = 0
+        self._saveCount = 0
+        self._generation = 0
+
+        self._instrumented = False
+        self._accessStats: Dict[str, PeekFileConfigAccessStat] = {}
+        self._accessStack = []
+        self._unsavedWriteNames = set()
+
+        self._root = None
+        self._savedJson = None
+        self._fileStatKey = None
+        self._lastStatCheck = 0.0
+
+        self._load()
+
+        reactor.addSystemEventTrigger('before', 'shutdown', self.save)
+
+    @property
+    def saveCount(self) -> int:
+        """ Save Count
+
+        :return: The number of times the config has been written to disk.
+
+        """
+        return self._saveCount
+
+    def enableInstrumentation(self, enabled: bool = True) -> None:
+        """ Enable Instrumentation
+
+        When enabled, every with block records the reads, writes, disk saves and time
+        spent against the name of the property (or method) it's in.
+
+        This adds a stack frame lookup and timing to every access, so it's for
+        diagnostics only.
+
+        """
+        with self._lock:
+            self._instrumented = enabled
+
+    def accessStats(self) -> Dict[str, PeekFileConfigAccessStat]:
+        """ Access Stats
+
+        :return: A copy of the access stats, keyed by property name.
+
+        """
+        with self._lock:
+            return dict(self._accessStats)
+
+    def resetAccessStats(self) -> None:
+        with self._lock:
+            self._accessStats = {}
+            self._unsavedWriteNames = set()
+
+    @property
+    def generation(self) -> int:
+        """ Generation
+
+        :return: A number that is incremented each time the config is reloaded from,
+            or written to disk.
+
+        """
+        return self._generation
+
+    @property
+    def savedJson(self) -> str:
+        """ Saved Json
+
+        :return: The config as it was last loaded from, or written to disk.
+
+        """
+        return self._savedJson
+
+    @property
+    def root(self):
+        """ Root
+
+        :return: The root jsoncfg node of the in memory config.
+
+        """
+        return self._root
+
+    def _statKey(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self._configFilePath)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _load(self) -> None:
+        self._fileStatKey = self._statKey()
+        self._root = load_config(self._configFilePath)
+        self._trackNode(self._root)
+        self._savedJson = config_to_json_str(self._root)
+        self._savedChangeCount = self._changeCount
+        self._lastStatCheck = time.monotonic()
+        self._generation += 1
+
+    def reloadIfChanged(self, force: bool = False) -> bool:
+        """ Reload If Changed
+
+        Reload the config from disk if the file has been replaced or modified since
+        we last loaded or wrote it.
+
+        :param force: Check the file now, rather than waiting for STAT_CHECK_INTERVAL
+        :return: True if the config was reloaded.
+
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._lastStatCheck < self.STAT_CHECK_INTERVAL:
+                return False
+
+            self._lastStatCheck = now
+
+            # Don't throw away changes that haven't been written yet
+            if self._savePending or self._hasUnsavedChanges():
+                return False
+
+            statKey = self._statKey()
+            if statKey is None or statKey == self._fileStatKey:
+                return False
+
+            logger.info("%s has changed on disk, reloading it",
+                        self._configFilePath)
+            self._load()
+            return True
+
+    @contextmanager
+    def transaction(self):
+        """ Transaction
+
+        All changes made within this block are written to disk in one write when the
+        outer most transaction block exits.
+
+        """
+        with self._lock:
+            self._transactionDepth += 1
+            try:
+                yield self._root
+
+            finally:
+                self._transactionDepth -= 1
+                if not self._transactionDepth and (self._savePending
+                                                   or self._hasUnsavedChanges()):
+                    self.save()
+
+    def save(self) -> None:
+        """ Save
+
+        Write the config to disk now, if it's different to what was last written.
+
+        """
+        with self._lock:
+            self._savePending = False
+            if self._hasUnsavedChanges():
+                self._saveIfChanged()
+
+    def _scheduleSave(self) -> None:
+        if self._savePending:
+            return
+
+        self._savePending = True
+
+        # The transaction will save it when it exits
+        if self._transactionDepth:
+            return
+
+        # If the reactor isn't running (startup, unit tests), then save it now.
+        if not reactor.running:
+            self.save()
+            return
+
+        # Coalesce everything else in this reactor iteration into the one write
+        reactor.callFromThread(self._saveLater)
+
+    def _saveLater(self) -> None:
+        try:
+            self.save()
+        except Exception as e:
+            logger.error("Failed to save %s", self._configFilePath)
+            logger.exception(e)
+
+    def _saveIfChanged(self) -> None:
+        # Changes may have set the values they already had
+        changeCount = self._changeCount
+        jsonStr = config_to_json_str(self._root)
+        if jsonStr == self._savedJson:
+            self._savedChangeCount = changeCount
+            return
+
+        self._writeAtomic(jsonStr)
+
+        self._savedJson = jsonStr
+        self._savedChangeCount = changeCount
+        self._fileStatKey = self._statKey()
+        self._saveCount += 1
+        self._generation += 1
+
+        for name in self._unsavedWriteNames:
+            self._accessStats[name].saves += 1
+        self._unsavedWriteNames = set()
+
+    def _writeAtomic(self, jsonStr: str) -> None:
+        """ Write Atomic
+
+        Write the new config to a temp file in the same directory, then rename it over
+        the top of the config file, so a crash never leaves a partially written file.
+
+        """
+        configDir = os.path.dirname(self._configFilePath)
+        fd, tmpPath = tempfile.mkstemp(dir=configDir, prefix='.config.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as fobj:
+                fobj.write(jsonStr)
+                fobj.flush()
+                os.fsync(fobj.fileno())
+
+            os.chmod(tmpPath, self._fileChmod)
+            os.replace(tmpPath, self._configFilePath)
+
+        except Exception:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            raise
+
+    def __enter__(self):
+        self._lock.acquire()
+        if not self._depth:
+            self.reloadIfChanged()
+
+        self._depth += 1
+
+        if self._instrumented:
+            code = sys._getframe(1).f_code
+            self._accessStack.append((getattr(code, 'co_qualname', code.co_name),
+                                      self._changeCount,
+                                      time.perf_counter()))
+
+        return self._root
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if self._instrumented and self._accessStack:
+                self._recordAccess()
+
+            self._depth -= 1
+
+            # The transaction saves the changes when it exits
+            if (not self._depth and not self._transactionDepth
+                    and self._hasUnsavedChanges()):
+                self._scheduleSave()
+
+        finally:
+            self._lock.release()
+
+    def _hasUnsavedChanges(self) -> bool:
+        return self._changeCount != self._savedChangeCount
+
+    def _nodeChanged(self, node=None) -> None:
+        self._changeCount += 1
+        self._trackNode(node)
+
+    def _trackNode(self, node) -> None:
+        """ Track Node
+
+        Replace the dicts and lists of this node and the nodes under it, with ones
+        that count their changes in this snapshot.
+
+        """
+        nodes = [node]
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, ConfigJSONObject):
+                if not isinstance(node._dict, _TrackedDict):
+                    node._dict = _TrackedDict(self, node._dict.items())
+                nodes.extend(node._dict.values())
+
+            elif isinstance(node, ConfigJSONArray):
+                if not isinstance(node._list, _TrackedList):
+                    node._list = _TrackedList(self, node._list)
+                nodes.extend(node._list)
+
+            elif isinstance(node, list):
+                nodes.extend(node)
+
+    def _recordAccess(self) -> None:
+        name, changeCountBefore, startTime = self._accessStack.pop()
+
+        stat = self._accessStats.get(name)
+        if stat is None:
+            stat = self._accessStats[name] = PeekFileConfigAccessStat()
+
+        stat.seconds += time.perf_counter() - startTime
+
+        if changeCountBefore == self._changeCount:
+            stat.reads += 1
+        else:
+            stat.writes += 1
+            self._unsavedWriteNames.add(name)
+
+    # ---------------
+    # For direct usage, with out the with block
+
+    def __getattr__(self, item):
+        root = self.__dict__.get('_root')
+        if root is None:
+            raise AttributeError(item)
+        return getattr(root, item)
+
+    def __getitem__(self, item):
+        return self._root[item]
+
+    def __setitem__(self, item, value):
+        self._root[item] = value
+
+    def __contains__(self, item):
+        return item in self._root
+
+    def __call__(self, *args):
+        return self._root(*args)
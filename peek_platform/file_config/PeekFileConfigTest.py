@@ -1,7 +1,9 @@
+import json
 import logging
 import os
 import shutil
 import unittest
+from unittest import mock
 
 import peek_platform
 from jsoncfg.functions import config_to_json_str
@@ -108,3 +110,202 @@ class PeekFileConfigTest(unittest.TestCase):
 
         self.assertEqual(bas.platformVersion, '4.4.4')
         self.assertEqual(bas.pluginVersion(pluginName), '2.5.6')
+
+    def testPluginVersions(self):
+        TestFileConfig._PeekFileConfigABC__instance = None
+        bas = TestFileConfig()
+
+        saveCountBefore = bas.configSaveCount
+        bas.setPluginVersions({'plugin_one': '1.0.0', 'plugin_two': '2.0.0'})
+        self.assertEqual(bas.configSaveCount, saveCountBefore + 1)
+
+        self.assertEqual(bas.pluginVersions(),
+                         {'plugin_one': '1.0.0', 'plugin_two': '2.0.0'})
+        self.assertEqual(bas.pluginVersion('plugin_two'), '2.0.0')
+
+    def testSnapshotReload(self):
+        TestFileConfig._PeekFileConfigABC__instance = None
+        bas = TestFileConfig()
+        self.assertEqual(bas.loggingLevel, 'INFO')
+
+        # Reading a value that's already in the file must not write the file
+        mtimeBefore = os.stat(self.CONFIG_FILE_PATH).st_mtime_ns
+        self.assertEqual(bas.loggingLevel, 'INFO')
+        self.assertEqual(os.stat(self.CONFIG_FILE_PATH).st_mtime_ns, mtimeBefore)
+
+        with open(self.CONFIG_FILE_PATH, 'w') as fobj:
+            fobj.write('{"logging":{"level":"DEBUG"}}')
+
+        self.assertTrue(bas._cfg.reloadIfChanged(force=True))
+        self.assertEqual(bas.loggingLevel, 'DEBUG')
+
+    def testTransactionSavesOnce(self):
+        TestFileConfig._PeekFileConfigABC__instance = None
+        bas = TestFileConfig()
+        saveCountBefore = bas.configSaveCount
+
+        with bas.configTransaction():
+            for num in range(20):
+                bas.setPluginVersion('plugin_noop%s' % num, '1.0.%s' % num)
+            bas.platformVersion = '4.4.4'
+
+        self.assertEqual(bas.configSaveCount, saveCountBefore + 1)
+
+        with open(self.CONFIG_FILE_PATH, 'r') as fobj:
+            self.assertIn('"1.0.19"', fobj.read())
+
+        self.assertEqual([], [f for f in os.listdir(self.HOME_DIR)
+                              if f.endswith('.tmp')])
+
+    def testCompiledSettings(self):
+        TestFileConfig._PeekFileConfigABC__instance = None
+        bas = TestFileConfig()
+
+        settings = bas.compileSettings()
+        self.assertEqual(settings.loggingLevel, 'INFO')
+        self.assertEqual(settings.peekServerHost, '127.0.0.1')
+        self.assertIs(bas.settings, settings)
+
+        with self.assertRaises(AttributeError):
+            settings.loggingLevel = 'DEBUG'
+
+        bas.platformVersion = '4.4.4'
+        self.assertEqual(bas.settings.platformVersion, '4.4.4')
+
+        # Only plain value settings are compiled
+        self.assertNotIn('tmpPath', type(settings).__slots__)
+        self.assertFalse(os.path.exists(os.path.join(self.HOME_DIR, 'tmp')))
+
+    def testCompiledSettingsKeptWhenUnchanged(self):
+        TestFileConfig._PeekFileConfigABC__instance = None
+        bas = TestFileConfig()
+        settings = bas.settings
+
+        # Saving an unrelated value doesn't change any setting
+        bas.setPluginVersion('plugin_noop', '1.0.0')
+        self.assertIs(bas.settings, settings)
+
+        bas.platformVersion = '4.4.4'
+        self.assertIsNot(bas.settings, settings)
+
+    def testAccessInstrumentation(self):
+        TestFileConfig._PeekFileConfigABC__instance = None
+        bas = TestFileConfig()
+        bas.enableConfigInstrumentation()
+
+        bas.loggingLevel  # Writes the default
+        bas.loggingLevel
+        bas.platformVersion = '4.4.4'
+
+        stats = {name.split('.')[-1]: stat
+                 for name, stat in bas.configAccessStats().items()}
+
+        self.assertEqual(stats['loggingLevel']['reads'], 1)
+        self.assertEqual(stats['loggingLevel']['writes'], 1)
+        self.assertEqual(stats['platformVersion']['writes'], 1)
+        self.assertEqual(stats['platformVersion']['saves'], 1)
+
+        bas.logConfigAccessStats()
+
+    def testEnsureDirs(self):
+        TestFileConfig._PeekFileConfigABC__instance = None
+        bas = TestFileConfig()
+        bas.pluginsEnabled = ['plugin_noop']
+
+        bas.ensureDirs()
+
+        self.assertTrue(os.path.isdir(bas.tmpPath))
+        self.assertTrue(os.path.isdir(bas.pluginDataPath('plugin_noop')))
+        self.assertIn(bas.tmpPath, bas._verifiedDirs)
+
+    def testSubscriptions(self):
+        TestFileConfig._PeekFileConfigABC__instance = None
+        bas = TestFileConfig()
+        self.assertEqual(bas.loggingLevel, 'INFO')
+
+        changes = []
+        bas.subscribe('loggingLevel', lambda old, new: changes.append((old, new)))
+        bas.startConfigWatcher()
+
+        try:
+            with open(self.CONFIG_FILE_PATH, 'w') as fobj:
+                fobj.write('{"logging":{"level":"DEBUG"}}')
+
+            bas._checkConfigChanged()
+            self.assertEqual(changes, [('INFO', 'DEBUG')])
+
+            bas._checkConfigChanged()
+            self.assertEqual(len(changes), 1)
+
+        finally:
+            bas.stopConfigWatcher()
+
+    def testThreadPoolSize(self):
+        TestFileConfig._PeekFileConfigABC__instance = None
+        bas = TestFileConfig()
+        self.assertFalse(bas.twistedThreadPoolAdaptive)
+
+        # Small fixed pools are upgraded
+        bas._cfg.twisted.threadPoolSize = 20
+        self.assertEqual(bas.twistedThreadPoolSize, 500)
+
+        # An adaptive maximum is used as set, but not below the minimum
+        bas._cfg.twisted.threadPoolAdaptive = True
+        self.assertEqual(bas.twistedThreadPoolSize, 20)
+
+        bas._cfg.twisted.threadPoolMinSize = 30
+        self.assertEqual(bas.twistedThreadPoolSize, 30)
+
+    def testChangesThroughAnyMethodAreSaved(self):
+        TestFileConfig._PeekFileConfigABC__instance = None
+        bas = TestFileConfig()
+        saveCountBefore = bas.configSaveCount
+
+        # Reads of values that are already set must not save
+        with bas._cfg as c:
+            c.nothing.is_true()
+        self.assertEqual(bas.configSaveCount, saveCountBefore)
+
+        with bas._cfg as c:
+            c.op1.arr = [1]
+            setattr(c.op1, 'thingx', 'valuex')
+            c.op1.arr.append(2)
+        self.assertEqual(bas.configSaveCount, saveCountBefore + 1)
+
+        with open(self.CONFIG_FILE_PATH, 'r') as fobj:
+            data = json.load(fobj)
+        self.assertEqual(data['op1'], {'arr': [1, 2], 'thingx': 'valuex'})
+
+    def testReadsDontSerialiseTheConfig(self):
+        TestFileConfig._PeekFileConfigABC__instance = None
+        bas = TestFileConfig()
+        bas.loggingLevel  # Writes the default
+
+        snapshotModule = 'peek_platform.file_config.PeekFileConfigSnapshot'
+        with mock.patch(snapshotModule + '.config_to_json_str',
+                        wraps=config_to_json_str) as toJsonStr:
+            for _ in range(10):
+                self.assertEqual(bas.loggingLevel, 'INFO')
+                with bas._cfg as c:
+                    c.nothing.is_true()
+
+            self.assertEqual(toJsonStr.call_count, 0)
+
+            # Setting a value to what it already is, serialises but doesn't write
+            saveCountBefore = bas.configSaveCount
+            with bas._cfg as c:
+                c.nothing.is_true = True
+            self.assertEqual(toJsonStr.call_count, 1)
+            self.assertEqual(bas.configSaveCount, saveCountBefore)
+
+    def testChangesAreSavedWhenTheBlockRaises(self):
+        TestFileConfig._PeekFileConfigABC__instance = None
+        bas = TestFileConfig()
+
+        with self.assertRaises(ValueError):
+            with bas._cfg as c:
+                c.op1.thingx = 'valuex'
+                raise ValueError("Failed after the change")
+
+        with open(self.CONFIG_FILE_PATH, 'r') as fobj:
+            self.assertEqual(json.load(fobj)['op1'], {'thingx': 'valuex'})
@@ -8,6 +8,20 @@ logger = logging.getLogger(__name__)
 
 
 class PeekFileConfigWorkerMixin:
+    #: The plain value settings, compiled by `PeekFileConfigABC.compileSettings`
+    SETTING_NAMES = (
+        'celeryBrokerUrl',
+        'celeryResultUrl',
+        'celeryWorkerCount',
+        'celeryTaskPrefetch',
+        'celeryReplaceWorkerAfterTaskCount',
+        'celeryReplaceWorkerAfterMemUsage',
+        'celeryConnectionPoolSize',
+        'celeryConnectionRecycleTime',
+        'celeryPlPythonEnablePatch',
+        'celeryPlPythonWorkerCount',
+    )
+
     @property
     def celeryBrokerUrl(self) -> str:
         # for BROKER_URL
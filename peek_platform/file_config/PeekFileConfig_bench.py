@@ -0,0 +1,89 @@
+""" Peek File Config Benchmarks
+
+Run with ::
+
+    pytest peek_platform/file_config/PeekFileConfig_bench.py
+
+"""
+import json
+import os
+import shutil
+
+import pytest
+
+import peek_platform
+from peek_platform.file_config import PeekFileConfigTest as configTest
+from peek_platform.file_config.PeekFileConfigTest import TestFileConfig
+
+PLUGIN_COUNTS = [10, 50, 100, 500]
+
+COMPONENT_NAME = configTest.PeekFileConfigTest.COMPONENT_NAME
+HOME_DIR = configTest.PeekFileConfigTest.HOME_DIR
+CONFIG_FILE_PATH = configTest.PeekFileConfigTest.CONFIG_FILE_PATH
+
+
+@pytest.fixture(params=PLUGIN_COUNTS)
+def config(request):
+    pluginCount = request.param
+
+    if os.path.exists(HOME_DIR):
+        shutil.rmtree(HOME_DIR)
+    os.makedirs(HOME_DIR, TestFileConfig.DEFAULT_DIR_CHMOD)
+
+    pluginNames = ['peek_plugin_bench%s' % num for num in range(pluginCount)]
+    pluginSection = {name: {'version': '1.0.0'} for name in pluginNames}
+    pluginSection['enabled'] = pluginNames
+
+    with open(CONFIG_FILE_PATH, 'w') as fobj:
+        json.dump({'plugin': pluginSection}, fobj)
+
+    TestFileConfig._PeekFileConfigABC__instance = None
+    peek_platform.PeekPlatformConfig.componentName = COMPONENT_NAME
+
+    cfg = TestFileConfig()
+    cfg.compileSettings()
+    cfg.pluginNames = pluginNames
+
+    yield cfg
+
+    shutil.rmtree(HOME_DIR)
+
+
+def testPropertyRead(benchmark, config):
+    benchmark(lambda: config.loggingLevel)
+
+
+def testPluginVersionRead(benchmark, config):
+    pluginName = config.pluginNames[-1]
+    benchmark(config.pluginVersion, pluginName)
+
+
+def testPluginVersionsRead(benchmark, config):
+    benchmark(config.pluginVersions)
+
+
+def testPluginsEnabledRead(benchmark, config):
+    benchmark(lambda: config.pluginsEnabled)
+
+
+def testCompiledSettingsRead(benchmark, config):
+    benchmark(lambda: config.settings.loggingLevel)
+
+
+def testSetterThroughput(benchmark, config):
+    def setAll():
+        with config.configTransaction():
+            for pluginName in config.pluginNames:
+                config.setPluginVersion(pluginName, '2.0.0')
+            config.setPluginVersion(config.pluginNames[0], '1.0.0')
+
+    benchmark(setAll)
+
+
+def testSetterEachSaves(benchmark, config):
+    pluginName = config.pluginNames[0]
+    versions = iter(range(10 ** 9))
+
+    benchmark.pedantic(
+        lambda: config.setPluginVersion(pluginName, '3.0.%s' % next(versions)),
+        rounds=20)
@@ -0,0 +1,106 @@
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PluginDependencyGraph:
+    """ Plugin Dependency Graph
+
+    This class orders plugins by the plugins they require, as declared by the
+    "requiresPlugins" list in their plugin_package.json.
+
+    Plugins in the same level don't depend on each other, so they can be loaded,
+    started or stopped concurrently.
+
+    """
+
+    def __init__(self, pluginNames: Iterable[str],
+                 requiresPluginsByPluginName: Dict[str, Iterable[str]]):
+        """ Constructor
+
+        :param pluginNames: The plugin names, in their configured order.
+        :param requiresPluginsByPluginName: The plugins each plugin requires.
+            Required plugins that aren't in pluginNames are ignored, EG core plugins
+            that have already been loaded.
+
+        """
+        self._pluginNames = list(pluginNames)
+
+        names = set(self._pluginNames)
+        self._requiresByPluginName: Dict[str, List[str]] = {
+            name: [r for r in requiresPluginsByPluginName.get(name, ())
+                   if r in names and r != name]
+            for name in self._pluginNames
+        }
+
+        self._levels = None
+
+    @property
+    def pluginNames(self) -> List[str]:
+        return list(self._pluginNames)
+
+    def requires(self, pluginName: str) -> List[str]:
+        return list(self._requiresByPluginName.get(pluginName, ()))
+
+    def levels(self) -> List[List[str]]:
+        """ Levels
+
+        :return: A list of levels, each level is a list of plugin names that only
+            require plugins from the levels before it.
+            Plugins keep their configured order within each level.
+
+        """
+        if self._levels is None:
+            self._levels = self._buildLevels()
+
+        return [list(level) for level in self._levels]
+
+    def _buildLevels(self) -> List[List[str]]:
+        levels = []
+        placed = set()
+        remaining = list(self._pluginNames)
+
+        while remaining:
+            level = [name for name in remaining
+                     if all(r in placed for r in self._requiresByPluginName[name])]
+
+            if not level:
+                logger.error("Plugins have circular requiresPlugins, they will be"
+                             " processed in their configured order : %s", remaining)
+                levels.extend([name] for name in remaining)
+                break
+
+            levels.append(level)
+            placed.update(level)
+            remaining = [name for name in remaining if name not in placed]
+
+        return levels
+
+    def criticalPath(self, secondsByPluginName: Dict[str, float]
+                     ) -> Tuple[float, List[str]]:
+        """ Critical Path
+
+        Find the chain of required plugins that took the longest, this is what bounds
+        the time it takes to process all the plugins concurrently.
+
+        :param secondsByPluginName: The time each plugin took.
+        :return: A tuple of (total seconds, [pluginName, ...])
+
+        """
+        pathByPluginName: Dict[str, Tuple[float, List[str]]] = {}
+
+        for level in self.levels():
+            for name in level:
+                before = max((pathByPluginName[r]
+                              for r in self._requiresByPluginName[name]
+                              if r in pathByPluginName),
+                             key=lambda p: p[0], default=(0.0, []))
+
+                pathByPluginName[name] = (
+                    before[0] + secondsByPluginName.get(name, 0.0),
+                    before[1] + [name]
+                )
+
+        return max(pathByPluginName.values(), key=lambda p: p[0],
+                   default=(0.0, []))
@@ -0,0 +1,55 @@
+import unittest
+
+from peek_platform.plugin.PluginDependencyGraph import PluginDependencyGraph
+
+
+class PluginDependencyGraphTest(unittest.TestCase):
+
+    def testIndependentPluginsShareALevel(self):
+        graph = PluginDependencyGraph(['plugin_a', 'plugin_b', 'plugin_c'], {})
+        self.assertEqual(graph.levels(), [['plugin_a', 'plugin_b', 'plugin_c']])
+
+    def testLevelsFollowRequires(self):
+        graph = PluginDependencyGraph(
+            ['plugin_c', 'plugin_b', 'plugin_a', 'plugin_d'],
+            {'plugin_c': ['plugin_b'],
+             'plugin_b': ['plugin_a'],
+             'plugin_d': ['plugin_a']})
+
+        self.assertEqual(graph.levels(),
+                         [['plugin_a'], ['plugin_b', 'plugin_d'], ['plugin_c']])
+
+    def testUnknownAndSelfRequiresAreIgnored(self):
+        graph = PluginDependencyGraph(
+            ['plugin_a', 'plugin_b'],
+            {'plugin_a': ['plugin_a', 'peek_core_device'],
+             'plugin_b': ['plugin_a']})
+
+        self.assertEqual(graph.requires('plugin_a'), [])
+        self.assertEqual(graph.levels(), [['plugin_a'], ['plugin_b']])
+
+    def testChainedRequiresAreSequential(self):
+        names = ['plugin_a', 'plugin_b', 'plugin_c']
+        graph = PluginDependencyGraph(
+            names, {name: names[i - 1:i] for i, name in enumerate(names)})
+
+        self.assertEqual(graph.levels(), [['plugin_a'], ['plugin_b'], ['plugin_c']])
+
+    def testCircularRequiresKeepConfiguredOrder(self):
+        graph = PluginDependencyGraph(
+            ['plugin_x', 'plugin_a', 'plugin_b'],
+            {'plugin_a': ['plugin_b'], 'plugin_b': ['plugin_a']})
+
+        self.assertEqual(graph.levels(),
+                         [['plugin_x'], ['plugin_a'], ['plugin_b']])
+
+    def testCriticalPath(self):
+        graph = PluginDependencyGraph(
+            ['plugin_a', 'plugin_b', 'plugin_c'],
+            {'plugin_b': ['plugin_a']})
+
+        seconds, path = graph.criticalPath(
+            {'plugin_a': 1.0, 'plugin_b': 2.0, 'plugin_c': 2.5})
+
+        self.assertEqual(path, ['plugin_a', 'plugin_b'])
+        self.assertAlmostEqual(seconds, 3.0)
@@ -0,0 +1,158 @@
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from vortex.PayloadEnvelope import PayloadEnvelope
+from vortex.PayloadIO import PayloadIO
+
+from peek_platform.plugin.PluginRegistrationTracker import PluginRegistrationTracker
+
+logger = logging.getLogger(__name__)
+
+
+class _PayloadIoView:
+    """ PayloadIO View
+
+    This stands in for PayloadIO when its original process method is called, with
+    only the candidate endpoints. Everything else is PayloadIO's own.
+
+    """
+    __slots__ = ('_payloadIo', '_endpoints')
+
+    def __init__(self, payloadIo: PayloadIO, endpoints: List):
+        self._payloadIo = payloadIo
+        self._endpoints = endpoints
+
+    def __getattr__(self, name):
+        return getattr(self._payloadIo, name)
+
+
+class PluginEndpointIndex:
+    """ Plugin Endpoint Index
+
+    This class indexes the vortex PayloadEndpoints by the "plugin" key of their
+    filters, so PayloadIO only checks the endpoints of the plugin a payload is for,
+    rather than every endpoint registered in the service.
+
+    An endpoint only matches a payload if every key in the endpoints filter is in the
+    payloads filter, with the same value. So an endpoint with a "plugin" key can only
+    match payloads with the same "plugin" value, and the endpoints without one are
+    checked for every payload. `sanityCheckServerPlugin` ensures plugin endpoints
+    have the key.
+
+    Dispatch is then O(endpoints of the plugin) rather than O(all endpoints).
+
+    The endpoints are followed with `PluginRegistrationTracker.observeEndpoints`, and
+    vortex's own PayloadIO.process is still called, with only the candidate endpoints.
+    This relies on PayloadIO.process dispatching from PayloadIO._endpoints, if a
+    vortex version doesn't, PayloadIO.process is left as it is, see `active`.
+
+    """
+
+    __instance = None
+
+    def __new__(cls):
+        if cls.__instance is None:
+            cls.__instance = object.__new__(cls)
+            cls.__instance.__singletonInit()
+        return cls.__instance
+
+    def __singletonInit(self):
+        self._lock = threading.Lock()
+        self._endpointsByPluginName: Dict[Optional[str], Set] = defaultdict(set)
+
+        # Follow the endpoints through the registration trackers PayloadIO hook
+        PluginRegistrationTracker().observeEndpoints(self.add, self.remove)
+        self._active = self._patchPayloadIoProcess()
+
+        # Index the endpoints registered before the index was installed
+        for endpoint in PayloadIO().endpoints:
+            self.add(endpoint)
+
+    @property
+    def active(self) -> bool:
+        """ Active
+
+        :return: True if PayloadIO.process dispatches through the index.
+
+        """
+        return self._active
+
+    def _patchPayloadIoProcess(self) -> bool:
+        """ Patch PayloadIO Process
+
+        Wrap PayloadIO.process, so vortex still logs and dispatches the payload, but
+        only iterates over the endpoints that can match it.
+
+        :return: True if PayloadIO.process was wrapped.
+
+        """
+        index = self
+        payloadIoProcess = PayloadIO.process
+
+        if not self._processUsesEndpoints(payloadIoProcess):
+            logger.warning("This vortex version's PayloadIO.process doesn't dispatch"
+                           " from PayloadIO._endpoints, the plugin endpoint index"
+                           " is disabled")
+            return False
+
+        def process(payloadIo, payloadEnvelope: PayloadEnvelope, *args, **kwargs):
+            candidates = index.candidateEndpoints(payloadEnvelope.filt)
+            return payloadIoProcess(_PayloadIoView(payloadIo, candidates),
+                                    payloadEnvelope, *args, **kwargs)
+
+        PayloadIO.process = process
+        return True
+
+    @staticmethod
+    def _processUsesEndpoints(payloadIoProcess) -> bool:
+        code = getattr(payloadIoProcess, '__code__', None)
+        return (code is not None and '_endpoints' in code.co_names
+                and isinstance(vars(PayloadIO()).get('_endpoints'), (set, list)))
+
+    @staticmethod
+    def _indexKey(endpoint) -> Optional[str]:
+        return endpoint.filt.get('plugin')
+
+    def add(self, endpoint) -> None:
+        with self._lock:
+            self._endpointsByPluginName[self._indexKey(endpoint)].add(endpoint)
+
+    def remove(self, endpoint) -> None:
+        key = self._indexKey(endpoint)
+        with self._lock:
+            endpoints = self._endpointsByPluginName.get(key)
+            if endpoints is None:
+                return
+
+            endpoints.discard(endpoint)
+            if not endpoints:
+                del self._endpointsByPluginName[key]
+
+    def candidateEndpoints(self, filt: dict) -> List:
+        """ Candidate Endpoints
+
+        :return: The endpoints that could match a payload with this filter, the
+            plugins endpoints and the endpoints with no "plugin" key.
+
+        """
+        pluginName = filt.get('plugin')
+
+        with self._lock:
+            candidates = list(self._endpointsByPluginName.get(None, ()))
+            if pluginName is not None:
+                candidates.extend(self._endpointsByPluginName.get(pluginName, ()))
+
+        return candidates
+
+    def matchingEndpoints(self, payloadEnvelope: PayloadEnvelope,
+                          vortexName: str) -> List:
+        return [endpoint
+                for endpoint in self.candidateEndpoints(payloadEnvelope.filt)
+                if endpoint.check(payloadEnvelope, vortexName)]
+
+    def endpointCountsByPluginName(self) -> Dict[Optional[str], int]:
+        with self._lock:
+            return {key: len(endpoints)
+                    for key, endpoints in self._endpointsByPluginName.items()}
@@ -0,0 +1,100 @@
+from collections import defaultdict
+
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks
+from twisted.internet.task import deferLater
+from twisted.trial import unittest
+from vortex.PayloadEndpoint import PayloadEndpoint
+from vortex.PayloadEnvelope import PayloadEnvelope
+from vortex.PayloadIO import PayloadIO
+
+from peek_platform.plugin.PluginEndpointIndex import PluginEndpointIndex
+from peek_platform.plugin.PluginRegistrationTracker import PluginRegistrationTracker
+
+VORTEX_NAME = 'peekClient'
+
+
+class PluginEndpointIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self._index = PluginEndpointIndex()
+        self._payloadsByName = defaultdict(list)
+        self._endpoints = []
+        self._handlers = []
+
+    def tearDown(self):
+        for endpoint in self._endpoints:
+            PayloadIO().remove(endpoint)
+
+    def _addEndpoint(self, name: str, filt: dict) -> PayloadEndpoint:
+        def handler(payloadEnvelope, *args, **kwargs):
+            self._payloadsByName[name].append(payloadEnvelope.filt)
+
+        # PayloadEndpoint only holds a weak reference to the handler
+        endpoint = PayloadEndpoint(filt, handler)
+        self._endpoints.append(endpoint)
+        self._handlers.append(handler)
+        return endpoint
+
+    @inlineCallbacks
+    def _process(self, filt: dict):
+        PayloadIO().process(PayloadEnvelope(filt=filt), 'uuid', VORTEX_NAME,
+                            None, lambda *args, **kwargs: None)
+
+        # PayloadIO dispatches to the endpoints with reactor.callLater
+        yield deferLater(reactor, 0.05, lambda: None)
+
+    @inlineCallbacks
+    def testPayloadsOnlyReachTheirPlugin(self):
+        self._addEndpoint('a', {'plugin': 'peek_plugin_index_a', 'key': 'data'})
+        self._addEndpoint('b', {'plugin': 'peek_plugin_index_b', 'key': 'data'})
+
+        yield self._process({'plugin': 'peek_plugin_index_a', 'key': 'data'})
+
+        self.assertEqual(len(self._payloadsByName['a']), 1)
+        self.assertEqual(self._payloadsByName['b'], [])
+
+    @inlineCallbacks
+    def testEndpointsWithoutAPluginGetPayloads(self):
+        self._addEndpoint('noPlugin', {'key': 'peek_index_test.data'})
+
+        yield self._process({'plugin': 'peek_plugin_index_a',
+                             'key': 'peek_index_test.data'})
+        yield self._process({'key': 'peek_index_test.data'})
+
+        self.assertEqual(len(self._payloadsByName['noPlugin']), 2)
+
+    def testRemovedEndpointsAreForgotten(self):
+        endpoint = self._addEndpoint('a', {'plugin': 'peek_plugin_index_c',
+                                           'key': 'data'})
+        filt = {'plugin': 'peek_plugin_index_c', 'key': 'data'}
+        self.assertIn(endpoint, self._index.candidateEndpoints(filt))
+
+        PayloadIO().remove(endpoint)
+        self.assertNotIn(endpoint, self._index.candidateEndpoints(filt))
+        self.assertNotIn('peek_plugin_index_c',
+                         self._index.endpointCountsByPluginName())
+
+    def testTheTrackerIsTheOnlyPayloadIoHook(self):
+        # Creating the tracker patched add and remove, the index only observes them
+        for method in (PayloadIO.add, PayloadIO.remove):
+            self.assertTrue(method.__qualname__.startswith(
+                'PluginRegistrationTracker._patchRegistrations.'))
+
+        self.assertIn((self._index.add, self._index.remove),
+                      PluginRegistrationTracker()._endpointObservers)
+
+    @inlineCallbacks
+    def testVortexWithoutEndpointsFallsBack(self):
+        self.assertTrue(self._index.active)
+
+        # A vortex version that no longer dispatches from PayloadIO._endpoints
+        def process(payloadIo, payloadEnvelope, *args, **kwargs):
+            self._payloadsByName['fallback'].append(payloadEnvelope.filt)
+
+        self.patch(PayloadIO, 'process', process)
+        self.assertFalse(self._index._patchPayloadIoProcess())
+        self.assertIs(PayloadIO.process, process)
+
+        yield self._process({'plugin': 'peek_plugin_index_a', 'key': 'data'})
+        self.assertEqual(len(self._payloadsByName['fallback']), 1)
@@ -0,0 +1,78 @@
+""" Plugin Endpoint Index Benchmarks
+
+Compare checking every endpoint in PayloadIO, with checking only the endpoints of
+the payloads plugin, as the number of plugins grows.
+
+Run with ::
+
+    pytest peek_platform/plugin/PluginEndpointIndex_bench.py
+
+"""
+import pytest
+from vortex.PayloadEndpoint import PayloadEndpoint
+from vortex.PayloadEnvelope import PayloadEnvelope
+from vortex.PayloadIO import PayloadIO
+
+from peek_platform.plugin.PluginEndpointIndex import PluginEndpointIndex
+
+PLUGIN_COUNTS = [10, 50, 100, 500]
+
+ENDPOINTS_PER_PLUGIN = 20
+
+VORTEX_NAME = 'peekClient'
+
+
+def _handler(*args, **kwargs):
+    pass
+
+
+@pytest.fixture(params=PLUGIN_COUNTS)
+def endpoints(request):
+    pluginCount = request.param
+
+    index = PluginEndpointIndex()
+
+    endpoints = [PayloadEndpoint({'plugin': 'peek_plugin_bench%s' % pluginNum,
+                                  'key': 'bench.endpoint%s' % endpointNum},
+                                 _handler)
+                 for pluginNum in range(pluginCount)
+                 for endpointNum in range(ENDPOINTS_PER_PLUGIN)]
+
+    # The payload for the last endpoint of the last plugin
+    payloadEnvelope = PayloadEnvelope(
+        filt={'plugin': 'peek_plugin_bench%s' % (pluginCount - 1),
+              'key': 'bench.endpoint%s' % (ENDPOINTS_PER_PLUGIN - 1)})
+
+    yield index, payloadEnvelope
+
+    for endpoint in endpoints:
+        PayloadIO().remove(endpoint)
+
+
+def testAllEndpointsDispatch(benchmark, endpoints):
+    index, payloadEnvelope = endpoints
+
+    def matchAll():
+        return [e for e in PayloadIO().endpoints
+                if e.check(payloadEnvelope, VORTEX_NAME)]
+
+    assert len(benchmark(matchAll)) == 1
+
+
+def testIndexedDispatch(benchmark, endpoints):
+    index, payloadEnvelope = endpoints
+
+    matched = benchmark(index.matchingEndpoints, payloadEnvelope, VORTEX_NAME)
+    assert len(matched) == 1
+
+
+def testIndexMatchesAllEndpoints(endpoints):
+    index, payloadEnvelope = endpoints
+
+    for filt in ({'plugin': 'peek_plugin_bench0', 'key': 'bench.endpoint0'},
+                 {'plugin': 'peek_plugin_missing'},
+                 {'key': 'bench.endpoint0'}):
+        envelope = PayloadEnvelope(filt=filt)
+        expected = {e for e in PayloadIO().endpoints
+                    if e.check(envelope, VORTEX_NAME)}
+        assert set(index.matchingEndpoints(envelope, VORTEX_NAME)) == expected
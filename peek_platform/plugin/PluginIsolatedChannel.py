@@ -0,0 +1,59 @@
+import json
+import logging
+from base64 import b64encode, b64decode
+from typing import Callable, Dict, List, Union
+
+from twisted.protocols.basic import NetstringReceiver
+
+logger = logging.getLogger(__name__)
+
+#: The file descriptors the isolated plugin process uses to talk to its parent,
+#: stdout and stderr are left for logging.
+PARENT_TO_CHILD_FD = 3
+CHILD_TO_PARENT_FD = 4
+
+
+def encodeVortexMsgs(vortexMsgs: Union[bytes, List[bytes]]) -> List[str]:
+    if isinstance(vortexMsgs, bytes):
+        vortexMsgs = [vortexMsgs]
+    return [b64encode(m).decode() for m in vortexMsgs]
+
+
+def decodeVortexMsgs(encodedMsgs: List[str]) -> List[bytes]:
+    return [b64decode(m) for m in encodedMsgs]
+
+
+class PluginIsolatedChannel(NetstringReceiver):
+    """ Plugin Isolated Channel
+
+    This protocol carries the messages between an isolated plugin process and the
+    service that started it. Each message is a JSON object, framed as a netstring.
+
+    Every message has a "type", the other keys depend on the type, vortex messages
+    are base64 encoded, see `encodeVortexMsgs`.
+
+    """
+
+    MAX_LENGTH = 256 * 1024 * 1024
+
+    def __init__(self, messageReceived: Callable[[Dict], None],
+                 connectionLost: Callable[[], None] = None):
+        self._messageReceivedCallable = messageReceived
+        self._connectionLostCallable = connectionLost
+
+    def sendMessage(self, type_: str, **kwargs) -> None:
+        kwargs['type'] = type_
+        self.sendString(json.dumps(kwargs).encode())
+
+    def stringReceived(self, string: bytes) -> None:
+        try:
+            message = json.loads(string.decode())
+            self._messageReceivedCallable(message)
+
+        except Exception as e:
+            logger.error("Failed to process isolated plugin message")
+            logger.exception(e)
+
+    def connectionLost(self, reason=None):
+        if self._connectionLostCallable:
+            self._connectionLostCallable()
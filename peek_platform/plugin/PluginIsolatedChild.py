@@ -0,0 +1,178 @@
+""" Plugin Isolated Child
+
+This module is the main of an isolated plugin process, it's started by
+`PluginIsolatedProcess` with :
+
+    python -m peek_platform.plugin.PluginIsolatedChild \\
+        <componentName> <configClass> <pluginLoaderClass> <pluginName>
+
+The child only sets up PeekPlatformConfig.componentName, config and pluginLoader,
+the rest of the services initialisation isn't run, so only some plugins can be
+isolated. An isolated plugin must :
+
+* Only talk to the rest of peek with vortex payloads, that have its "plugin" filter
+  key, and VortexFactory.sendVortexMsg.
+
+* Not require permissions on its endpoints, the payloads reach it without their
+  vortex session.
+
+* Not use the services database connections, HTTP resources, the software install
+  managers, or the APIs of other plugins, none of these exist in the child.
+
+"""
+import logging
+import sys
+from importlib import import_module
+from typing import Dict
+
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks, maybeDeferred, succeed
+from twisted.internet.stdio import StandardIO
+from vortex.DeferUtil import vortexLogFailure
+from vortex.PayloadEnvelope import PayloadEnvelope
+from vortex.PayloadIO import PayloadIO
+from vortex.VortexFactory import VortexFactory
+
+from peek_platform import PeekPlatformConfig
+from peek_platform.plugin.PluginIsolatedChannel import PluginIsolatedChannel, \
+    PARENT_TO_CHILD_FD, CHILD_TO_PARENT_FD, encodeVortexMsgs, decodeVortexMsgs
+
+logger = logging.getLogger(__name__)
+
+# The parent service logs these lines at the level they start with
+LOG_FORMAT = '%(levelname)s %(name)s:%(message)s'
+
+
+def _importClass(classPath: str):
+    modName, qualName = classPath.split(':')
+    obj = import_module(modName)
+    for name in qualName.split('.'):
+        obj = getattr(obj, name)
+    return obj
+
+
+class PluginIsolatedChild:
+    """ Plugin Isolated Child
+
+    This class loads one plugin in this process, and serves the commands and payloads
+    that the parent service forwards to it.
+
+    The messages the plugin sends with VortexFactory.sendVortexMsg are sent to the
+    parent, which sends them on to the vortexes.
+
+    """
+
+    def __init__(self, pluginName: str):
+        self._pluginName = pluginName
+        self._channel = PluginIsolatedChannel(self._messageReceived,
+                                              self._parentLost)
+        self._loader = None
+
+    def run(self, componentName: str, configClassPath: str,
+            loaderClassPath: str) -> None:
+        PeekPlatformConfig.componentName = componentName
+        PeekPlatformConfig.config = _importClass(configClassPath)()
+
+        StandardIO(self._channel, stdin=PARENT_TO_CHILD_FD, stdout=CHILD_TO_PARENT_FD)
+
+        # The plugin can't reach the vortexes from here, send its messages via the
+        # parent
+        VortexFactory.sendVortexMsg = self._sendVortexMsg
+
+        LoaderClass = _importClass(loaderClassPath)
+        reactor.callWhenRunning(self._load, LoaderClass)
+        reactor.run()
+
+    @inlineCallbacks
+    def _load(self, LoaderClass):
+        try:
+            self._loader = LoaderClass()
+            PeekPlatformConfig.pluginLoader = self._loader
+
+            yield self._loader.loadPlugin(self._pluginName)
+            loaded = self._loader.pluginEntryHook(self._pluginName) is not None
+
+        except Exception as e:
+            logger.error("Failed to load isolated plugin %s", self._pluginName)
+            logger.exception(e)
+            reactor.stop()
+            return
+
+        self._channel.sendMessage('loaded', loaded=loaded)
+
+        if not loaded:
+            reactor.stop()
+
+    def _sendVortexMsg(self, vortexMsgs, destVortexName=None, destVortexUuid=None):
+        self._channel.sendMessage('send', vortexMsgs=encodeVortexMsgs(vortexMsgs),
+                                  destVortexName=destVortexName,
+                                  destVortexUuid=destVortexUuid)
+        return succeed(True)
+
+    def _messageReceived(self, message: Dict) -> None:
+        type_ = message['type']
+
+        if type_ == 'payload':
+            self._processPayload(message)
+
+        elif type_ == 'command':
+            self._runCommand(message['id'], message['command'])
+
+        else:
+            logger.error("Unknown message type %s from the parent", type_)
+
+    def _processPayload(self, message: Dict) -> None:
+        vortexUuid = message['vortexUuid']
+        vortexName = message['vortexName']
+
+        def sendResponse(vortexMsgs, *args, **kwargs):
+            return self._sendVortexMsg(vortexMsgs, destVortexUuid=vortexUuid)
+
+        for vortexMsg in decodeVortexMsgs(message['vortexMsgs']):
+            payloadEnvelope = PayloadEnvelope().fromVortexMsg(vortexMsg)
+            PayloadIO().process(payloadEnvelope, vortexUuid, vortexName, None,
+                                sendResponse)
+
+    def _runCommand(self, commandId: int, command: str) -> None:
+        def ack(_):
+            self._channel.sendMessage('ack', id=commandId, command=command)
+            if command == 'unload':
+                reactor.callLater(0, reactor.stop)
+
+        def failed(failure):
+            vortexLogFailure(failure, logger, consumeError=True)
+            self._channel.sendMessage('ack', id=commandId, command=command,
+                                      error=str(failure.value))
+
+        if command == 'start':
+            d = maybeDeferred(self._loader._tryStart, self._pluginName)
+        elif command == 'stop':
+            d = maybeDeferred(self._loader._tryStop, self._pluginName)
+        elif command == 'unload':
+            d = maybeDeferred(self._loader.unloadPlugin, self._pluginName)
+        else:
+            d = maybeDeferred(self._unknownCommand, command)
+
+        d.addCallbacks(ack, failed)
+
+    def _unknownCommand(self, command: str):
+        raise Exception("Unknown command %s" % command)
+
+    def _parentLost(self) -> None:
+        logger.info("The parent of isolated plugin %s closed the channel, exiting",
+                    self._pluginName)
+        if reactor.running:
+            reactor.stop()
+
+
+def main():
+    componentName, configClassPath, loaderClassPath, pluginName = sys.argv[1:5]
+
+    logging.basicConfig(stream=sys.stderr, format=LOG_FORMAT, level=logging.DEBUG)
+
+    PluginIsolatedChild(pluginName).run(componentName, configClassPath,
+                                        loaderClassPath)
+
+
+if __name__ == '__main__':
+    main()
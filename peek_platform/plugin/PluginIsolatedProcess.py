@@ -0,0 +1,288 @@
+import logging
+import os
+import sys
+from typing import Dict, Optional
+
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred, succeed
+from twisted.internet.protocol import ProcessProtocol
+from vortex.PayloadEnvelope import PayloadEnvelope
+from vortex.PayloadIO import PayloadIO
+from vortex.VortexFactory import VortexFactory
+
+from peek_platform import PeekPlatformConfig
+from peek_platform.plugin.PluginIsolatedChannel import PluginIsolatedChannel, \
+    PARENT_TO_CHILD_FD, CHILD_TO_PARENT_FD, encodeVortexMsgs, decodeVortexMsgs
+
+logger = logging.getLogger(__name__)
+
+#: This environment variable is set to the plugin name in isolated plugin processes
+ISOLATED_PLUGIN_ENV = 'PEEK_ISOLATED_PLUGIN'
+
+
+def isIsolatedPluginProcess() -> bool:
+    return bool(os.environ.get(ISOLATED_PLUGIN_ENV))
+
+
+def _classPath(Class) -> str:
+    return '%s:%s' % (Class.__module__, Class.__qualname__)
+
+
+class _ChildFdTransport:
+    """ Child FD Transport
+
+    Lets the channel protocol write to the isolated plugin process.
+
+    """
+
+    def __init__(self, processTransport):
+        self._processTransport = processTransport
+
+    def write(self, data: bytes) -> None:
+        self._processTransport.writeToChild(PARENT_TO_CHILD_FD, data)
+
+    def loseConnection(self) -> None:
+        self._processTransport.closeChildFD(PARENT_TO_CHILD_FD)
+
+
+class _PluginForwardEndpoint:
+    """ Plugin Forward Endpoint
+
+    This is added to PayloadIO in place of a PayloadEndpoint. It matches every payload
+    with the plugins filter key, {"plugin": pluginName}, and passes it to forward.
+
+    A PayloadEndpoint can't be used, vortex requires a "key" in their filters, and the
+    isolated process needs the payloads for every key the plugin handles.
+
+    """
+
+    # PayloadIO logs the failures of endpoints that set this
+    _logProcessException = True
+
+    def __init__(self, pluginName: str, forward):
+        self._filt = {'plugin': pluginName}
+        self._forward = forward
+
+    @property
+    def filt(self) -> Dict:
+        return dict(self._filt)
+
+    def check(self, payloadEnvelope: PayloadEnvelope, vortexName: str) -> bool:
+        return payloadEnvelope.filt.get('plugin') == self._filt['plugin']
+
+    def process(self, payloadEnvelope: PayloadEnvelope, vortexUuid: str,
+                vortexName: str, vortexSession, sendResponse) -> None:
+        self._forward(payloadEnvelope, vortexUuid, vortexName)
+
+    def __repr__(self):
+        return 'PluginForwardEndpoint filt=%s' % self._filt
+
+
+class PluginIsolatedProcess(ProcessProtocol):
+    """ Plugin Isolated Process
+
+    This class runs a plugin in its own python process, with its own reactor, so a
+    busy plugin can use another CPU core.
+
+    The child process is `PluginIsolatedChild`, it loads the plugin with the same
+    plugin loader class as this service.
+
+    In this service, this class stands in for the plugins entry hook. It adds one
+    endpoint to PayloadIO for the plugins filter key, {"plugin": pluginName}, and
+    forwards the payloads it receives to the child. The messages the plugin sends are
+    sent from this service, to the same vortexes.
+
+    See `PluginIsolatedChild` for the plugins that can be isolated.
+
+    The start, stop and unload calls are forwarded to the child, they return
+    deferreds that fire when the child has completed them.
+
+    """
+
+    def __init__(self, pluginName: str):
+        self._pluginName = pluginName
+        self._channel = PluginIsolatedChannel(self._messageReceived)
+        self._endpoint = None
+
+        self._loadedDeferred: Optional[Deferred] = None
+        self._pendingByCommandId: Dict[int, Deferred] = {}
+        self._nextCommandId = 0
+        self._exited = False
+        self._unloading = False
+
+        # Partial log lines from the child, by file descriptor
+        self._logBuffersByFd: Dict[int, bytes] = {1: b'', 2: b''}
+
+    @property
+    def pluginName(self) -> str:
+        return self._pluginName
+
+    def spawn(self) -> Deferred:
+        """ Spawn
+
+        Start the child process, and have it load the plugin.
+
+        :return: A deferred that fires with True when the plugin is loaded, or False
+            if the plugin doesn't run on this service.
+
+        """
+        config = PeekPlatformConfig.config
+        loader = PeekPlatformConfig.pluginLoader
+
+        args = [sys.executable, '-m', 'peek_platform.plugin.PluginIsolatedChild',
+                PeekPlatformConfig.componentName,
+                _classPath(type(config)),
+                _classPath(type(loader)),
+                self._pluginName]
+
+        env = dict(os.environ)
+        env[ISOLATED_PLUGIN_ENV] = self._pluginName
+
+        self._loadedDeferred = Deferred()
+
+        reactor.spawnProcess(self, sys.executable, args, env=env,
+                             childFDs={0: 'w', 1: 'r', 2: 'r',
+                                       PARENT_TO_CHILD_FD: 'w',
+                                       CHILD_TO_PARENT_FD: 'r'})
+
+        return self._loadedDeferred
+
+    def registerEndpoint(self) -> None:
+        """ Register Endpoint
+
+        Add the endpoint that forwards the plugins payloads to the child.
+
+        """
+        self._endpoint = _PluginForwardEndpoint(self._pluginName,
+                                                self._forwardPayload)
+        PayloadIO().add(self._endpoint)
+
+    def kill(self) -> None:
+        """ Kill
+
+        Remove the endpoint and kill the child, for when the plugin fails to load
+        after the child has loaded it.
+
+        """
+        self._unloading = True
+        self._removeEndpoint()
+
+        if not self._exited and self.transport:
+            self.transport.signalProcess('KILL')
+
+    def _removeEndpoint(self) -> None:
+        if self._endpoint:
+            PayloadIO().remove(self._endpoint)
+            self._endpoint = None
+
+    # ---------------
+    # Entry hook methods
+
+    def start(self) -> Deferred:
+        return self._sendCommand('start')
+
+    def stop(self) -> Deferred:
+        return self._sendCommand('stop')
+
+    def unload(self) -> Deferred:
+        self._unloading = True
+        self._removeEndpoint()
+        return self._sendCommand('unload')
+
+    # ---------------
+    # Process protocol methods
+
+    def connectionMade(self):
+        self._channel.makeConnection(_ChildFdTransport(self.transport))
+
+    def childDataReceived(self, childFD: int, data: bytes):
+        if childFD == CHILD_TO_PARENT_FD:
+            self._channel.dataReceived(data)
+            return
+
+        # The child logs to stdout and stderr, EG "INFO peek_plugin_noop:Loaded"
+        lines = (self._logBuffersByFd.get(childFD, b'') + data).split(b'\n')
+        self._logBuffersByFd[childFD] = lines.pop()
+
+        for line in lines:
+            line = line.decode(errors='replace').rstrip()
+            if not line:
+                continue
+
+            levelName = line.split(' ', 1)[0]
+            level = logging.getLevelName(levelName)
+            if not isinstance(level, int):
+                level = logging.INFO if childFD == 1 else logging.WARNING
+
+            logger.log(level, "%s child: %s", self._pluginName, line)
+
+    def processEnded(self, reason):
+        self._exited = True
+
+        error = Exception("The isolated process for %s exited, %s"
+                          % (self._pluginName, reason.value))
+
+        if self._loadedDeferred and not self._loadedDeferred.called:
+            self._loadedDeferred.errback(error)
+
+        pending = self._pendingByCommandId
+        self._pendingByCommandId = {}
+        for d in pending.values():
+            d.errback(error)
+
+        if not self._unloading:
+            logger.error(str(error))
+
+    # ---------------
+    # Channel methods
+
+    def _sendCommand(self, command: str) -> Deferred:
+        if self._exited:
+            if command == 'unload':
+                return succeed(None)
+            raise Exception("The isolated process for %s has exited, can not %s it"
+                            % (self._pluginName, command))
+
+        self._nextCommandId += 1
+        d = Deferred()
+        self._pendingByCommandId[self._nextCommandId] = d
+        self._channel.sendMessage('command', id=self._nextCommandId, command=command)
+        return d
+
+    def _forwardPayload(self, payloadEnvelope: PayloadEnvelope,
+                        vortexUuid: str, vortexName: str):
+        if self._exited:
+            logger.warning("Dropping payload for %s, its isolated process has exited,"
+                           " filt=%s", self._pluginName, payloadEnvelope.filt)
+            return
+
+        self._channel.sendMessage(
+            'payload', vortexUuid=vortexUuid, vortexName=vortexName,
+            vortexMsgs=encodeVortexMsgs(payloadEnvelope.toVortexMsg()))
+
+    def _messageReceived(self, message: Dict) -> None:
+        type_ = message['type']
+
+        if type_ == 'send':
+            VortexFactory.sendVortexMsg(decodeVortexMsgs(message['vortexMsgs']),
+                                        destVortexName=message.get('destVortexName'),
+                                        destVortexUuid=message.get('destVortexUuid'))
+
+        elif type_ == 'loaded':
+            self._loadedDeferred.callback(message['loaded'])
+
+        elif type_ == 'ack':
+            d = self._pendingByCommandId.pop(message['id'], None)
+            if d is None:
+                return
+
+            if message.get('error'):
+                d.errback(Exception("%s failed in the isolated process for %s, %s"
+                                    % (message['command'], self._pluginName,
+                                       message['error'])))
+            else:
+                d.callback(None)
+
+        else:
+            logger.error("Unknown message type %s from the isolated process for %s",
+                         type_, self._pluginName)
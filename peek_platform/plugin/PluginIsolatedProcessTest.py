@@ -0,0 +1,76 @@
+import json
+
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks
+from twisted.internet.task import deferLater
+from twisted.test.proto_helpers import StringTransport
+from twisted.trial import unittest
+from vortex.PayloadEnvelope import PayloadEnvelope
+from vortex.PayloadIO import PayloadIO
+
+from peek_platform.plugin.PluginIsolatedChannel import decodeVortexMsgs
+from peek_platform.plugin.PluginIsolatedProcess import PluginIsolatedProcess
+
+PLUGIN_NAME = 'peek_plugin_isolated_test'
+
+
+class PluginIsolatedProcessTest(unittest.TestCase):
+
+    def setUp(self):
+        self._transport = StringTransport()
+        self._process = PluginIsolatedProcess(PLUGIN_NAME)
+        self._process._channel.makeConnection(self._transport)
+
+    def tearDown(self):
+        self._process.kill()
+
+    def _sentMessages(self):
+        messages = []
+        data = self._transport.value()
+        while data:
+            length, data = data.split(b':', 1)
+            messages.append(json.loads(data[:int(length)].decode()))
+            data = data[int(length) + 1:]
+        return messages
+
+    @inlineCallbacks
+    def _processPayload(self, filt: dict):
+        PayloadIO().process(PayloadEnvelope(filt=filt), 'uuid', 'peekClient', None,
+                            lambda *args, **kwargs: None)
+
+        # PayloadIO dispatches to the endpoints with reactor.callLater
+        yield deferLater(reactor, 0.05, lambda: None)
+
+    @inlineCallbacks
+    def testPluginPayloadsAreForwarded(self):
+        self._process.registerEndpoint()
+
+        yield self._processPayload({'plugin': PLUGIN_NAME, 'key': 'isolated.data'})
+        yield self._processPayload({'plugin': 'peek_plugin_other',
+                                    'key': 'isolated.data'})
+
+        message, = self._sentMessages()
+        self.assertEqual(message['type'], 'payload')
+        self.assertEqual(message['vortexUuid'], 'uuid')
+
+        vortexMsg, = decodeVortexMsgs(message['vortexMsgs'])
+        self.assertEqual(PayloadEnvelope().fromVortexMsg(vortexMsg).filt,
+                         {'plugin': PLUGIN_NAME, 'key': 'isolated.data'})
+
+    def testKillRemovesTheEndpoint(self):
+        self._process.registerEndpoint()
+        self.assertIn({'plugin': PLUGIN_NAME},
+                      [e.filt for e in PayloadIO().endpoints])
+
+        self._process.kill()
+        self.assertNotIn({'plugin': PLUGIN_NAME},
+                         [e.filt for e in PayloadIO().endpoints])
+
+    def testCommandsFireOnAck(self):
+        d = self._process.start()
+        message, = self._sentMessages()
+        self.assertEqual(message['command'], 'start')
+
+        self._process._messageReceived(dict(type='ack', id=message['id'],
+                                            command='start'))
+        self.assertIsNone(self.successResultOf(d))
@@ -0,0 +1,150 @@
+import logging
+import sys
+import threading
+from collections import defaultdict
+from fnmatch import fnmatch
+from importlib.abc import MetaPathFinder
+from importlib.machinery import SourceFileLoader, SourcelessFileLoader
+from importlib.util import LazyLoader, _LazyModule
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+#: Modules that contain this declare tuples, they're never lazily loaded
+TUPLE_DECLARATION_MARKER = b'addTupleType'
+
+
+class PluginLazyImportFinder(MetaPathFinder):
+    """ Plugin Lazy Import Finder
+
+    This import hook defers executing the submodules of the plugins it's given, until
+    an attribute of the submodule is first accessed, using `importlib.util.LazyLoader`.
+
+    The plugin package itself is still imported normally, so its entry hook getter
+    can be called.
+
+    Tuples must be registered before a payload containing them is received, so
+    submodules that declare tuples with ``@addTupleType`` are imported normally,
+    wherever they are in the plugin. Submodules that match `excludePatterns` are
+    imported normally too.
+
+    Note, "from module import name" accesses the module, so modules imported that way
+    are executed straight away.
+
+    """
+
+    __instance = None
+
+    def __init__(self, excludePatterns: Iterable[str]):
+        self._excludePatterns = list(excludePatterns)
+        self._lock = threading.Lock()
+        self._pluginNames = set()
+        self._lazyModNamesByPluginName: Dict[str, List[str]] = defaultdict(list)
+
+    @classmethod
+    def install(cls, excludePatterns: Iterable[str]) -> 'PluginLazyImportFinder':
+        """ Install
+
+        Add the finder to the start of sys.meta_path, if it's not already installed.
+        If it is, its exclude patterns are updated, they apply to the modules imported
+        from then on.
+
+        """
+        if cls.__instance is None:
+            cls.__instance = cls(excludePatterns)
+            sys.meta_path.insert(0, cls.__instance)
+
+        else:
+            cls.__instance.setExcludePatterns(excludePatterns)
+
+        return cls.__instance
+
+    def setExcludePatterns(self, excludePatterns: Iterable[str]) -> None:
+        excludePatterns = list(excludePatterns)
+        if excludePatterns == self._excludePatterns:
+            return
+
+        logger.info("Lazy import exclude patterns changed from %s to %s,"
+                    " modules that are already imported are unchanged",
+                    self._excludePatterns, excludePatterns)
+
+        # find_spec reads this with out the lock, so replace the list
+        self._excludePatterns = excludePatterns
+
+    def addPlugin(self, pluginName: str) -> None:
+        with self._lock:
+            self._pluginNames.add(pluginName)
+            self._lazyModNamesByPluginName.pop(pluginName, None)
+
+    def find_spec(self, fullname, path, target=None):
+        pluginName = fullname.split('.')[0]
+        if pluginName == fullname or pluginName not in self._pluginNames:
+            return None
+
+        if any(fnmatch(fullname, pattern) for pattern in self._excludePatterns):
+            return None
+
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+
+            # Only plain python modules can be lazily loaded
+            if not isinstance(spec.loader, (SourceFileLoader, SourcelessFileLoader)):
+                return spec
+
+            if self._declaresTuples(spec):
+                return spec
+
+            spec.loader = LazyLoader(spec.loader)
+
+            with self._lock:
+                self._lazyModNamesByPluginName[pluginName].append(fullname)
+
+            return spec
+
+        return None
+
+    @staticmethod
+    def _declaresTuples(spec) -> bool:
+        """ Declares Tuples
+
+        Check the modules source, or bytecode, for addTupleType, with out executing
+        it. The name is stored as is in the bytecode, so this works for both.
+
+        """
+        try:
+            return TUPLE_DECLARATION_MARKER in spec.loader.get_data(spec.origin)
+
+        except OSError as e:
+            logger.debug("Failed to read %s, it won't be lazily loaded, %s",
+                         spec.origin, e)
+            return True
+
+    def deferredModules(self) -> Dict[str, List[str]]:
+        """ Deferred Modules
+
+        :return: The submodules of each plugin that have been imported lazily and
+            still haven't been executed, keyed by plugin name.
+
+        """
+        deferred = {}
+
+        with self._lock:
+            items = [(p, list(n)) for p, n in self._lazyModNamesByPluginName.items()]
+
+        for pluginName, modNames in items:
+            names = [modName for modName in modNames
+                     if self._isDeferred(sys.modules.get(modName))]
+            if names:
+                deferred[pluginName] = names
+
+        return deferred
+
+    @staticmethod
+    def _isDeferred(module) -> bool:
+        # Don't use isinstance, accessing the modules __class__ would load it
+        return module is not None and type(module) is _LazyModule
@@ -0,0 +1,91 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from peek_platform.plugin.PluginLazyImportFinder import PluginLazyImportFinder
+
+PLUGIN_NAME = 'peek_plugin_lazy_test'
+
+
+class PluginLazyImportFinderTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+        files = {
+            '__init__.py': '',
+            'Service.py': 'LOADED = True\n',
+            'tuples/__init__.py': '',
+            'tuples/StatusTuple.py': 'LOADED = True\n',
+            '_private/DeclaredTuple.py': (
+                'from vortex.Tuple import addTupleType\n'
+                'LOADED = True\n'
+            ),
+            '_private/__init__.py': '',
+        }
+
+        for relPath, contents in files.items():
+            filePath = os.path.join(self._dir, PLUGIN_NAME, relPath)
+            os.makedirs(os.path.dirname(filePath), exist_ok=True)
+            with open(filePath, 'w') as f:
+                f.write(contents)
+
+        sys.path.insert(0, self._dir)
+
+        self._finder = PluginLazyImportFinder(['*tuples*'])
+        self._finder.addPlugin(PLUGIN_NAME)
+        sys.meta_path.insert(0, self._finder)
+
+    def tearDown(self):
+        sys.meta_path.remove(self._finder)
+        sys.path.remove(self._dir)
+
+        for modName in list(sys.modules):
+            if modName.split('.')[0] == PLUGIN_NAME:
+                del sys.modules[modName]
+
+        shutil.rmtree(self._dir)
+
+    def _import(self, modName: str):
+        __import__(modName)
+        return sys.modules[modName]
+
+    def testSubmodulesAreDeferred(self):
+        self._import(PLUGIN_NAME + '.Service')
+
+        self.assertEqual(self._finder.deferredModules(),
+                         {PLUGIN_NAME: [PLUGIN_NAME + '.Service']})
+
+        self.assertTrue(sys.modules[PLUGIN_NAME + '.Service'].LOADED)
+        self.assertEqual(self._finder.deferredModules(), {})
+
+    def testExcludedModulesAreLoaded(self):
+        self._import(PLUGIN_NAME + '.tuples.StatusTuple')
+        self.assertEqual(self._finder.deferredModules(), {})
+
+    def testTupleDeclarationsAreLoaded(self):
+        self._import(PLUGIN_NAME + '._private.DeclaredTuple')
+
+        deferred = self._finder.deferredModules().get(PLUGIN_NAME, [])
+        self.assertNotIn(PLUGIN_NAME + '._private.DeclaredTuple', deferred)
+
+    def testChangedExcludePatternsApply(self):
+        self._finder.setExcludePatterns(['*Service*'])
+
+        self._import(PLUGIN_NAME + '.Service')
+        self._import(PLUGIN_NAME + '.tuples.StatusTuple')
+
+        self.assertEqual(self._finder.deferredModules(),
+                         {PLUGIN_NAME: [PLUGIN_NAME + '.tuples.StatusTuple']})
+
+    def testInstallUpdatesTheExcludePatterns(self):
+        finder = PluginLazyImportFinder.install(['*tuples*'])
+        try:
+            self.assertIs(PluginLazyImportFinder.install(['*Service*']), finder)
+            self.assertEqual(finder._excludePatterns, ['*Service*'])
+
+        finally:
+            sys.meta_path.remove(finder)
+            PluginLazyImportFinder._PluginLazyImportFinder__instance = None
@@ -1,21 +1,37 @@
-import gc
 import logging
 import sys
-from typing import Type, Tuple, Optional
+import time
+from collections import namedtuple
+from importlib import import_module
+from typing import Type, Tuple, Optional, List, Dict
 
 import os
 from abc import ABCMeta, abstractmethod, abstractproperty
-from collections import defaultdict
 from importlib.util import find_spec
 from jsoncfg.value_mappers import require_string, require_array
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks, DeferredList, Deferred, \
+    maybeDeferred
+from twisted.internet.threads import deferToThread
+from twisted.python.failure import Failure
+from vortex.DeferUtil import vortexLogFailure
 
 from peek_platform import PeekPlatformConfig
+from peek_platform.plugin.PluginDependencyGraph import PluginDependencyGraph
+from peek_platform.plugin.PluginEndpointIndex import PluginEndpointIndex
+from peek_platform.plugin.PluginIsolatedProcess import PluginIsolatedProcess, \
+    isIsolatedPluginProcess
+from peek_platform.plugin.PluginLazyImportFinder import PluginLazyImportFinder
+from peek_platform.plugin.PluginRegistrationTracker import PluginRegistrationTracker
+from peek_platform.plugin.PluginStartupProfiler import PluginStartupProfiler
+from peek_platform.plugin.PluginUnloadCollector import PluginUnloadCollector
+from peek_platform.util import BytecodeUtil
+from peek_platform.util.MemUtil import pluginMemoryStats, PluginMemoryStat
+from peek_platform.util.ThreadPoolUtil import setupTwistedThreadPool
 from peek_plugin_base.PluginCommonEntryHookABC import PluginCommonEntryHookABC
 from peek_plugin_base.PluginPackageFileConfig import PluginPackageFileConfig
 from vortex.PayloadIO import PayloadIO
-from vortex.Tuple import removeTuplesForTupleNames, registeredTupleNames, \
-    tupleForTupleName
+from vortex.Tuple import removeTuplesForTupleNames, tupleForTupleName
 from vortex.TupleAction import TupleGenericAction, TupleUpdateAction
 from vortex.TupleSelector import TupleSelector
 from vortex.rpc.RPC import _VortexRPCResultTuple, _VortexRPCArgTuple
@@ -36,6 +52,10 @@ corePlugins = [
     "peek_core_user"
 ]
 
+_PluginImport = namedtuple("_PluginImport", ["pluginName", "pluginVersion",
+                                             "EntryHookClass", "pluginRootDir",
+                                             "requiresService"])
+
 
 class PluginLoaderABC(metaclass=ABCMeta):
     _instance = None
@@ -48,8 +68,24 @@ class PluginLoaderABC(metaclass=ABCMeta):
     def __init__(self):
         self._loadedPlugins = {}
 
-        self._vortexEndpointInstancesByPluginName = defaultdict(list)
-        self._vortexTupleNamesByPluginName = defaultdict(list)
+        # Size the reactors thread pool before the plugins start using it
+        setupTwistedThreadPool(PeekPlatformConfig.config)
+
+        # Record which plugin registers each endpoint and tuple, as they're registered
+        self._registrationTracker = PluginRegistrationTracker()
+
+        # Dispatch payloads to only the endpoints of the plugin they're for
+        if PeekPlatformConfig.config.pluginEndpointIndex:
+            PluginEndpointIndex()
+
+        self._requiresPluginsByPluginName: Dict[str, List[str]] = {}
+        self._pluginsPastDeadline: Dict[str, str] = {}
+        self._startupProfiler = PluginStartupProfiler(
+            os.path.join(PeekPlatformConfig.config.homePath,
+                         'plugin_startup_profile.json'),
+            enabled=PeekPlatformConfig.config.pluginStartupProfile)
+        self._unloadCollector = PluginUnloadCollector(
+            os.path.join(PeekPlatformConfig.config.homePath, 'plugin_unload_leaks'))
 
     @abstractproperty
     def _entryHookFuncName(self) -> str:
@@ -95,68 +131,375 @@ class PluginLoaderABC(metaclass=ABCMeta):
         if pluginName in self._loadedPlugins:
             raise Exception("Plugin %s is already loaded, check config.json" % pluginName)
 
+        self.unloadPlugin(pluginName)
+
+        self._startupProfiler.startModuleTiming()
         try:
-            self.unloadPlugin(pluginName)
+            yield self._loadPluginLevel([pluginName], {}, inParallel=False)
+
+        finally:
+            self._startupProfiler.stopModuleTiming()
+
+    @inlineCallbacks
+    def _loadPlugins(self, pluginNames: List[str]):
+        """ Load Plugins
+
+        Load the plugins one dependency level at a time. If pluginLoadInParallel is
+        set, the plugins within a level are imported concurrently, then their entry
+        hooks are loaded one at a time on the reactor, otherwise each level is one
+        plugin, see `_pluginDependencyGraph`.
+
+        The critical path, the chain of required plugins that took the longest to load,
+        is logged at the end.
+
+        """
+        for pluginName in pluginNames:
+            if pluginName in self._loadedPlugins:
+                raise Exception("Plugin %s is already loaded, check config.json"
+                                % pluginName)
+
+        startTime = time.monotonic()
+        inParallel = PeekPlatformConfig.config.pluginLoadInParallel
 
-            # Make note of the initial registrations for this plugin
-            endpointInstancesBefore = set(PayloadIO().endpoints)
-            tupleNamesBefore = set(registeredTupleNames())
+        graph = self._pluginDependencyGraph(pluginNames)
+        levels = graph.levels()
+
+        secondsByPluginName = {}
+        self._startupProfiler.startModuleTiming()
+        try:
+            for level in levels:
+                yield self._loadPluginLevel(level, secondsByPluginName,
+                                            inParallel=inParallel)
+
+        finally:
+            self._startupProfiler.stopModuleTiming()
+
+        if not secondsByPluginName:
+            return
+
+        pathSeconds, path = graph.criticalPath(secondsByPluginName)
+        logger.info("Loaded %s plugins in %.2fs, in %s levels,"
+                    " the critical path took %.2fs : %s",
+                    len(pluginNames), time.monotonic() - startTime, len(levels),
+                    pathSeconds,
+                    " -> ".join("%s (%.2fs)" % (n, secondsByPluginName.get(n, 0.0))
+                                for n in path))
+
+        self._startupProfiler.writeReport()
+
+        if PeekPlatformConfig.config.pluginLazyImport:
+            for pluginName, modNames in self.deferredPluginModules().items():
+                logger.info("%s has %s lazily imported modules that are not loaded yet",
+                            pluginName, len(modNames))
+                logger.debug("%s deferred modules : %s", pluginName, modNames)
+
+    def deferredPluginModules(self) -> Dict[str, List[str]]:
+        """ Deferred Plugin Modules
+
+        :return: The plugin submodules that were imported lazily and still haven't been
+            executed, keyed by plugin name. See `pluginLazyImport`
+
+        """
+        if not PeekPlatformConfig.config.pluginLazyImport:
+            return {}
+
+        return PluginLazyImportFinder.install(
+            PeekPlatformConfig.config.pluginLazyImportExclude).deferredModules()
+
+    def pluginMemoryStats(self) -> List[PluginMemoryStat]:
+        """ Plugin Memory Stats
+
+        Attribute the memory of this process to the loaded plugins, by the tracemalloc
+        traces and gc objects that belong to each plugins package.
+        Isolated plugins are not included, their memory is in their own processes.
+
+        This walks the whole heap, call it from a thread, EG with deferToThread.
+
+        :return: The stats, the plugin using the most memory first.
+            See `MemUtil.pluginMemoryStats`
+
+        """
+        config = PeekPlatformConfig.config
+
+        rootsByPluginName = {}
+        for pluginName, entryHook in list(self._loadedPlugins.items()):
+            if isinstance(entryHook, PluginIsolatedProcess):
+                continue
 
             modSpec = find_spec(pluginName)
-            if not modSpec:
-                raise Exception("Failed to find package %s,"
-                                " is the python package installed?" % pluginName)
-
-            PluginPackage = modSpec.loader.load_module()
-            pluginRootDir = os.path.dirname(PluginPackage.__file__)
-
-            # Load up the plugin package info
-            pluginPackageJson = PluginPackageFileConfig(pluginRootDir)
-            pluginVersion = pluginPackageJson.config.plugin.version(require_string)
-            pluginRequiresService = pluginPackageJson.config.requiresServices(
-                require_array)
-
-            # Make sure the service is required
-            # Storage and Server are loaded at the same time, hence the intersection
-            if not set(pluginRequiresService) & set(self._platformServiceNames):
-                logger.debug("%s does not require %s, Skipping load",
-                             pluginName, self._platformServiceNames)
-                return
+            roots = list(modSpec.submodule_search_locations or []) if modSpec else []
 
-            # Get the entry hook class from the package
-            entryHookGetter = getattr(PluginPackage, str(self._entryHookFuncName))
-            EntryHookClass = entryHookGetter() if entryHookGetter else None
+            if config.pluginZipImport:
+                roots.append(BytecodeUtil.packageZipPath(pluginName,
+                                                         config.pluginZipPath))
 
-            if not EntryHookClass:
-                logger.warning(
-                    "Skipping load for %s, %s.%s is missing or returned None",
-                    pluginName, pluginName, self._entryHookFuncName)
-                return
+            rootsByPluginName[pluginName] = roots
+
+        return pluginMemoryStats(rootsByPluginName)
+
+    def _pluginDependencyGraph(self, pluginNames: List[str]) -> PluginDependencyGraph:
+        """ Plugin Dependency Graph
+
+        Plugins only declare "requiresPlugins" if they opt into concurrent loading, so
+        unless pluginLoadInParallel is set, each plugin requires the plugin configured
+        before it, and the plugins are processed one at a time, in their configured
+        order.
+
+        """
+        if not PeekPlatformConfig.config.pluginLoadInParallel:
+            return PluginDependencyGraph(
+                pluginNames,
+                {name: pluginNames[i - 1:i] for i, name in enumerate(pluginNames)}
+            )
+
+        for pluginName in pluginNames:
+            if pluginName in self._requiresPluginsByPluginName:
+                continue
+
+            requiresPlugins = self._readRequiresPlugins(pluginName)
+            self._requiresPluginsByPluginName[pluginName] = requiresPlugins
+
+            for requiredName in requiresPlugins:
+                if (requiredName not in pluginNames
+                        and requiredName not in self._loadedPlugins):
+                    logger.warning("%s requires plugin %s, which is not loaded",
+                                   pluginName, requiredName)
+
+        return PluginDependencyGraph(pluginNames, self._requiresPluginsByPluginName)
+
+    def _readRequiresPlugins(self, pluginName: str) -> List[str]:
+        """ Read Requires Plugins
+
+        Read the "requiresPlugins" from the plugins plugin_package.json, without
+        importing the plugin.
+
+        """
+        try:
+            modSpec = find_spec(pluginName)
+            if not modSpec or not modSpec.origin:
+                return []
+
+            pluginPackageJson = PluginPackageFileConfig(
+                os.path.dirname(modSpec.origin))
+            return list(pluginPackageJson.config.requiresPlugins([], require_array))
+
+        except Exception as e:
+            logger.debug("Failed to read requiresPlugins for %s, %s", pluginName, e)
+            return []
+
+    @inlineCallbacks
+    def _loadPluginLevel(self, pluginNames: List[str],
+                         secondsByPluginName: Dict[str, float],
+                         inParallel: bool):
+        """ Load Plugin Level
+
+        Import the plugins packages, in threads if inParallel is set,
+        then load the entry hooks one at a time on the reactor.
+
+        Isolated plugins are loaded in their own processes, concurrently with the
+        other plugins in the level.
+
+        """
+        isolatedNames = [n for n in pluginNames if self._isPluginIsolated(n)]
+        pluginNames = [n for n in pluginNames if n not in isolatedNames]
+
+        isolatedDeferred = DeferredList([
+            self._loadIsolatedPlugin(pluginName, secondsByPluginName)
+            for pluginName in isolatedNames
+        ])
+
+        def timedImport(pluginName):
+            startTime = time.monotonic()
+            try:
+                with self._registrationTracker.scope(pluginName):
+                    return self._importPlugin(pluginName)
+            finally:
+                secondsByPluginName[pluginName] = time.monotonic() - startTime
+
+        if inParallel and len(pluginNames) > 1:
+            results = yield DeferredList([deferToThread(timedImport, pluginName)
+                                          for pluginName in pluginNames],
+                                         consumeErrors=True)
+
+        else:
+            results = []
+            for pluginName in pluginNames:
+                try:
+                    results.append((True, timedImport(pluginName)))
+                except Exception:
+                    results.append((False, Failure()))
+
+        for pluginName, (success, pluginImport) in zip(pluginNames, results):
+            if not success:
+                logger.error("Failed to load plugin %s", pluginName)
+                vortexLogFailure(pluginImport, logger, consumeError=True)
+                continue
+
+            # The plugin doesn't run on this service
+            if not pluginImport:
+                continue
+
+            startTime = time.monotonic()
+            try:
+                yield self._loadImportedPlugin(pluginImport)
 
-            if not issubclass(EntryHookClass, self._entryHookClassType):
-                raise Exception("%s load error, Excpected %s, received %s"
-                                % (pluginName, self._entryHookClassType, EntryHookClass))
+            except Exception as e:
+                logger.error("Failed to load plugin %s", pluginName)
+                logger.exception(e)
 
-            ### Perform the loading of the plugin
-            yield self._loadPluginThrows(pluginName, EntryHookClass,
-                                         pluginRootDir, tuple(pluginRequiresService))
+            secondsByPluginName[pluginName] += time.monotonic() - startTime
 
-            # Make sure the version we have recorded is correct
-            # JJC Disabled, this is just spamming the config file at the moment
-            # PeekPlatformConfig.config.setPluginVersion(pluginName, pluginVersion)
+        yield isolatedDeferred
 
-            # Make note of the final registrations for this plugin
-            self._vortexEndpointInstancesByPluginName[pluginName] = list(
-                set(PayloadIO().endpoints) - endpointInstancesBefore)
+    def _isPluginIsolated(self, pluginName: str) -> bool:
+        # The isolated process loads its plugin normally
+        if isIsolatedPluginProcess():
+            return False
 
-            self._vortexTupleNamesByPluginName[pluginName] = list(
-                set(registeredTupleNames()) - tupleNamesBefore)
+        return PeekPlatformConfig.config.pluginIsolated(pluginName)
+
+    @inlineCallbacks
+    def _loadIsolatedPlugin(self, pluginName: str,
+                            secondsByPluginName: Dict[str, float]):
+        """ Load Isolated Plugin
 
-            self.sanityCheckServerPlugin(pluginName)
+        Spawn the process for an isolated plugin, and once it has loaded the plugin,
+        register the endpoint that forwards the plugins payloads to it.
+
+        The `PluginIsolatedProcess` stands in for the plugins entry hook, so the
+        plugin is started, stopped and unloaded the same as the other plugins.
+
+        """
+        startTime = time.monotonic()
+        isolatedProcess = PluginIsolatedProcess(pluginName)
+
+        try:
+            loaded = yield isolatedProcess.spawn()
+
+            # The plugin doesn't run on this service, the child has exited
+            if not loaded:
+                return
+
+            with self._registrationTracker.scope(pluginName):
+                isolatedProcess.registerEndpoint()
 
         except Exception as e:
-            logger.error("Failed to load plugin %s", pluginName)
+            logger.error("Failed to load isolated plugin %s", pluginName)
             logger.exception(e)
+            isolatedProcess.kill()
+            return
+
+        finally:
+            secondsByPluginName[pluginName] = time.monotonic() - startTime
+            self._startupProfiler.record(pluginName, 'load',
+                                         secondsByPluginName[pluginName])
+
+        self._loadedPlugins[pluginName] = isolatedProcess
+        logger.info("Loaded plugin %s in an isolated process", pluginName)
+
+    def _importPlugin(self, pluginName: str) -> Optional[_PluginImport]:
+        """ Import Plugin
+
+        Import the plugins package and get its entry hook class.
+        This may be called from a worker thread, so it must not touch the reactor.
+
+        :return: The details needed to load the entry hook, or None if the plugin
+            doesn't run on this service.
+
+        """
+        with self._startupProfiler.measure(pluginName, 'findSpec'):
+            modSpec = find_spec(pluginName)
+
+        if not modSpec:
+            raise Exception("Failed to find package %s,"
+                            " is the python package installed?" % pluginName)
+
+        # The plugins submodules will be executed when they are first used
+        if PeekPlatformConfig.config.pluginLazyImport:
+            PluginLazyImportFinder.install(
+                PeekPlatformConfig.config.pluginLazyImportExclude).addPlugin(pluginName)
+
+        with self._startupProfiler.measure(pluginName, 'import', measureRss=True):
+            return self._importPluginPackage(pluginName, modSpec)
+
+    def _importPluginPackage(self, pluginName: str,
+                             modSpec) -> Optional[_PluginImport]:
+        PluginPackage = self._importPluginModule(pluginName, modSpec)
+
+        # The plugin package directory, even if the modules are imported from a zip
+        pluginRootDir = os.path.dirname(modSpec.origin)
+
+        # Load up the plugin package info
+        pluginPackageJson = PluginPackageFileConfig(pluginRootDir)
+        pluginVersion = pluginPackageJson.config.plugin.version(require_string)
+        pluginRequiresService = pluginPackageJson.config.requiresServices(
+            require_array)
+
+        # Make sure the service is required
+        # Storage and Server are loaded at the same time, hence the intersection
+        if not set(pluginRequiresService) & set(self._platformServiceNames):
+            logger.debug("%s does not require %s, Skipping load",
+                         pluginName, self._platformServiceNames)
+            return None
+
+        # Get the entry hook class from the package
+        entryHookGetter = getattr(PluginPackage, str(self._entryHookFuncName))
+        EntryHookClass = entryHookGetter() if entryHookGetter else None
+
+        if not EntryHookClass:
+            logger.warning(
+                "Skipping load for %s, %s.%s is missing or returned None",
+                pluginName, pluginName, self._entryHookFuncName)
+            return None
+
+        if not issubclass(EntryHookClass, self._entryHookClassType):
+            raise Exception("%s load error, Excpected %s, received %s"
+                            % (pluginName, self._entryHookClassType, EntryHookClass))
+
+        return _PluginImport(pluginName, pluginVersion, EntryHookClass,
+                             pluginRootDir, tuple(pluginRequiresService))
+
+    def _importPluginModule(self, pluginName: str, modSpec):
+        """ Import Plugin Module
+
+        Import the plugin from its zip, if zip importing is enabled and the zip is
+        newer than the installed package, otherwise import it normally.
+
+        """
+        config = PeekPlatformConfig.config
+        if not config.pluginZipImport or pluginName in sys.modules:
+            return import_module(pluginName)
+
+        zipPath = BytecodeUtil.packageZipPath(pluginName, config.pluginZipPath)
+        if not os.path.isfile(zipPath):
+            logger.debug("%s has no zip, importing it normally", pluginName)
+            return import_module(pluginName)
+
+        if os.path.getmtime(zipPath) < os.path.getmtime(modSpec.origin):
+            logger.warning("%s is older than the installed package, importing %s"
+                           " normally", zipPath, pluginName)
+            return import_module(pluginName)
+
+        return BytecodeUtil.importZipPackage(pluginName, zipPath)
+
+    @inlineCallbacks
+    def _loadImportedPlugin(self, pluginImport: _PluginImport):
+        pluginName = pluginImport.pluginName
+
+        ### Perform the loading of the plugin
+        with self._startupProfiler.measure(pluginName, 'load', measureRss=True):
+            # Registrations made after this returns are attributed from the call stack
+            with self._registrationTracker.scope(pluginName):
+                d = self._loadPluginThrows(pluginName, pluginImport.EntryHookClass,
+                                           pluginImport.pluginRootDir,
+                                           pluginImport.requiresService)
+            yield d
+
+        # Make sure the version we have recorded is correct
+        # JJC Disabled, this is just spamming the config file at the moment
+        # PeekPlatformConfig.config.setPluginVersion(pluginName, pluginVersion)
+
+        self.sanityCheckServerPlugin(pluginName)
 
     @abstractmethod
     def _loadPluginThrows(self, pluginName: str,
@@ -183,13 +526,13 @@ class PluginLoaderABC(metaclass=ABCMeta):
         del oldLoadedPlugin
 
         # Remove the registered endpoints
-        for endpoint in self._vortexEndpointInstancesByPluginName[pluginName]:
+        for endpoint in self._registrationTracker.endpoints(pluginName):
             PayloadIO().remove(endpoint)
-        del self._vortexEndpointInstancesByPluginName[pluginName]
 
         # Remove the registered tuples
-        removeTuplesForTupleNames(self._vortexTupleNamesByPluginName[pluginName])
-        del self._vortexTupleNamesByPluginName[pluginName]
+        removeTuplesForTupleNames(self._registrationTracker.tupleNames(pluginName))
+
+        self._registrationTracker.forgetPlugin(pluginName)
 
         self._unloadPluginPackage(pluginName)
 
@@ -208,26 +551,13 @@ class PluginLoaderABC(metaclass=ABCMeta):
 
     @inlineCallbacks
     def loadCorePlugins(self):
-        for pluginName in corePlugins:
-            yield self.loadPlugin(pluginName)
+        yield self._loadPlugins(corePlugins)
 
-    @inlineCallbacks
     def startCorePlugins(self):
-        # Start the Plugin
-        for pluginName in corePlugins:
-            if pluginName not in self._loadedPlugins:
-                continue
-
-            yield self._tryStart(pluginName)
+        return self._startPlugins(corePlugins)
 
-    @inlineCallbacks
     def stopCorePlugins(self):
-        # Start the Plugin
-        for pluginName in corePlugins:
-            if pluginName not in self._loadedPlugins:
-                continue
-
-            yield self._tryStop(pluginName)
+        return self._stopPlugins(corePlugins)
 
     def unloadCorePlugins(self):
         for pluginName in corePlugins:
@@ -239,28 +569,18 @@ class PluginLoaderABC(metaclass=ABCMeta):
 
     @inlineCallbacks
     def loadOptionalPlugins(self):
-        for pluginName in PeekPlatformConfig.config.pluginsEnabled:
+        pluginNames = PeekPlatformConfig.config.pluginsEnabled
+        for pluginName in pluginNames:
             if pluginName.startswith("peek_core"):
                 raise Exception("Core plugins can not be configured")
-            yield self.loadPlugin(pluginName)
 
-    @inlineCallbacks
-    def startOptionalPlugins(self):
-        # Start the Plugin
-        for pluginName in PeekPlatformConfig.config.pluginsEnabled:
-            if pluginName not in self._loadedPlugins:
-                continue
+        yield self._loadPlugins(pluginNames)
 
-            yield self._tryStart(pluginName)
+    def startOptionalPlugins(self):
+        return self._startPlugins(PeekPlatformConfig.config.pluginsEnabled)
 
-    @inlineCallbacks
     def stopOptionalPlugins(self):
-        # Start the Plugin
-        for pluginName in reversed(PeekPlatformConfig.config.pluginsEnabled):
-            if pluginName not in self._loadedPlugins:
-                continue
-
-            yield self._tryStop(pluginName)
+        return self._stopPlugins(PeekPlatformConfig.config.pluginsEnabled)
 
     def unloadOptionalPlugins(self):
         for pluginName in reversed(PeekPlatformConfig.config.pluginsEnabled):
@@ -277,6 +597,106 @@ class PluginLoaderABC(metaclass=ABCMeta):
     # ---------------
     # Util methods Plugins
 
+    @property
+    def pluginsPastDeadline(self) -> Dict[str, str]:
+        """ Plugins Past Deadline
+
+        :return: The plugins that are still starting or stopping in the background
+            after missing their deadline, EG {"plugin_noop": "start"}
+
+        """
+        return dict(self._pluginsPastDeadline)
+
+    @inlineCallbacks
+    def _startPlugins(self, pluginNames: List[str]):
+        """ Start Plugins
+
+        Start the plugins one dependency level at a time, the plugins within a level
+        are started concurrently.
+
+        """
+        pluginNames = [n for n in pluginNames if n in self._loadedPlugins]
+        levels = self._pluginDependencyGraph(pluginNames).levels()
+
+        for level in levels:
+            yield DeferredList([
+                self._callWithDeadline(
+                    pluginName, "start", self._tryStart,
+                    PeekPlatformConfig.config.pluginStartTimeout(pluginName))
+                for pluginName in level
+            ])
+
+        self._startupProfiler.writeReport()
+        self._startupProfiler.logSummary(pluginNames)
+
+    @inlineCallbacks
+    def _stopPlugins(self, pluginNames: List[str]):
+        """ Stop Plugins
+
+        Stop the plugins one dependency level at a time, in the reverse order they
+        were started, the plugins within a level are stopped concurrently.
+
+        """
+        pluginNames = [n for n in pluginNames if n in self._loadedPlugins]
+        levels = self._pluginDependencyGraph(pluginNames).levels()
+
+        for level in reversed(levels):
+            yield DeferredList([
+                self._callWithDeadline(
+                    pluginName, "stop", self._tryStop,
+                    PeekPlatformConfig.config.pluginStopTimeout(pluginName))
+                for pluginName in reversed(level)
+            ])
+
+        self._startupProfiler.writeReport()
+
+    def _callWithDeadline(self, pluginName: str, action: str,
+                          func, timeout: float) -> Deferred:
+        """ Call With Deadline
+
+        Call func(pluginName), the returned deferred fires when it completes or when
+        the timeout is reached, which ever is first.
+
+        If the timeout is reached first, the call continues in the background and the
+        plugin is listed in `pluginsPastDeadline` until it completes.
+
+        """
+        startTime = time.monotonic()
+        deadlineDeferred = Deferred()
+
+        def timedOut():
+            self._pluginsPastDeadline[pluginName] = action
+            logger.warning("Plugin %s didn't %s within %ss, continuing with the"
+                           " other plugins while it finishes in the background",
+                           pluginName, action, timeout)
+            deadlineDeferred.callback(None)
+
+        timeoutCall = reactor.callLater(timeout, timedOut)
+
+        def completed(result):
+            self._startupProfiler.record(pluginName, action,
+                                         time.monotonic() - startTime)
+
+            if timeoutCall.active():
+                timeoutCall.cancel()
+                deadlineDeferred.callback(result)
+
+            elif self._pluginsPastDeadline.pop(pluginName, None):
+                logger.info("Plugin %s completed %s in the background, after %.1fs",
+                            pluginName, action, time.monotonic() - startTime)
+
+        def failed(failure):
+            logger.error("An exception occured while %s plugin %s",
+                         "starting" if action == "start" else "stopping",
+                         pluginName)
+            vortexLogFailure(failure, logger, consumeError=True)
+
+        d = maybeDeferred(func, pluginName)
+        d.addErrback(failed)
+        d.addCallback(completed)
+
+        return deadlineDeferred
+
     def _tryStart(self, pluginName):
         plugin = self._loadedPlugins[pluginName]
         try:
@@ -304,6 +724,12 @@ class PluginLoaderABC(metaclass=ABCMeta):
         # Stop and remove the Plugin
         del self._loadedPlugins[pluginName]
 
+        # The plugins packages were never imported in this process
+        if isinstance(oldLoadedPlugin, PluginIsolatedProcess):
+            d = oldLoadedPlugin.unload()
+            d.addErrback(vortexLogFailure, logger, consumeError=True)
+            return
+
         try:
             oldLoadedPlugin.unload()
 
@@ -323,17 +749,9 @@ class PluginLoaderABC(metaclass=ABCMeta):
         if pluginName in sys.modules:
             del sys.modules[pluginName]
 
-        gc.collect()
-
-        # pypy doesn't have getrefcount
-        # ("oldLoadedPlugin" in this method and the call to getrefcount) == 2 references
-        if hasattr(sys, "getrefcount") and sys.getrefcount(oldLoadedPlugin) > 2:
-            logger.warning("Old references to %s still exist, count = %s",
-                           pluginName, sys.getrefcount(oldLoadedPlugin))
-
+        # Collect the garbage later, and check that the old plugin is released
+        self._unloadCollector.pluginUnloaded(pluginName, oldLoadedPlugin)
         del oldLoadedPlugin
-        gc.collect()
-        # Now there should be no references.
 
     def sanityCheckServerPlugin(self, pluginName):
         ''' Sanity Check Plugin
@@ -343,19 +761,128 @@ class PluginLoaderABC(metaclass=ABCMeta):
         '''
 
         # All endpoint filters must have the 'plugin' : 'plugin_name' in them
-        for endpoint in self._vortexEndpointInstancesByPluginName[pluginName]:
+        for endpoint in self._registrationTracker.endpoints(pluginName):
             filt = endpoint.filt
-            if 'plugin' not in filt and filt['plugin'] != pluginName:
+            if 'plugin' not in filt or filt['plugin'] != pluginName:
                 raise Exception("Payload endpoint does not contan 'plugin':'%s'\n%s"
                                 % (pluginName, filt))
 
         # all tuple names must start with their pluginName
-        for tupleName in self._vortexTupleNamesByPluginName[pluginName]:
+        for tupleName in self._registrationTracker.tupleNames(pluginName):
             TupleCls = tupleForTupleName(tupleName)
             if not tupleName.startswith(pluginName):
                 raise Exception("Tuple name does not start with '%s', %s (%s)"
                                 % (pluginName, tupleName, TupleCls.__name__))
 
+    @inlineCallbacks
+    def warmReloadPlugin(self, pluginName: str):
+        """ Warm Reload Plugin
+
+        Load the installed version of a plugin along side the running version, then
+        switch to it.
+
+        The new version is imported, loaded and started while the running version
+        keeps serving, its endpoints and tuple types are staged, see
+        `PluginRegistrationTracker.beginStaging`. Then in one reactor call, the
+        registrations are switched to the new version, after which the old version is
+        stopped and unloaded.
+
+        Both versions run until the old version has stopped, and the tuple names both
+        versions declare are switched to the new versions tuple types.
+
+        If the new version fails to load or start, the running version is left as
+        it was.
+
+        Plugins that aren't loaded, or are isolated, are loaded with `loadPlugin`.
+
+        """
+        oldEntryHook = self._loadedPlugins.get(pluginName)
+
+        if not oldEntryHook or isinstance(oldEntryHook, PluginIsolatedProcess):
+            self.unloadPlugin(pluginName)
+            yield self.loadPlugin(pluginName)
+            return
+
+        # Set the running versions modules aside, so the new version is imported fresh.
+        # The running version holds its own references to them.
+        oldModules = self._popPluginModules(pluginName)
+
+        self._registrationTracker.beginStaging(pluginName)
+        newEntryHook = None
+        try:
+            with self._registrationTracker.scope(pluginName):
+                pluginImport = self._importPlugin(pluginName)
+
+            if not pluginImport:
+                raise Exception("%s no longer loads on this service" % pluginName)
+
+            yield self._loadImportedPlugin(pluginImport)
+
+            newEntryHook = self._loadedPlugins.get(pluginName)
+            if newEntryHook is oldEntryHook:
+                newEntryHook = None
+                raise Exception("%s, _loadPluginThrows didn't load a new entry hook"
+                                % pluginName)
+
+            # Start the new version while it's staged, so the endpoints it registers
+            # when it starts are switched to with the rest
+            with self._registrationTracker.scope(pluginName):
+                d = maybeDeferred(newEntryHook.start)
+            yield d
+
+        except Exception as e:
+            logger.error("Failed to warm reload plugin %s, the running version"
+                         " continues", pluginName)
+            logger.exception(e)
+
+            self._registrationTracker.abortStaging(pluginName)
+
+            if newEntryHook:
+                try:
+                    yield maybeDeferred(newEntryHook.stop)
+                    newEntryHook.unload()
+
+                except Exception as e:
+                    logger.error("An exception occured while stopping the new version"
+                                 " of plugin %s", pluginName)
+                    logger.exception(e)
+
+            self._loadedPlugins[pluginName] = oldEntryHook
+            self._popPluginModules(pluginName)
+            sys.modules.update(oldModules)
+            return
+
+        # Switch to the new version
+        self._registrationTracker.commitStaging(pluginName)
+        self._loadedPlugins[pluginName] = newEntryHook
+        self.sanityCheckServerPlugin(pluginName)
+
+        # Stop the old version, it no longer receives payloads
+        try:
+            yield maybeDeferred(oldEntryHook.stop)
+            oldEntryHook.unload()
+
+        except Exception as e:
+            logger.error("An exception occured while stopping the old version of"
+                         " plugin %s, reloading continues", pluginName)
+            logger.exception(e)
+
+        self._registrationTracker.releaseRetiredTuples(pluginName)
+
+        self._unloadCollector.pluginUnloaded(pluginName, oldEntryHook)
+        del oldEntryHook, oldModules
+
+        logger.info("Warm reloaded plugin %s", pluginName)
+
+    def _popPluginModules(self, pluginName: str) -> Dict[str, object]:
+        return {modName: sys.modules.pop(modName)
+                for modName in list(sys.modules)
+                if modName == pluginName or modName.startswith('%s.' % pluginName)}
+
     def notifyOfPluginVersionUpdate(self, pluginName, pluginVersion):
         logger.info("Received PLUGIN update for %s version %s", pluginName, pluginVersion)
+
+        if PeekPlatformConfig.config.pluginWarmReload:
+            return self.warmReloadPlugin(pluginName)
+
         return self.loadPlugin(pluginName)
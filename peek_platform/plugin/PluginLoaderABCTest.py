@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred, inlineCallbacks
+from twisted.internet.task import deferLater
+from twisted.trial import unittest
+
+from peek_platform import PeekPlatformConfig
+from peek_platform.file_config.PeekFileConfigABC import PeekFileConfigABC
+from peek_platform.file_config.PeekFileConfigPlatformMixin import \
+    PeekFileConfigPlatformMixin
+from peek_platform.plugin.PluginLoaderABC import PluginLoaderABC
+
+
+class _TestFileConfig(PeekFileConfigABC, PeekFileConfigPlatformMixin):
+    pass
+
+
+class _TestPluginLoader(PluginLoaderABC):
+    _entryHookFuncName = 'peekTestEntryHook'
+    _entryHookClassType = object
+    _platformServiceNames = ['server']
+
+    def _loadPluginThrows(self, pluginName, EntryHookClass, pluginRootDir,
+                          requiresService):
+        self._loadedPlugins[pluginName] = EntryHookClass()
+
+
+class _EntryHook:
+    """ A plugin entry hook, that records when it's started and stopped """
+
+    def __init__(self, name: str, events: list, seconds: float = 0):
+        self._name = name
+        self._events = events
+        self._seconds = seconds
+        self.blocker = None
+
+    def _run(self, action: str, completedAction: str):
+        self._events.append((action, self._name))
+
+        if self.blocker:
+            return self.blocker
+
+        def completed():
+            self._events.append((completedAction, self._name))
+
+        return deferLater(reactor, self._seconds, completed)
+
+    def start(self):
+        return self._run('start', 'started')
+
+    def stop(self):
+        return self._run('stop', 'stopped')
+
+
+class PluginLoaderABCTest(unittest.TestCase):
+    COMPONENT_NAME = 'unit_test_loader'
+    HOME_DIR = os.path.expanduser('~/%s.home' % COMPONENT_NAME)
+
+    def setUp(self):
+        self._componentName = PeekPlatformConfig.componentName
+        self._config = PeekPlatformConfig.config
+
+        if os.path.exists(self.HOME_DIR):
+            shutil.rmtree(self.HOME_DIR)
+        os.makedirs(self.HOME_DIR)
+
+        with open(os.path.join(self.HOME_DIR, 'config.json'), 'w') as f:
+            json.dump({'plugin': {'loadInParallel': True,
+                                  'startTimeout': 5,
+                                  'peek_plugin_slow': {'startTimeout': 0.1}}}, f)
+
+        _TestFileConfig._PeekFileConfigBase__instance = None
+        PeekPlatformConfig.componentName = self.COMPONENT_NAME
+        PeekPlatformConfig.config = _TestFileConfig()
+
+        self._events = []
+        self._loader = _TestPluginLoader()
+
+    def tearDown(self):
+        _TestPluginLoader._instance = None
+        PeekPlatformConfig.componentName = self._componentName
+        PeekPlatformConfig.config = self._config
+        shutil.rmtree(self.HOME_DIR)
+
+    def _addPlugin(self, name: str, requires=(), seconds: float = 0) -> _EntryHook:
+        entryHook = _EntryHook(name, self._events, seconds)
+        self._loader._loadedPlugins[name] = entryHook
+        self._loader._requiresPluginsByPluginName[name] = list(requires)
+        return entryHook
+
+    @inlineCallbacks
+    def testLevelsStartConcurrentlyInOrder(self):
+        self._addPlugin('peek_plugin_a', seconds=0.05)
+        self._addPlugin('peek_plugin_b', requires=['peek_plugin_a'])
+        self._addPlugin('peek_plugin_c', seconds=0.05)
+
+        yield self._loader._startPlugins(
+            ['peek_plugin_a', 'peek_plugin_b', 'peek_plugin_c'])
+
+        events = self._events
+
+        # a and c start together, b waits for a
+        self.assertEqual(set(events[:2]), {('start', 'peek_plugin_a'),
+                                           ('start', 'peek_plugin_c')})
+        self.assertLess(events.index(('started', 'peek_plugin_a')),
+                        events.index(('start', 'peek_plugin_b')))
+
+    @inlineCallbacks
+    def testLevelsStopInReverse(self):
+        self._addPlugin('peek_plugin_a')
+        self._addPlugin('peek_plugin_b', requires=['peek_plugin_a'])
+
+        yield self._loader._stopPlugins(['peek_plugin_a', 'peek_plugin_b'])
+
+        self.assertEqual(self._events, [('stop', 'peek_plugin_b'),
+                                        ('stopped', 'peek_plugin_b'),
+                                        ('stop', 'peek_plugin_a'),
+                                        ('stopped', 'peek_plugin_a')])
+
+    @inlineCallbacks
+    def testSlowPluginsFinishInTheBackground(self):
+        slow = self._addPlugin('peek_plugin_slow')
+        slow.blocker = Deferred()
+        self._addPlugin('peek_plugin_b', requires=['peek_plugin_slow'])
+
+        yield self._loader._startPlugins(['peek_plugin_slow', 'peek_plugin_b'])
+
+        # The slow plugin missed its deadline, so the plugins after it started
+        self.assertIn(('started', 'peek_plugin_b'), self._events)
+        self.assertEqual(self._loader.pluginsPastDeadline,
+                         {'peek_plugin_slow': 'start'})
+
+        slow.blocker.callback(None)
+        self.assertEqual(self._loader.pluginsPastDeadline, {})
@@ -0,0 +1,408 @@
+import logging
+import sys
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import vortex.Tuple
+from vortex.PayloadIO import PayloadIO
+
+logger = logging.getLogger(__name__)
+
+
+class PluginRegistrationTracker:
+    """ Plugin Registration Tracker
+
+    This class records which plugin registered each vortex PayloadEndpoint and Tuple
+    type, as they are registered.
+
+    A registration is attributed to the plugin of the `scope()` it's made in. Failing
+    that, endpoints are attributed to the plugin package found first in the call
+    stack, then to the endpoints "plugin" filter key. Tuples are attributed to the top
+    level package of the module they're declared in.
+
+    This replaces diffing all the registrations before and after each plugin is loaded,
+    which is O(n) per plugin, and can't tell concurrently loaded plugins apart.
+
+    While a plugin is staged, see `beginStaging`, the endpoints registered by the new
+    version are held back from vortex, as are the tuple names declared in its package,
+    until `commitStaging` swaps them for the plugins current registrations. The staged
+    tuple types are set up straight away, so the new version can create them.
+
+    This is the only hook on PayloadIO.add and PayloadIO.remove, other code that needs
+    to follow the endpoints registered with vortex uses `observeEndpoints`.
+
+    """
+
+    #: How many stack frames to look through to find the registering plugin
+    MAX_STACK_DEPTH = 40
+
+    __instance = None
+
+    def __new__(cls):
+        if cls.__instance is None:
+            cls.__instance = object.__new__(cls)
+            cls.__instance.__singletonInit()
+        return cls.__instance
+
+    def __singletonInit(self):
+        self._lock = threading.RLock()
+        self._scopes = threading.local()
+
+        self._knownPluginNames: Set[str] = set()
+        self._endpointsByPluginName: Dict[str, set] = defaultdict(set)
+        self._pluginNameByEndpoint: Dict[object, str] = {}
+        self._tupleNamesByPluginName: Dict[str, Set[str]] = defaultdict(set)
+
+        self._stagedEndpointsByPluginName: Dict[str, list] = {}
+        self._stagedTupleTypesByPluginName: Dict[str, list] = {}
+        self._retiredTupleNamesByPluginName: Dict[str, Set[str]] = {}
+
+        self._endpointObservers: List[Tuple[Callable, Callable]] = []
+
+        self._patchRegistrations()
+
+    def _patchRegistrations(self) -> None:
+        tracker = self
+
+        payloadIoAdd = PayloadIO.add
+        payloadIoRemove = PayloadIO.remove
+        self._addTupleType = addTupleType = vortex.Tuple.addTupleType
+
+        def add(payloadIo, endpoint):
+            pluginName = tracker._endpointPluginName(endpoint)
+            if tracker._stageEndpoint(pluginName, endpoint):
+                return
+
+            payloadIoAdd(payloadIo, endpoint)
+            tracker._endpointAdded(pluginName, endpoint)
+
+            for added, _ in tracker._endpointObservers:
+                added(endpoint)
+
+        def remove(payloadIo, endpoint):
+            payloadIoRemove(payloadIo, endpoint)
+            tracker._endpointRemoved(endpoint)
+
+            for _, removed in tracker._endpointObservers:
+                removed(endpoint)
+
+        def trackedAddTupleType(cls):
+            if tracker._stageTupleType(cls):
+                return cls
+
+            tracker._releaseRetiredTupleNames([cls.tupleName()])
+            result = addTupleType(cls)
+            tracker._tupleTypeAdded(cls)
+            return result
+
+        PayloadIO.add = add
+        PayloadIO.remove = remove
+        vortex.Tuple.addTupleType = trackedAddTupleType
+
+    def observeEndpoints(self, added: Callable, removed: Callable) -> None:
+        """ Observe Endpoints
+
+        Call these with each endpoint that is added to, or removed from PayloadIO.
+        Staged endpoints are only passed to added when they're committed.
+
+        :param added: Called with the endpoint, after it's added.
+        :param removed: Called with the endpoint, after it's removed.
+
+        """
+        self._endpointObservers.append((added, removed))
+
+    @contextmanager
+    def scope(self, pluginName: str):
+        """ Scope
+
+        Attribute the registrations made in this thread, within this block, to this
+        plugin.
+
+        """
+        with self._lock:
+            self._knownPluginNames.add(pluginName)
+
+        stack = getattr(self._scopes, 'stack', None)
+        if stack is None:
+            stack = self._scopes.stack = []
+
+        stack.append(pluginName)
+        try:
+            yield
+
+        finally:
+            stack.pop()
+
+    def endpoints(self, pluginName: str) -> List:
+        with self._lock:
+            return list(self._endpointsByPluginName.get(pluginName, ()))
+
+    def tupleNames(self, pluginName: str) -> List[str]:
+        with self._lock:
+            return list(self._tupleNamesByPluginName.get(pluginName, ()))
+
+    def forgetPlugin(self, pluginName: str) -> None:
+        """ Forget Plugin
+
+        Drop the registrations recorded for this plugin, call this after they've been
+        removed from vortex.
+
+        """
+        with self._lock:
+            for endpoint in self._endpointsByPluginName.pop(pluginName, ()):
+                self._pluginNameByEndpoint.pop(endpoint, None)
+
+            self._tupleNamesByPluginName.pop(pluginName, None)
+
+    def beginStaging(self, pluginName: str) -> None:
+        """ Begin Staging
+
+        Hold back the registrations of a new version of this plugin, while the
+        current version keeps serving.
+
+        The endpoints registered within this plugins `scope()`, or from the modules of
+        the plugin in sys.modules, are held, as are the tuple types declared in its
+        package. So the new version can be imported and started while the current
+        versions modules, set aside from sys.modules, keep serving.
+
+        """
+        with self._lock:
+            self._knownPluginNames.add(pluginName)
+            self._stagedEndpointsByPluginName[pluginName] = []
+            self._stagedTupleTypesByPluginName[pluginName] = []
+
+    def commitStaging(self, pluginName: str) -> None:
+        """ Commit Staging
+
+        Replace the plugins current endpoints and tuple types with the staged ones.
+        This is called from the reactor thread, so no payloads are processed part way
+        through the switch.
+
+        Vortex has one tuple type per tuple name, so the names both versions declare
+        are switched to the new versions types. The names only the current version
+        declares stay registered while it stops, until `releaseRetiredTuples`.
+
+        """
+        with self._lock:
+            stagedEndpoints = self._stagedEndpointsByPluginName.pop(pluginName)
+            stagedTupleTypes = self._stagedTupleTypesByPluginName.pop(pluginName)
+
+            # Add and remove the endpoints through PayloadIO, so the other
+            # registration hooks see the switch
+            payloadIo = PayloadIO()
+            for endpoint in self.endpoints(pluginName):
+                payloadIo.remove(endpoint)
+
+            tupleNames = set(self.tupleNames(pluginName))
+            stagedTupleNames = {cls.tupleName() for cls in stagedTupleTypes}
+
+            self._removeTupleTypes(tupleNames & stagedTupleNames)
+            self._retiredTupleNamesByPluginName.setdefault(pluginName, set()) \
+                .update(tupleNames - stagedTupleNames)
+            self.forgetPlugin(pluginName)
+
+            for cls in stagedTupleTypes:
+                self._releaseRetiredTupleNames([cls.tupleName()])
+                self._registerTupleType(cls)
+                self._tupleTypeAdded(cls)
+
+            with self.scope(pluginName):
+                for endpoint in stagedEndpoints:
+                    payloadIo.add(endpoint)
+
+        logger.debug("Switched %s to %s staged endpoints and %s staged tuple types",
+                     pluginName, len(stagedEndpoints), len(stagedTupleTypes))
+
+    def releaseRetiredTuples(self, pluginName: str) -> None:
+        """ Release Retired Tuples
+
+        Remove the tuple names that only the replaced version of this plugin declared,
+        call this once that version has stopped and unloaded.
+
+        """
+        with self._lock:
+            tupleNames = self._retiredTupleNamesByPluginName.pop(pluginName, ())
+            self._removeTupleTypes(tupleNames)
+
+    def abortStaging(self, pluginName: str) -> None:
+        """ Abort Staging
+
+        Drop the staged registrations, the plugins current registrations are left as
+        they are.
+
+        """
+        with self._lock:
+            self._stagedEndpointsByPluginName.pop(pluginName, None)
+            self._stagedTupleTypesByPluginName.pop(pluginName, None)
+
+    def _scopePluginName(self) -> Optional[str]:
+        stack = getattr(self._scopes, 'stack', None)
+        return stack[-1] if stack else None
+
+    def _stackPluginName(self) -> Optional[str]:
+        frame = sys._getframe(3)
+        depth = 0
+        while frame and depth < self.MAX_STACK_DEPTH:
+            packageName = frame.f_globals.get('__name__', '').split('.')[0]
+            if packageName in self._knownPluginNames:
+                return packageName
+
+            frame = frame.f_back
+            depth += 1
+
+        return None
+
+    def _endpointPluginName(self, endpoint) -> Optional[str]:
+        pluginName = self._scopePluginName() or self._stackPluginName()
+        if pluginName:
+            return pluginName
+
+        filtPluginName = endpoint.filt.get('plugin')
+        if filtPluginName in self._knownPluginNames:
+            return filtPluginName
+
+        return None
+
+    def _stackIsInSysModules(self, pluginName: str) -> bool:
+        """ Stack Is In Sys Modules
+
+        :return: True if the plugin code found first in the call stack is from the
+            modules in sys.modules, IE the staged version, rather than from the current
+            versions modules, which were set aside.
+
+        """
+        frame = sys._getframe(3)
+        depth = 0
+        while frame and depth < self.MAX_STACK_DEPTH:
+            modName = frame.f_globals.get('__name__', '')
+            if modName.split('.')[0] == pluginName:
+                module = sys.modules.get(modName)
+                return module is not None and vars(module) is frame.f_globals
+
+            frame = frame.f_back
+            depth += 1
+
+        return False
+
+    def _stageEndpoint(self, pluginName: Optional[str], endpoint) -> bool:
+        # Only the endpoints registered by the new version are staged, the current
+        # version may still register its own endpoints
+        if not pluginName or pluginName not in self._stagedEndpointsByPluginName:
+            return False
+
+        if (self._scopePluginName() != pluginName
+                and not self._stackIsInSysModules(pluginName)):
+            return False
+
+        with self._lock:
+            stagedEndpoints = self._stagedEndpointsByPluginName.get(pluginName)
+            if stagedEndpoints is None:
+                return False
+
+            stagedEndpoints.append(endpoint)
+            return True
+
+    def _stageTupleType(self, cls) -> bool:
+        packageName = (cls.__module__ or '').split('.')[0]
+
+        with self._lock:
+            stagedTupleTypes = self._stagedTupleTypesByPluginName.get(packageName)
+            if stagedTupleTypes is None:
+                return False
+
+            self._setUpTupleType(cls)
+            stagedTupleTypes.append(cls)
+            return True
+
+    def _setUpTupleType(self, cls) -> None:
+        """ Set Up Tuple Type
+
+        Run vortex's addTupleType for a staged tuple type, without registering its
+        names. addTupleType sets up the field names the tuple needs to be created and
+        serialised, it registers the tuple under a placeholder name here, which is
+        removed again.
+
+        """
+        tupleName = cls.tupleName()
+        if tupleName is None:
+            self._addTupleType(cls)  # Raises the missing __tupleType__ exception
+
+        if not tupleName:
+            tupleName = "%s.%s" % (cls.__module__, cls.__name__)
+
+        tupleTypeShort = cls.__tupleTypeShort__
+        registeredShort = vortex.Tuple.TUPLE_TYPES_BY_SHORT_NAME.get(tupleTypeShort)
+        if registeredShort and registeredShort.tupleName() != tupleName:
+            raise Exception("Tuple short name is already registered.\n"
+                            "Tuple short name is %s" % tupleTypeShort)
+
+        placeholderName = "%s.__staged__%s" % (tupleName, id(cls))
+        cls.__tupleType__ = placeholderName
+        cls.__tupleTypeShort__ = None
+        try:
+            self._addTupleType(cls)
+
+        finally:
+            cls.__tupleType__ = tupleName
+            cls.__tupleTypeShort__ = tupleTypeShort
+            self._removeTupleTypes([placeholderName])
+
+    def _registerTupleType(self, cls) -> None:
+        vortex.Tuple.TUPLE_TYPES.append(cls)
+        vortex.Tuple.TUPLE_TYPES_BY_NAME[cls.tupleName()] = cls
+
+        if cls.__tupleTypeShort__:
+            vortex.Tuple.TUPLE_TYPES_BY_SHORT_NAME[cls.__tupleTypeShort__] = cls
+
+    def _removeTupleTypes(self, tupleNames) -> None:
+        # vortex's removeTuplesForTupleNames removes the short names of the tuples it
+        # keeps, rather than the ones it removes
+        for tupleName in tupleNames:
+            cls = vortex.Tuple.TUPLE_TYPES_BY_NAME.pop(tupleName, None)
+            if cls is None:
+                continue
+
+            if cls in vortex.Tuple.TUPLE_TYPES:
+                vortex.Tuple.TUPLE_TYPES.remove(cls)
+
+            shortName = cls.__tupleTypeShort__
+            if vortex.Tuple.TUPLE_TYPES_BY_SHORT_NAME.get(shortName) is cls:
+                del vortex.Tuple.TUPLE_TYPES_BY_SHORT_NAME[shortName]
+
+    def _releaseRetiredTupleNames(self, tupleNames) -> None:
+        # A new version declared a tuple name after its switch, that the replaced
+        # version still holds
+        with self._lock:
+            for retiredTupleNames in self._retiredTupleNamesByPluginName.values():
+                releasedNames = retiredTupleNames & set(tupleNames)
+                retiredTupleNames -= releasedNames
+                self._removeTupleTypes(releasedNames)
+
+    def _endpointAdded(self, pluginName: Optional[str], endpoint) -> None:
+        if not pluginName:
+            return
+
+        with self._lock:
+            self._endpointsByPluginName[pluginName].add(endpoint)
+            self._pluginNameByEndpoint[endpoint] = pluginName
+
+    def _endpointRemoved(self, endpoint) -> None:
+        with self._lock:
+            pluginName = self._pluginNameByEndpoint.pop(endpoint, None)
+            if pluginName:
+                self._endpointsByPluginName[pluginName].discard(endpoint)
+
+    def _tupleTypeAdded(self, cls) -> None:
+        packageName = (cls.__module__ or '').split('.')[0]
+        if packageName in self._knownPluginNames:
+            pluginName = packageName
+        else:
+            pluginName = self._scopePluginName()
+
+        if not pluginName:
+            return
+
+        with self._lock:
+            self._tupleNamesByPluginName[pluginName].add(cls.tupleName())
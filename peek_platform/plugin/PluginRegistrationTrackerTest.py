@@ -0,0 +1,165 @@
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import vortex.Tuple
+from vortex.PayloadIO import PayloadIO
+
+from peek_platform.plugin.PluginRegistrationTracker import PluginRegistrationTracker
+
+PLUGIN_NAME = 'peek_plugin_tracker_test'
+
+REGISTRATIONS = '''
+from vortex.PayloadEndpoint import PayloadEndpoint
+from vortex.Tuple import Tuple, TupleField, addTupleType
+
+
+def _handler(*args, **kwargs):
+    pass
+
+
+def register(key):
+    return PayloadEndpoint({'plugin': '%(pluginName)s', 'key': key}, _handler)
+
+
+@addTupleType
+class SharedTuple(Tuple):
+    __tupleType__ = '%(pluginName)s.SharedTuple'
+
+    value = TupleField()
+'''
+
+OLD_TUPLE = '''
+
+@addTupleType
+class OldTuple(Tuple):
+    __tupleType__ = '%(pluginName)s.OldTuple'
+'''
+
+SHARED_TUPLE_NAME = PLUGIN_NAME + '.SharedTuple'
+OLD_TUPLE_NAME = PLUGIN_NAME + '.OldTuple'
+
+
+class PluginRegistrationTrackerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tracker = PluginRegistrationTracker()
+        self._dir = tempfile.mkdtemp()
+
+        os.makedirs(os.path.join(self._dir, PLUGIN_NAME))
+        with open(os.path.join(self._dir, PLUGIN_NAME, '__init__.py'), 'w'):
+            pass
+
+        sys.path.insert(0, self._dir)
+
+    def tearDown(self):
+        sys.path.remove(self._dir)
+
+        for endpoint in self._tracker.endpoints(PLUGIN_NAME):
+            PayloadIO().remove(endpoint)
+
+        self._tracker.abortStaging(PLUGIN_NAME)
+        self._tracker.releaseRetiredTuples(PLUGIN_NAME)
+        vortex.Tuple.removeTuplesForTupleNames([SHARED_TUPLE_NAME, OLD_TUPLE_NAME])
+        self._tracker.forgetPlugin(PLUGIN_NAME)
+
+        self._popModules()
+        shutil.rmtree(self._dir)
+
+    def _popModules(self):
+        return {modName: sys.modules.pop(modName)
+                for modName in list(sys.modules)
+                if modName.split('.')[0] == PLUGIN_NAME}
+
+    def _importVersion(self, withOldTuple: bool):
+        source = REGISTRATIONS + (OLD_TUPLE if withOldTuple else '')
+        with open(os.path.join(self._dir, PLUGIN_NAME, 'Registrations.py'), 'w') as f:
+            f.write(source % dict(pluginName=PLUGIN_NAME))
+
+        importlib.invalidate_caches()
+        with self._tracker.scope(PLUGIN_NAME):
+            return importlib.import_module(PLUGIN_NAME + '.Registrations')
+
+    def testRegistrationsAreAttributed(self):
+        module = self._importVersion(withOldTuple=True)
+
+        endpoint = module.register('tracker.scoped')
+        self.assertEqual(self._tracker.endpoints(PLUGIN_NAME), [endpoint])
+        self.assertEqual(sorted(self._tracker.tupleNames(PLUGIN_NAME)),
+                         [OLD_TUPLE_NAME, SHARED_TUPLE_NAME])
+
+        PayloadIO().remove(endpoint)
+        self.assertEqual(self._tracker.endpoints(PLUGIN_NAME), [])
+
+    def testStagedVersionIsSwitchedTo(self):
+        oldModule = self._importVersion(withOldTuple=True)
+        oldEndpoint = oldModule.register('tracker.old')
+        oldModules = self._popModules()
+
+        self._tracker.beginStaging(PLUGIN_NAME)
+        newModule = self._importVersion(withOldTuple=False)
+
+        # Registered outside the scope, EG after start() yields, by the new version
+        newEndpoint = newModule.register('tracker.new')
+
+        # The running version still registers its endpoints
+        runningEndpoint = oldModule.register('tracker.running')
+
+        endpoints = PayloadIO().endpoints
+        self.assertNotIn(newEndpoint, endpoints)
+        self.assertIn(runningEndpoint, endpoints)
+        self.assertIs(vortex.Tuple.TUPLE_TYPES_BY_NAME[SHARED_TUPLE_NAME],
+                      oldModule.SharedTuple)
+
+        self._tracker.commitStaging(PLUGIN_NAME)
+
+        endpoints = PayloadIO().endpoints
+        self.assertIn(newEndpoint, endpoints)
+        self.assertNotIn(oldEndpoint, endpoints)
+        self.assertNotIn(runningEndpoint, endpoints)
+        self.assertIs(vortex.Tuple.TUPLE_TYPES_BY_NAME[SHARED_TUPLE_NAME],
+                      newModule.SharedTuple)
+
+        # The old version keeps the tuples only it declares, until it's unloaded
+        self.assertIs(vortex.Tuple.TUPLE_TYPES_BY_NAME[OLD_TUPLE_NAME],
+                      oldModules[PLUGIN_NAME + '.Registrations'].OldTuple)
+
+        self._tracker.releaseRetiredTuples(PLUGIN_NAME)
+        self.assertNotIn(OLD_TUPLE_NAME, vortex.Tuple.TUPLE_TYPES_BY_NAME)
+
+    def testAbortedStagingLeavesTheRunningVersion(self):
+        oldModule = self._importVersion(withOldTuple=True)
+        oldEndpoint = oldModule.register('tracker.old')
+        self._popModules()
+
+        self._tracker.beginStaging(PLUGIN_NAME)
+        newEndpoint = self._importVersion(withOldTuple=False).register('tracker.new')
+        self._tracker.abortStaging(PLUGIN_NAME)
+
+        self.assertIn(oldEndpoint, PayloadIO().endpoints)
+        self.assertNotIn(newEndpoint, PayloadIO().endpoints)
+        self.assertIs(vortex.Tuple.TUPLE_TYPES_BY_NAME[SHARED_TUPLE_NAME],
+                      oldModule.SharedTuple)
+
+    def testStagedTuplesCanBeCreated(self):
+        self._importVersion(withOldTuple=False)
+        self._popModules()
+
+        self._tracker.beginStaging(PLUGIN_NAME)
+        newModule = self._importVersion(withOldTuple=False)
+
+        # The new versions load() and start() create their tuples while staged
+        tuple_ = newModule.SharedTuple(value=1)
+        self.assertEqual(tuple_.toJsonDict(),
+                         {'_ct': 'rt', '_c': SHARED_TUPLE_NAME,
+                          'value': {'_ft': 'int', '_fd': 1}})
+        self.assertNotIn(newModule.SharedTuple, vortex.Tuple.TUPLE_TYPES)
+
+        self._tracker.commitStaging(PLUGIN_NAME)
+
+        TupleType = vortex.Tuple.tupleForTupleName(SHARED_TUPLE_NAME)
+        self.assertIs(TupleType, newModule.SharedTuple)
+        self.assertEqual(TupleType().fromJsonDict(tuple_.toJsonDict()).value, 1)
@@ -0,0 +1,276 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from importlib.machinery import SourceFileLoader, SourcelessFileLoader
+from typing import Dict, Optional
+
+import psutil
+import pytz
+
+from peek_platform.util.MemUtil import rpad, lpad
+
+logger = logging.getLogger(__name__)
+
+
+class PluginStartupProfiler:
+    """ Plugin Startup Profiler
+
+    This class records how long each plugin takes in each phase of its startup,
+    find_spec, import, load (_loadPluginThrows), start and stop, and the RSS growth of
+    the process over the import and load.
+
+    While a plugin is imported, the execution time of each of its modules is recorded,
+    like "python -X importtime", so the heaviest modules can be reported.
+
+    The results are written to a JSON report file, so they can be compared between
+    releases, and a summary table is logged.
+
+    Profiling is opt-in, when it's not enabled nothing is recorded. The module
+    loaders are only wrapped between `startModuleTiming` and `stopModuleTiming`.
+
+    """
+
+    #: The number of heaviest modules to report for each plugin
+    HEAVIEST_MODULE_COUNT = 10
+
+    #: The phases that are timed, in the order they are reported
+    PHASES = ('findSpec', 'import', 'load', 'start', 'stop')
+
+    #: The loaders that plugin modules are executed by
+    LOADER_CLASSES = (SourceFileLoader, SourcelessFileLoader)
+
+    def __init__(self, reportFilePath: str, enabled: bool = True):
+        self._reportFilePath = reportFilePath
+        self._enabled = enabled
+        self._lock = threading.Lock()
+        self._importStack = threading.local()
+        self._process = psutil.Process()
+
+        self._pluginNames = set()
+        self._secondsByPhaseByPluginName: Dict[str, Dict[str, float]] = \
+            defaultdict(dict)
+        self._rssDeltaByPluginName: Dict[str, int] = defaultdict(int)
+        self._moduleTimesByPluginName: Dict[str, Dict[str, tuple]] = \
+            defaultdict(dict)
+
+        self._moduleTimingDepth = 0
+        self._execModulesByLoaderClass = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def startModuleTiming(self) -> None:
+        """ Start Module Timing
+
+        Time the execution of plugin modules, by wrapping the exec_module of the
+        loaders that plugin modules are loaded with, until `stopModuleTiming`.
+
+        """
+        if not self._enabled:
+            return
+
+        self._moduleTimingDepth += 1
+        if self._moduleTimingDepth != 1:
+            return
+
+        profiler = self
+
+        for LoaderClass in self.LOADER_CLASSES:
+            # Keep what the class itself defines, it may inherit exec_module
+            self._execModulesByLoaderClass[LoaderClass] = \
+                LoaderClass.__dict__.get('exec_module')
+
+            def timedExecModule(loader, module, _execModule=LoaderClass.exec_module):
+                pluginName = module.__name__.split('.')[0]
+                if pluginName not in profiler._pluginNames:
+                    return _execModule(loader, module)
+
+                with profiler._timeModule(pluginName, module.__name__):
+                    return _execModule(loader, module)
+
+            LoaderClass.exec_module = timedExecModule
+
+    def stopModuleTiming(self) -> None:
+        """ Stop Module Timing
+
+        Restore the loaders exec_module methods that `startModuleTiming` wrapped.
+
+        """
+        if not self._moduleTimingDepth:
+            return
+
+        self._moduleTimingDepth -= 1
+        if self._moduleTimingDepth:
+            return
+
+        for LoaderClass, execModule in self._execModulesByLoaderClass.items():
+            if execModule is None:
+                del LoaderClass.exec_module
+            else:
+                LoaderClass.exec_module = execModule
+
+        self._execModulesByLoaderClass = {}
+
+    @contextmanager
+    def _timeModule(self, pluginName: str, modName: str):
+        stack = getattr(self._importStack, 'stack', None)
+        if stack is None:
+            stack = self._importStack.stack = []
+
+        # Each frame holds the time spent importing the modules it imports
+        frame = [0.0]
+        stack.append(frame)
+        startTime = time.perf_counter()
+        try:
+            yield
+
+        finally:
+            seconds = time.perf_counter() - startTime
+            stack.pop()
+            if stack:
+                stack[-1][0] += seconds
+
+            with self._lock:
+                self._moduleTimesByPluginName[pluginName][modName] = \
+                    (seconds - frame[0], seconds)
+
+    @contextmanager
+    def measure(self, pluginName: str, phase: str, measureRss: bool = False):
+        """ Measure
+
+        Record the time taken by the block, against this plugins phase.
+
+        :param pluginName: The name of the plugin.
+        :param phase: One of PHASES
+        :param measureRss: Record the RSS growth over the block, this is approximate
+            when plugins are imported concurrently.
+
+        """
+        assert phase in self.PHASES, "Unknown phase %s" % phase
+
+        if not self._enabled:
+            yield
+            return
+
+        with self._lock:
+            self._pluginNames.add(pluginName)
+
+        rssBefore = self._process.memory_info().rss if measureRss else 0
+        startTime = time.perf_counter()
+
+        try:
+            yield
+
+        finally:
+            self.record(pluginName, phase, time.perf_counter() - startTime)
+
+            if measureRss:
+                rssDelta = self._process.memory_info().rss - rssBefore
+                with self._lock:
+                    self._rssDeltaByPluginName[pluginName] += rssDelta
+
+    def record(self, pluginName: str, phase: str, seconds: float) -> None:
+        if not self._enabled:
+            return
+
+        with self._lock:
+            self._secondsByPhaseByPluginName[pluginName][phase] = seconds
+
+    def report(self) -> Dict:
+        """ Report
+
+        :return: The recorded profile, as a JSON serialisable dict
+
+        """
+        with self._lock:
+            plugins = {}
+            for pluginName, secondsByPhase in self._secondsByPhaseByPluginName.items():
+                moduleTimes = self._moduleTimesByPluginName.get(pluginName, {})
+                heaviest = sorted(moduleTimes.items(),
+                                  key=lambda i: i[1][1], reverse=True)
+                heaviest = heaviest[:self.HEAVIEST_MODULE_COUNT]
+
+                plugins[pluginName] = dict(
+                    seconds={phase: secondsByPhase.get(phase)
+                             for phase in self.PHASES},
+                    rssDeltaBytes=self._rssDeltaByPluginName.get(pluginName),
+                    moduleCount=len(moduleTimes),
+                    heaviestModules=[dict(module=modName,
+                                          selfSeconds=selfSeconds,
+                                          cumulativeSeconds=cumulativeSeconds)
+                                     for modName, (selfSeconds, cumulativeSeconds)
+                                     in heaviest]
+                )
+
+        return dict(date=datetime.now(pytz.utc).isoformat(),
+                    pid=os.getpid(),
+                    plugins=plugins)
+
+    def writeReport(self) -> None:
+        """ Write Report
+
+        Write the report to the report file, as JSON.
+
+        """
+        if not self._enabled:
+            return
+
+        tmpPath = self._reportFilePath + '.tmp'
+        try:
+            with open(tmpPath, 'w') as fobj:
+                json.dump(self.report(), fobj, indent=4, sort_keys=True)
+            os.replace(tmpPath, self._reportFilePath)
+
+        except Exception as e:
+            logger.error("Failed to write the plugin startup profile to %s",
+                         self._reportFilePath)
+            logger.exception(e)
+
+    def logSummary(self, pluginNames=None) -> None:
+        """ Log Summary
+
+        Log a table of the phase times and RSS growth of each plugin, slowest first.
+
+        :param pluginNames: Only log these plugins, or all plugins if None
+
+        """
+        if not self._enabled:
+            return
+
+        plugins = self.report()['plugins']
+        if pluginNames is not None:
+            plugins = {n: p for n, p in plugins.items() if n in pluginNames}
+
+        if not plugins:
+            return
+
+        def total(item):
+            return sum(s or 0.0 for s in item[1]['seconds'].values())
+
+        def fmt(seconds: Optional[float]) -> str:
+            return '-' if seconds is None else '%.3f' % seconds
+
+        text = ("Plugin startup profile, written to %s\n" % self._reportFilePath
+                + ' ' + rpad("PLUGIN", 30)
+                + ''.join(' ' + lpad(phase.upper(), 9) for phase in self.PHASES)
+                + ' ' + lpad("RSS MB", 9)
+                + ' ' + "HEAVIEST MODULE" + '\n')
+
+        for pluginName, plugin in sorted(plugins.items(), key=total, reverse=True):
+            rss = plugin['rssDeltaBytes']
+            heaviest = plugin['heaviestModules']
+
+            text += (' ' + rpad(pluginName, 30)
+                     + ''.join(' ' + lpad(fmt(plugin['seconds'][phase]), 9)
+                               for phase in self.PHASES)
+                     + ' ' + lpad('-' if rss is None else '%.1f' % (rss / 1024 ** 2), 9)
+                     + ' ' + (heaviest[0]['module'] if heaviest else '-')
+                     + '\n')
+
+        logger.info(text)
@@ -0,0 +1,85 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from importlib.machinery import SourceFileLoader, SourcelessFileLoader
+
+from peek_platform.plugin.PluginStartupProfiler import PluginStartupProfiler
+
+PLUGIN_NAME = 'peek_plugin_profile_test'
+
+
+class PluginStartupProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+        pluginDir = os.path.join(self._dir, PLUGIN_NAME)
+        os.makedirs(pluginDir)
+        with open(os.path.join(pluginDir, '__init__.py'), 'w') as f:
+            f.write('from . import Heavy\n')
+        with open(os.path.join(pluginDir, 'Heavy.py'), 'w') as f:
+            f.write('VALUE = sum(range(1000))\n')
+
+        sys.path.insert(0, self._dir)
+        self._reportFilePath = os.path.join(self._dir, 'profile.json')
+
+    def tearDown(self):
+        sys.path.remove(self._dir)
+        for modName in list(sys.modules):
+            if modName.split('.')[0] == PLUGIN_NAME:
+                del sys.modules[modName]
+        shutil.rmtree(self._dir)
+
+    def _execModules(self):
+        return [LoaderClass.__dict__.get('exec_module')
+                for LoaderClass in (SourceFileLoader, SourcelessFileLoader)]
+
+    def testModuleTimingRestoresTheLoaders(self):
+        execModulesBefore = self._execModules()
+        profiler = PluginStartupProfiler(self._reportFilePath)
+
+        self.assertEqual(self._execModules(), execModulesBefore)
+
+        profiler.startModuleTiming()
+        self.assertNotEqual(self._execModules(), execModulesBefore)
+
+        profiler.stopModuleTiming()
+        self.assertEqual(self._execModules(), execModulesBefore)
+
+    def testImportIsProfiled(self):
+        profiler = PluginStartupProfiler(self._reportFilePath)
+
+        profiler.startModuleTiming()
+        try:
+            with profiler.measure(PLUGIN_NAME, 'import', measureRss=True):
+                __import__(PLUGIN_NAME)
+        finally:
+            profiler.stopModuleTiming()
+
+        profiler.writeReport()
+
+        with open(self._reportFilePath) as f:
+            plugin = json.load(f)['plugins'][PLUGIN_NAME]
+
+        self.assertIsNotNone(plugin['seconds']['import'])
+        self.assertEqual(plugin['moduleCount'], 2)
+        self.assertIn(PLUGIN_NAME + '.Heavy',
+                      [m['module'] for m in plugin['heaviestModules']])
+
+    def testDisabledRecordsNothing(self):
+        execModulesBefore = self._execModules()
+        profiler = PluginStartupProfiler(self._reportFilePath, enabled=False)
+
+        profiler.startModuleTiming()
+        self.assertEqual(self._execModules(), execModulesBefore)
+
+        with profiler.measure(PLUGIN_NAME, 'import'):
+            __import__(PLUGIN_NAME)
+        profiler.stopModuleTiming()
+
+        profiler.writeReport()
+        self.assertEqual(profiler.report()['plugins'], {})
+        self.assertFalse(os.path.exists(self._reportFilePath))
@@ -0,0 +1,175 @@
+import gc
+import logging
+import os
+import types
+import weakref
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pytz
+from twisted.internet import reactor
+from twisted.internet.threads import deferToThread
+from vortex.DeferUtil import vortexLogFailure
+
+logger = logging.getLogger(__name__)
+
+
+class PluginUnloadCollector:
+    """ Plugin Unload Collector
+
+    This class cleans up after plugins are unloaded, with out pausing the reactor for a
+    full garbage collection.
+
+    The young generations are collected once for all the plugins unloaded within
+    COLLECT_DELAY seconds of each other. The oldest generation is left to the
+    interpreters own collection thresholds.
+
+    After the interpreters next full collection, any old entry hooks that are still
+    alive have leaked. For each of them, a background job walks the gc.get_referrers
+    chains and writes a referrer report, to show what is holding on to the old plugin.
+
+    """
+
+    #: Seconds to wait for more plugins to unload, before the young collection
+    COLLECT_DELAY = 2.0
+
+    #: The oldest generation collected on the reactor thread
+    COLLECT_GENERATION = 1
+
+    #: How many referrers deep to walk from the old entry hook
+    REFERRER_DEPTH = 4
+
+    #: The most referrers to report for each object
+    REFERRERS_PER_OBJECT = 10
+
+    #: The longest repr to include for each referrer
+    MAX_REPR_LENGTH = 160
+
+    def __init__(self, reportDir: str):
+        self._reportDir = reportDir
+        self._collectCall = None
+        self._entryHookRefsByPluginName: Dict[str, Optional[weakref.ref]] = {}
+        self._survivorRefsByPluginName: Dict[str, weakref.ref] = {}
+
+    def pluginUnloaded(self, pluginName: str, oldEntryHook) -> None:
+        """ Plugin Unloaded
+
+        Schedule the garbage collection, and the leak check for the old entry hook.
+
+        :param pluginName: The name of the unloaded plugin.
+        :param oldEntryHook: The entry hook of the unloaded plugin, only a weak
+            reference to it is kept.
+
+        """
+        try:
+            self._entryHookRefsByPluginName[pluginName] = weakref.ref(oldEntryHook)
+        except TypeError:
+            logger.debug("%s entry hook doesn't support weak references,"
+                         " it won't be checked for leaks", pluginName)
+
+        if self._collectCall and self._collectCall.active():
+            self._collectCall.reset(self.COLLECT_DELAY)
+        else:
+            self._collectCall = reactor.callLater(self.COLLECT_DELAY, self._collect)
+
+    def _collect(self) -> None:
+        self._collectCall = None
+
+        gc.collect(self.COLLECT_GENERATION)
+
+        refsByPluginName = self._entryHookRefsByPluginName
+        self._entryHookRefsByPluginName = {}
+
+        # The survivors may be in the oldest generation, check them after the next
+        # full collection
+        for pluginName, entryHookRef in refsByPluginName.items():
+            if entryHookRef() is not None:
+                self._survivorRefsByPluginName[pluginName] = entryHookRef
+
+        if self._survivorRefsByPluginName and self._gcCallback not in gc.callbacks:
+            gc.callbacks.append(self._gcCallback)
+
+    def _gcCallback(self, phase: str, info: Dict) -> None:
+        # This is called by the thread that triggered the collection
+        if phase == 'stop' and info['generation'] == 2:
+            reactor.callFromThread(self._checkSurvivors)
+
+    def _checkSurvivors(self) -> None:
+        refsByPluginName = self._survivorRefsByPluginName
+        self._survivorRefsByPluginName = {}
+
+        if self._gcCallback in gc.callbacks:
+            gc.callbacks.remove(self._gcCallback)
+
+        for pluginName, entryHookRef in refsByPluginName.items():
+            if entryHookRef() is None:
+                continue
+
+            d = deferToThread(self._writeReferrerReport, pluginName, entryHookRef)
+            d.addErrback(vortexLogFailure, logger, consumeError=True)
+
+    def _writeReferrerReport(self, pluginName: str,
+                             entryHookRef: weakref.ref) -> None:
+        entryHook = entryHookRef()
+        if entryHook is None:
+            return
+
+        lines = ["Referrers of the unloaded %s entry hook %r" % (pluginName, entryHook)]
+        lines += self._referrerLines(entryHook)
+        del entryHook
+
+        os.makedirs(self._reportDir, exist_ok=True)
+        reportPath = os.path.join(
+            self._reportDir, '%s-%s.txt'
+                             % (pluginName,
+                                datetime.now(pytz.utc).strftime('%Y%m%d-%H%M%S')))
+
+        with open(reportPath, 'w') as fobj:
+            fobj.write('\n'.join(lines) + '\n')
+
+        logger.warning("Old references to %s still exist after it was unloaded,"
+                       " the referrers are written to %s", pluginName, reportPath)
+
+    def _referrerLines(self, obj) -> List[str]:
+        lines = []
+        walkedIds = set()
+        ignoredIds = set()
+
+        def walk(target, depth):
+            referrers = gc.get_referrers(target)
+            ignoredIds.add(id(referrers))
+
+            referrers = [r for r in referrers
+                         if id(r) not in ignoredIds
+                         and not isinstance(r, types.FrameType)]
+            ignoredIds.add(id(referrers))
+
+            for referrer in referrers[:self.REFERRERS_PER_OBJECT]:
+                lines.append('    ' * (depth + 1) + self._describe(referrer))
+
+                if id(referrer) in walkedIds or depth + 1 >= self.REFERRER_DEPTH:
+                    continue
+
+                walkedIds.add(id(referrer))
+                walk(referrer, depth + 1)
+
+            if len(referrers) > self.REFERRERS_PER_OBJECT:
+                lines.append('    ' * (depth + 1) + '... %s more'
+                             % (len(referrers) - self.REFERRERS_PER_OBJECT))
+
+        walk(obj, 0)
+        return lines
+
+    def _describe(self, obj) -> str:
+        if isinstance(obj, dict) and '__name__' in obj and '__loader__' in obj:
+            return 'module dict of %s' % obj['__name__']
+
+        try:
+            text = repr(obj)
+        except Exception as e:
+            text = '<repr failed, %s>' % e
+
+        if len(text) > self.MAX_REPR_LENGTH:
+            text = text[:self.MAX_REPR_LENGTH] + '...'
+
+        return '%s : %s' % (type(obj).__qualname__, text)
@@ -0,0 +1,91 @@
+import gc
+import os
+import shutil
+import tempfile
+
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks
+from twisted.internet.task import deferLater
+from twisted.trial import unittest
+
+from peek_platform.plugin.PluginUnloadCollector import PluginUnloadCollector
+
+
+class _EntryHook:
+    pass
+
+
+class _LeakyHolder:
+    pass
+
+
+class PluginUnloadCollectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self._reportDir = tempfile.mkdtemp()
+        self._collector = PluginUnloadCollector(self._reportDir)
+        self._collector.COLLECT_DELAY = 0.01
+
+    def tearDown(self):
+        if self._collector._gcCallback in gc.callbacks:
+            gc.callbacks.remove(self._collector._gcCallback)
+
+        shutil.rmtree(self._reportDir)
+
+    @inlineCallbacks
+    def _waitForReports(self, count: int):
+        for _ in range(100):
+            if count <= len(os.listdir(self._reportDir)):
+                break
+            yield deferLater(reactor, 0.02, lambda: None)
+
+        return os.listdir(self._reportDir)
+
+    @inlineCallbacks
+    def testLeakedEntryHooksAreReported(self):
+        holder = _LeakyHolder()
+        holder.entryHook = _EntryHook()
+        self._collector.pluginUnloaded('peek_plugin_leaky', holder.entryHook)
+
+        # The survivors are only reported after the interpreters next full collection
+        yield deferLater(reactor, 0.1, lambda: None)
+        self.assertEqual(os.listdir(self._reportDir), [])
+
+        gc.collect()
+
+        reportFileName, = yield self._waitForReports(1)
+        self.assertTrue(reportFileName.startswith('peek_plugin_leaky-'))
+
+        with open(os.path.join(self._reportDir, reportFileName)) as f:
+            self.assertIn('_LeakyHolder', f.read())
+
+    @inlineCallbacks
+    def testFreedEntryHooksAreNotReported(self):
+        self._collector.pluginUnloaded('peek_plugin_freed', _EntryHook())
+        self._collector.pluginUnloaded('peek_plugin_freed_too', _EntryHook())
+
+        yield deferLater(reactor, 0.2, lambda: None)
+        self.assertEqual(os.listdir(self._reportDir), [])
+
+    @inlineCallbacks
+    def testOnlyTheYoungGenerationsAreCollected(self):
+        generations = []
+        self.patch(gc, 'collect', generations.append)
+
+        self._collector.pluginUnloaded('peek_plugin_a', _EntryHook())
+        self._collector.pluginUnloaded('peek_plugin_b', _EntryHook())
+
+        yield deferLater(reactor, 0.1, lambda: None)
+        self.assertEqual(generations, [PluginUnloadCollector.COLLECT_GENERATION])
+
+    def testUnloadsShareOneCollection(self):
+        self._collector.COLLECT_DELAY = 60
+        entryHooks = [_EntryHook(), _EntryHook()]
+
+        self._collector.pluginUnloaded('peek_plugin_a', entryHooks[0])
+        collectCall = self._collector._collectCall
+
+        self._collector.pluginUnloaded('peek_plugin_b', entryHooks[1])
+        self.assertIs(self._collector._collectCall, collectCall)
+
+        collectCall.cancel()
@@ -27,6 +27,7 @@ from txhttputil.downloader.HttpFileDownloader import HttpFileDownloader
 from txhttputil.util.DeferUtil import deferToThreadWrap
 
 from peek_platform.WindowsPatch import isWindows
+from peek_platform.util import BytecodeUtil
 from peek_platform.util.PtyUtil import spawnPty, \
     logSpawnException
 from vortex.DeferUtil import deferToThreadWrapWithLogger
@@ -175,6 +176,7 @@ class PeekSwInstallManagerABC(metaclass=ABCMeta):
                             % (stampVersion, targetVersion))
 
         self._pipInstall(directory)
+        self._precompileRelease(directory)
 
         PeekPlatformConfig.config.platformVersion = targetVersion
 
@@ -183,6 +185,43 @@ class PeekSwInstallManagerABC(metaclass=ABCMeta):
 
         return targetVersion
 
+    def _precompileRelease(self, directory: Directory) -> None:
+        """ Precompile Release
+
+        Compile the packages installed from the release to bytecode, and repack the
+        enabled plugins from the release if zip importing is enabled.
+
+        :param directory: The directory where the peek-release is extracted to
+
+        """
+        from peek_platform import PeekPlatformConfig
+        from peek_platform.sw_install.PluginSwInstallManagerABC import \
+            PluginSwInstallManagerABC
+
+        config = PeekPlatformConfig.config
+        if not config.pluginPrecompile and not config.pluginZipImport:
+            return
+
+        packageNames = BytecodeUtil.packageNamesFromFileNames(
+            [f.name for f in directory.files])
+
+        enabledPlugins = set(config.pluginsEnabled)
+        for packageName in packageNames:
+            if packageName in enabledPlugins:
+                PluginSwInstallManagerABC.precompilePlugin(packageName)
+                continue
+
+            if not config.pluginPrecompile:
+                continue
+
+            try:
+                BytecodeUtil.precompilePackage(
+                    packageName, config.pluginBytecodeInvalidationMode)
+
+            except Exception as e:
+                logger.error("Failed to precompile %s", packageName)
+                logger.exception(e)
+
     def _pipInstall(self, directory: Directory) -> None:
         """ Pip Install
 
@@ -268,6 +307,10 @@ class PeekSwInstallManagerABC(metaclass=ABCMeta):
             reactor.callFromThread(reactor.stop)
             return
 
+        # Make sure any deferred config writes are on disk before we exec
+        from peek_platform import PeekPlatformConfig
+        PeekPlatformConfig.config._save()
+
         python = sys.executable
         argv = list(sys.argv)
 
@@ -30,6 +30,7 @@ from txhttputil.site.SpooledNamedTemporaryFile import SpooledNamedTemporaryFile
 from peek_platform import PeekPlatformConfig
 from peek_platform.file_config.PeekFileConfigPlatformMixin import \
     PeekFileConfigPlatformMixin
+from peek_platform.util import BytecodeUtil
 from peek_platform.util.PtyUtil import spawnPty, logSpawnException
 from vortex.DeferUtil import deferToThreadWrapWithLogger
 
@@ -183,17 +184,45 @@ class PluginSwInstallManagerABC(metaclass=ABCMeta):
                             % (pluginName, targetVersion, pkgVersion))
 
         self._pipInstall(fullTarPath)
+        self.precompilePlugin(pluginName)
 
-        PeekPlatformConfig.config.setPluginVersion(pluginName, targetVersion)
+        # Write both changes to config.json at once
+        with PeekPlatformConfig.config.configTransaction():
+            PeekPlatformConfig.config.setPluginVersion(pluginName, targetVersion)
 
-        ####
-        # FIXME : This will always enabled the Plugin and overwrite config changes
-        PeekPlatformConfig.config.pluginsEnabled = list(set(
-            PeekPlatformConfig.config.pluginsEnabled + [pluginName]))
+            ####
+            # FIXME : This will always enabled the Plugin and overwrite config changes
+            PeekPlatformConfig.config.pluginsEnabled = list(set(
+                PeekPlatformConfig.config.pluginsEnabled + [pluginName]))
 
         # RELOAD PLUGIN
         reactor.callLater(0, self.notifyOfPluginVersionUpdate, pluginName, targetVersion)
 
+    @classmethod
+    def precompilePlugin(cls, pluginName: str) -> None:
+        """ Precompile Plugin
+
+        Compile the installed plugin to bytecode, and pack it into a zip for zip
+        importing, if they are enabled in the config.
+
+        :param pluginName: The name of the plugin package, EG "peek_plugin_noop"
+
+        """
+        config = PeekPlatformConfig.config
+
+        try:
+            if config.pluginPrecompile:
+                BytecodeUtil.precompilePackage(
+                    pluginName, config.pluginBytecodeInvalidationMode)
+
+            if config.pluginZipImport:
+                BytecodeUtil.packPackageZip(pluginName, config.pluginZipPath)
+
+        except Exception as e:
+            # The plugin can still be imported from its source
+            logger.error("Failed to precompile plugin %s", pluginName)
+            logger.exception(e)
+
     def _pipInstall(self, fileName: str) -> None:
         """ Pip Install Plugin
 
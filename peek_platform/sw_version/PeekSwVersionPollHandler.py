@@ -57,12 +57,15 @@ class PeekSwVersionPollHandler(object):
         platformUpdate = False
         deferredList = []
 
+        # Read all the versions we have at once, rather than once per tuple
+        platformVersion = PeekPlatformConfig.config.platformVersion
+        installedPluginVersions = PeekPlatformConfig.config.pluginVersions()
+
         for swVersionInfo in payloadEnvelope.tuples:
             if swVersionInfo.name == self.PEEK_PLATFORM:
-                if PeekPlatformConfig.config.platformVersion != swVersionInfo.version:
+                if platformVersion != swVersionInfo.version:
                     logger.info("Recieved platform update new version is %s, we're %s",
-                                swVersionInfo.version,
-                                PeekPlatformConfig.config.platformVersion)
+                                swVersionInfo.version, platformVersion)
                     d = PeekPlatformConfig.peekSwInstallManager.update(
                         swVersionInfo.version)
                     deferredList.append(d)
@@ -72,8 +75,7 @@ class PeekSwVersionPollHandler(object):
                     break
 
             else:
-                installedPluginVer = PeekPlatformConfig.config.pluginVersion(
-                    swVersionInfo.name)
+                installedPluginVer = installedPluginVersions.get(swVersionInfo.name)
 
                 if installedPluginVer != swVersionInfo.version:
                     logger.info("Recieved %s update new version is %s, we're %s",
@@ -0,0 +1,185 @@
+import compileall
+import importlib
+import logging
+import os
+import py_compile
+import re
+import sys
+import zipfile
+import zipimport
+from importlib.util import find_spec, module_from_spec
+from py_compile import PycInvalidationMode
+from types import ModuleType
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_MODES = {
+    'timestamp': PycInvalidationMode.TIMESTAMP,
+    'checked-hash': PycInvalidationMode.CHECKED_HASH,
+    'unchecked-hash': PycInvalidationMode.UNCHECKED_HASH,
+}
+
+# EG peek_plugin_base-1.2.3.tar.gz, peek-plugin-base-1.2.3-py3-none-any.whl
+_PACKAGE_FILE_RE = re.compile(r'^(?P<name>.+?)-\d[^/]*\.(tar\.gz|whl)$')
+
+
+def packageDir(packageName: str) -> Optional[str]:
+    """ Package Dir
+
+    :return: The directory of the installed package, or None if it's not installed,
+        or is a single module.
+
+    """
+    importlib.invalidate_caches()
+    spec = find_spec(packageName)
+    if not spec or not spec.submodule_search_locations or not spec.origin:
+        return None
+
+    return os.path.dirname(spec.origin)
+
+
+def packageNamesFromFileNames(fileNames: Iterable[str]) -> List[str]:
+    """ Package Names From File Names
+
+    :param fileNames: The file names of sdist or wheel packages.
+    :return: The python package names, EG "peek_plugin_base"
+
+    """
+    names = []
+    for fileName in fileNames:
+        match = _PACKAGE_FILE_RE.match(os.path.basename(fileName))
+        if match:
+            names.append(match.group('name').replace('-', '_').lower())
+
+    return names
+
+
+def precompilePackage(packageName: str,
+                      invalidationMode: str = 'checked-hash') -> bool:
+    """ Precompile Package
+
+    Compile the packages modules to bytecode, so the first import after an install
+    doesn't have to.
+
+    The modules are compiled at the optimisation level of this interpreter, as
+    the .pyc files for other levels are never used by it.
+
+    :param packageName: The python package name, EG "peek_plugin_base"
+    :param invalidationMode: One of INVALIDATION_MODES
+    :return: True if all the modules compiled
+
+    """
+    path = packageDir(packageName)
+    if not path:
+        logger.debug("Not precompiling %s, it's not an installed package",
+                     packageName)
+        return False
+
+    success = compileall.compile_dir(
+        path, quiet=1, optimize=sys.flags.optimize,
+        invalidation_mode=INVALIDATION_MODES[invalidationMode])
+
+    if not success:
+        logger.warning("Some modules of %s failed to compile", packageName)
+
+    return bool(success)
+
+
+def packPackageZip(packageName: str, zipDir: str) -> Optional[str]:
+    """ Pack Package Zip
+
+    Pack the python modules of an installed package, with their bytecode, into one
+    zip file that `importZipPackage` can import from.
+
+    Only the modules are packed, the package directory is still used for everything
+    else, EG plugin_package.json and the frontend files.
+
+    :param packageName: The python package name, EG "peek_plugin_noop"
+    :param zipDir: The directory to write the <packageName>.zip to.
+    :return: The path of the zip file, or None if the package isn't installed.
+
+    """
+    path = packageDir(packageName)
+    if not path:
+        return None
+
+    os.makedirs(zipDir, exist_ok=True)
+    zipPath = packageZipPath(packageName, zipDir)
+    tmpPath = zipPath + '.tmp'
+
+    rootDir = os.path.dirname(path)
+
+    with zipfile.ZipFile(tmpPath, 'w', zipfile.ZIP_STORED) as zipFile:
+        for dirPath, dirNames, fileNames in os.walk(path):
+            dirNames[:] = [d for d in dirNames if d != '__pycache__']
+
+            for fileName in fileNames:
+                if not fileName.endswith('.py'):
+                    continue
+
+                srcPath = os.path.join(dirPath, fileName)
+                arcName = os.path.relpath(srcPath, rootDir)
+                zipFile.write(srcPath, arcName)
+
+                # zipimport looks for the .pyc next to the .py, and the zip is
+                # rebuilt on each install, so the bytecode doesn't need checking.
+                pycPath = py_compile.compile(
+                    srcPath, cfile=tmpPath + '.pyc', dfile=arcName, doraise=True,
+                    optimize=sys.flags.optimize,
+                    invalidation_mode=PycInvalidationMode.UNCHECKED_HASH)
+                zipFile.write(pycPath, arcName + 'c')
+
+    if os.path.exists(tmpPath + '.pyc'):
+        os.remove(tmpPath + '.pyc')
+
+    os.replace(tmpPath, zipPath)
+    logger.debug("Packed %s into %s", packageName, zipPath)
+    return zipPath
+
+
+def packageZipPath(packageName: str, zipDir: str) -> str:
+    return os.path.join(zipDir, '%s.zip' % packageName)
+
+
+def importZipPackage(packageName: str, zipPath: str) -> ModuleType:
+    """ Import Zip Package
+
+    Import the package from the zip made by `packPackageZip`. The packages submodules
+    are then found through its __path__, which is within the zip.
+
+    """
+    importer = zipimport.zipimporter(zipPath)
+
+    # zipimporter.find_spec was added in Python 3.10
+    if not hasattr(importer, 'find_spec'):
+        return _importZipPackageLegacy(importer, packageName, zipPath)
+
+    spec = importer.find_spec(packageName)
+    if spec is None:
+        raise Exception("Package %s is not in %s" % (packageName, zipPath))
+
+    module = module_from_spec(spec)
+    sys.modules[packageName] = module
+    try:
+        spec.loader.exec_module(module)
+
+    except Exception:
+        del sys.modules[packageName]
+        raise
+
+    return module
+
+
+def _importZipPackageLegacy(importer: zipimport.zipimporter, packageName: str,
+                            zipPath: str) -> ModuleType:
+    """ Import Zip Package Legacy
+
+    Import the package with the zipimporter API of Python < 3.10.
+    load_module adds the module to sys.modules, and removes it if it fails.
+
+    """
+    if importer.find_module(packageName) is None:
+        raise Exception("Package %s is not in %s" % (packageName, zipPath))
+
+    return importer.load_module(packageName)
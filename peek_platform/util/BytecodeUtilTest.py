@@ -0,0 +1,93 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import warnings
+import zipimport
+
+from peek_platform.util import BytecodeUtil
+
+PACKAGE_NAME = 'peek_plugin_zip_test'
+
+
+class BytecodeUtilTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._srcDir = os.path.join(self._dir, 'src')
+        self._zipDir = os.path.join(self._dir, 'zip')
+
+        packageDir = os.path.join(self._srcDir, PACKAGE_NAME)
+        os.makedirs(os.path.join(packageDir, 'server'))
+
+        files = {
+            '__init__.py': 'NAME = "root"\n',
+            'server/__init__.py': '',
+            'server/Handler.py': 'NAME = "handler"\n',
+        }
+        for relPath, contents in files.items():
+            with open(os.path.join(packageDir, relPath), 'w') as f:
+                f.write(contents)
+
+        sys.path.insert(0, self._srcDir)
+
+    def tearDown(self):
+        sys.path.remove(self._srcDir)
+        self._forgetPackage()
+        shutil.rmtree(self._dir)
+
+    def _forgetPackage(self):
+        for modName in list(sys.modules):
+            if modName.split('.')[0] == PACKAGE_NAME:
+                del sys.modules[modName]
+
+    def testPackageNamesFromFileNames(self):
+        self.assertEqual(
+            BytecodeUtil.packageNamesFromFileNames(
+                ['/tmp/peek-plugin-base-1.2.3-py3-none-any.whl',
+                 'peek_plugin_noop-0.1.0.tar.gz',
+                 'README.txt']),
+            ['peek_plugin_base', 'peek_plugin_noop'])
+
+    def testPrecompilePackage(self):
+        self.assertTrue(BytecodeUtil.precompilePackage(PACKAGE_NAME))
+
+        cacheDir = os.path.join(self._srcDir, PACKAGE_NAME, 'server', '__pycache__')
+        self.assertTrue(any(f.startswith('Handler.') for f in os.listdir(cacheDir)))
+
+    def testImportZipPackage(self):
+        zipPath = BytecodeUtil.packPackageZip(PACKAGE_NAME, self._zipDir)
+        self.assertEqual(zipPath,
+                         BytecodeUtil.packageZipPath(PACKAGE_NAME, self._zipDir))
+
+        module = BytecodeUtil.importZipPackage(PACKAGE_NAME, zipPath)
+        self.assertEqual(module.NAME, 'root')
+        self.assertTrue(module.__file__.startswith(zipPath))
+
+        from peek_plugin_zip_test.server import Handler
+        self.assertEqual(Handler.NAME, 'handler')
+        self.assertTrue(Handler.__file__.startswith(zipPath))
+
+    def testImportZipPackageLegacy(self):
+        importer = zipimport.zipimporter(
+            BytecodeUtil.packPackageZip(PACKAGE_NAME, self._zipDir))
+
+        if not hasattr(importer, 'find_module'):
+            self.skipTest("This Python has no zipimporter.find_module")
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            module = BytecodeUtil._importZipPackageLegacy(
+                importer, PACKAGE_NAME, importer.archive)
+
+        self.assertEqual(module.NAME, 'root')
+        self.assertIs(sys.modules[PACKAGE_NAME], module)
+
+    def testImportMissingZipPackage(self):
+        zipPath = BytecodeUtil.packPackageZip(PACKAGE_NAME, self._zipDir)
+
+        with self.assertRaises(Exception):
+            BytecodeUtil.importZipPackage('peek_plugin_missing', zipPath)
+
+        self.assertNotIn('peek_plugin_missing', sys.modules)
@@ -1,8 +1,12 @@
+import gc
 import logging
+import os
+import sys
 import tracemalloc
+from collections import namedtuple
 from datetime import datetime
 from tracemalloc import _format_size
-from typing import Optional
+from typing import Optional, Dict, List
 
 from twisted.internet import reactor
 from twisted.internet.threads import deferToThread
@@ -28,6 +32,11 @@ PEEK_MEM_DUMP_STACKTRACE = 2 ** 0  # 1
 PEEK_MEM_DUMP_VORTEX_OBSERVABLE_CACHE = 2 ** 2  # 2
 PEEK_MEM_DUMP_VORTEX_JSONABLE = 2 ** 3  # 4
 PEEK_MEM_DUMP_VORTEX_PUSH_PRODUCER = 2 ** 4  # 8
+PEEK_MEM_DUMP_PLUGIN_ATTRIBUTION = 2 ** 5  # 32
+
+PluginMemoryStat = namedtuple("PluginMemoryStat",
+                              ["pluginName", "tracemallocSize", "tracemallocCount",
+                               "gcObjectCount", "gcObjectSize"])
 
 
 def _formatTracemallocTraceback(top, size, count):
@@ -147,6 +156,99 @@ def _formatVortexPushProducerSummary(top, msgs):
     return text
 
 
+def pluginMemoryStats(rootsByPluginName: Dict[str, List[str]]) -> List[PluginMemoryStat]:
+    """ Plugin Memory Stats
+
+    Attribute the memory of this process to the plugins.
+
+    The tracemalloc traces are attributed to the plugin of the innermost frame that
+    is within one of the plugins root directories, so memory that vortex or
+    sqlalchemy allocates for a plugin is counted against it. These are only
+    available when tracemalloc is tracing, see PEEK_MEM_DUMP_STACKTRACE.
+
+    The objects tracked by gc are attributed by the module of their class,
+    their sizes are shallow, from sys.getsizeof.
+
+    This walks every traced allocation and every gc object, call it from a thread.
+
+    :param rootsByPluginName: The directories each plugins modules are loaded from,
+        EG {"peek_plugin_noop": ["/.../site-packages/peek_plugin_noop"]}
+    :return: The stats, largest tracemalloc size first, then largest gc size.
+
+    """
+    # Match the longest root first, in case one plugin is installed within another
+    roots = sorted(((os.path.normcase(os.path.realpath(root)) + os.sep, pluginName)
+                    for pluginName, pluginRoots in rootsByPluginName.items()
+                    for root in pluginRoots),
+                   key=lambda r: len(r[0]), reverse=True)
+
+    pluginNameByFilename = {}
+
+    def pluginForFilename(filename: str) -> Optional[str]:
+        if filename not in pluginNameByFilename:
+            path = os.path.normcase(os.path.realpath(filename))
+            pluginNameByFilename[filename] = next(
+                (name for root, name in roots if path.startswith(root)), None)
+        return pluginNameByFilename[filename]
+
+    sizes = {name: [0, 0, 0, 0] for name in rootsByPluginName}
+
+    if tracemalloc.is_tracing():
+        for stat in tracemalloc.take_snapshot().statistics('traceback'):
+            # Tracebacks are ordered oldest frame first
+            for frame in reversed(stat.traceback):
+                pluginName = pluginForFilename(frame.filename)
+                if pluginName:
+                    sizes[pluginName][0] += stat.size
+                    sizes[pluginName][1] += stat.count
+                    break
+
+    for obj in gc.get_objects():
+        # Some classes have no module, or a __module__ property, EG zope interfaces
+        moduleName = type(obj).__module__
+        if not isinstance(moduleName, str):
+            continue
+
+        pluginName = moduleName.split('.')[0]
+        if pluginName in sizes:
+            sizes[pluginName][2] += 1
+            sizes[pluginName][3] += sys.getsizeof(obj, 0)
+
+    stats = [PluginMemoryStat(name, *values) for name, values in sizes.items()]
+    stats.sort(key=lambda s: (s.tracemallocSize, s.gcObjectSize), reverse=True)
+    return stats
+
+
+def _formatPluginMemorySummary(top):
+    from peek_platform import PeekPlatformConfig
+
+    if not PeekPlatformConfig.pluginLoader:
+        return 'There are no plugins loaded\n'
+
+    stats = PeekPlatformConfig.pluginLoader.pluginMemoryStats()[:top]
+    if not stats:
+        return 'There are no plugins loaded\n'
+
+    text = ''
+    if not tracemalloc.is_tracing():
+        text += 'Tracemalloc is not tracing, only gc objects are attributed\n'
+
+    text += (' ' + rpad("TRACED SIZE", 12)
+             + ' ' + rpad("TRACED COUNT", 12)
+             + ' ' + rpad("GC OBJECTS", 12)
+             + ' ' + rpad("GC SIZE", 12)
+             + ' ' + "PLUGIN" + '\n')
+
+    for stat in stats:
+        text += (' ' + rpad(_format_size(stat.tracemallocSize, False), 12)
+                 + ' ' + rpad(str(stat.tracemallocCount), 12)
+                 + ' ' + rpad(str(stat.gcObjectCount), 12)
+                 + ' ' + rpad(_format_size(stat.gcObjectSize, False), 12)
+                 + ' ' + stat.pluginName + '\n')
+
+    return text
+
+
 def setupMemoryDebugging(serviceName: Optional[str] = None,
                          debugMask: int = 0):
     import os
@@ -181,6 +283,7 @@ def setupMemoryDebugging(serviceName: Optional[str] = None,
     COUNT_MIN = 10000
     TOTAL_SIZE = 1 * 1024 * 1024
     INDIVIDUAL_SIZE = 10 * 1024
+    PLUGIN_TOP = 50
 
     logger.warning("Memory Logging is enabled.")
 
@@ -239,6 +342,12 @@ def setupMemoryDebugging(serviceName: Optional[str] = None,
                 f.write(center("Vortex Write Push Producer") + '\n')
                 f.write(_formatVortexPushProducerSummary(10, 1))
 
+            if debugMask & PEEK_MEM_DUMP_PLUGIN_ATTRIBUTION:
+                # Write the memory attributed to each plugin
+                f.write("-" * 80 + '\n')
+                f.write(center("Plugin Memory Attribution") + '\n')
+                f.write(_formatPluginMemorySummary(PLUGIN_TOP))
+
             # Write the end date
             f.write("-" * 80 + '\n')
             f.write("END - Time taken : %s seconds"
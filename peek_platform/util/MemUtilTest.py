@@ -0,0 +1,87 @@
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+import unittest
+
+from peek_platform.util.MemUtil import pluginMemoryStats
+
+PLUGIN_NAME = 'peek_plugin_mem_test'
+CALLER_PLUGIN_NAME = 'peek_plugin_mem_caller'
+
+ALLOCATOR = '''
+class Item:
+    pass
+
+
+def allocate(count):
+    return [Item() for _ in range(count)]
+'''
+
+CALLER = '''
+import %s
+
+
+def allocateFor(count):
+    return %s.allocate(count)
+''' % (PLUGIN_NAME, PLUGIN_NAME)
+
+
+class MemUtilTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._pluginDir = os.path.join(self._dir, PLUGIN_NAME)
+        self._callerPluginDir = os.path.join(self._dir, CALLER_PLUGIN_NAME)
+
+        for pluginDir, source in ((self._pluginDir, ALLOCATOR),
+                                  (self._callerPluginDir, CALLER)):
+            os.makedirs(pluginDir)
+            with open(os.path.join(pluginDir, '__init__.py'), 'w') as f:
+                f.write(source)
+
+        sys.path.insert(0, self._dir)
+
+    def tearDown(self):
+        sys.path.remove(self._dir)
+        sys.modules.pop(PLUGIN_NAME, None)
+        sys.modules.pop(CALLER_PLUGIN_NAME, None)
+        shutil.rmtree(self._dir)
+
+    def _stat(self, rootsByPluginName):
+        stats = {s.pluginName: s for s in pluginMemoryStats(rootsByPluginName)}
+        self.assertEqual(set(stats), set(rootsByPluginName))
+        return stats
+
+    def testPluginObjectsAreAttributed(self):
+        callerPlugin = __import__(CALLER_PLUGIN_NAME)
+
+        # Trace enough frames that the caller plugin is on the stack too
+        tracemalloc.start(10)
+        try:
+            items = callerPlugin.allocateFor(1000)
+            stats = self._stat({PLUGIN_NAME: [self._pluginDir],
+                                CALLER_PLUGIN_NAME: [self._callerPluginDir],
+                                'peek_plugin_other': [self._dir + '/other']})
+
+        finally:
+            tracemalloc.stop()
+
+        stat = stats[PLUGIN_NAME]
+        self.assertGreaterEqual(stat.gcObjectCount, len(items))
+        self.assertGreater(stat.tracemallocSize, 0)
+
+        # The plugin that allocated is charged, not the plugin that called it
+        self.assertLess(stats[CALLER_PLUGIN_NAME].tracemallocSize,
+                        stat.tracemallocSize)
+
+        self.assertEqual(stats['peek_plugin_other'].gcObjectCount, 0)
+        self.assertEqual(stats['peek_plugin_other'].tracemallocSize, 0)
+
+    def testWithoutTracemalloc(self):
+        items = __import__(PLUGIN_NAME).allocate(10)
+
+        stat = self._stat({PLUGIN_NAME: [self._pluginDir]})[PLUGIN_NAME]
+        self.assertGreaterEqual(stat.gcObjectCount, len(items))
+        self.assertEqual(stat.tracemallocSize, 0)
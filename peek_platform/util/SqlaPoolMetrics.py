@@ -0,0 +1,353 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import CreateEnginePlugin
+from sqlalchemy.exc import TimeoutError as SqlaTimeoutError
+from sqlalchemy.pool import QueuePool
+from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+from vortex.DeferUtil import vortexLogFailure
+
+logger = logging.getLogger(__name__)
+
+#: The name of the SQLAlchemy create_engine plugin that attaches the pool metrics,
+#: add it to the "plugins" engine arg, see `PeekFileConfigSqlAlchemyMixin.dbEngineArgs`
+SQLA_POOL_METRICS_PLUGIN = 'peek_pool_metrics'
+
+
+class SqlaPoolMetrics:
+    """ SQLAlchemy Pool Metrics
+
+    This class records the connection pool pressure of a SQLAlchemy engine, from the
+    pools checkout, checkin and connect events.
+
+    It records how long connections are checked out for, the most connections checked
+    out at once, how often the pool has to open overflow connections past pool_size,
+    and how often every connection the pool allows is checked out, after which
+    checkouts wait for a checkin.
+
+    The pool events fire once a connection is checked out, so they can't see how long
+    the checkout waited. Engines with a QueuePool are given a `SqlaMeteredQueuePool`,
+    which records the checkout waits, and the checkouts that time out.
+
+    The events are registered on the engine, so they follow the pool when the engine
+    recreates it, EG on dispose().
+
+    The metrics are attached by the `SQLA_POOL_METRICS_PLUGIN` create_engine plugin,
+    and logged every REPORT_INTERVAL seconds while the reactor is running.
+    Use `SqlaPoolMetrics.allMetrics()` to read the metrics of all engines.
+
+    """
+
+    #: The upper bounds of the checkout hold time histogram buckets, in milliseconds
+    HOLD_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000, float('inf'))
+
+    #: The upper bounds of the checkout wait time histogram buckets, in milliseconds
+    WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000, float('inf'))
+
+    #: How often the metrics of the engines with checkouts are logged, in seconds
+    REPORT_INTERVAL = 300.0
+
+    #: The key of the checkout time in the connection records info
+    _CHECKOUT_TIME_KEY = 'peekCheckoutTime'
+
+    __metricsByName: Dict[str, 'SqlaPoolMetrics'] = {}
+    __lock = threading.Lock()
+    __reportLoopingCall = None
+
+    def __init__(self, engine, name: str):
+        self._engine = engine
+        self._name = name
+        self._lock = threading.Lock()
+
+        self._holdHistogram: List[int] = [0] * len(self.HOLD_BUCKETS_MS)
+        self._checkoutCount = 0
+        self._reportedCheckoutCount = 0
+        self._checkedOut = 0
+        self._checkedOutPeak = 0
+        self._holdTotal = 0.0
+        self._holdMax = 0.0
+        self._connectCount = 0
+        self._overflowCount = 0
+        self._overflowPeak = 0
+        self._saturatedCount = 0
+        self._waitHistogram: List[int] = [0] * len(self.WAIT_BUCKETS_MS)
+        self._waitTotal = 0.0
+        self._waitMax = 0.0
+        self._timeoutCount = 0
+
+        if isinstance(engine.pool, SqlaMeteredQueuePool):
+            engine.pool.poolMetrics = self
+
+        event.listen(engine, 'connect', self._connected)
+        event.listen(engine, 'checkout', self._checkedOutEvent)
+        event.listen(engine, 'checkin', self._checkedInEvent)
+
+    @classmethod
+    def attach(cls, engine, name: str) -> 'SqlaPoolMetrics':
+        """ Attach
+
+        Start recording the pool metrics of this engine.
+
+        :param engine: The SQLAlchemy engine to record the pool metrics of.
+        :param name: The name to report the metrics under, a number is appended if
+            another engine already uses it.
+
+        :return: The metrics object.
+
+        """
+        with cls.__lock:
+            uniqueName = name
+            num = 1
+            while uniqueName in cls.__metricsByName:
+                num += 1
+                uniqueName = '%s #%s' % (name, num)
+
+            metrics = cls(engine, uniqueName)
+            cls.__metricsByName[uniqueName] = metrics
+
+        reactor.callWhenRunning(cls._startReporting)
+        return metrics
+
+    @classmethod
+    def detach(cls, name: str) -> None:
+        """ Detach
+
+        Stop reporting the metrics of an engine, the metrics are no longer logged once
+        no engines are attached.
+
+        :param name: The name the metrics are reported under.
+
+        """
+        with cls.__lock:
+            metrics = cls.__metricsByName.pop(name, None)
+            stopReporting = not cls.__metricsByName
+
+        if metrics:
+            event.remove(metrics._engine, 'connect', metrics._connected)
+            event.remove(metrics._engine, 'checkout', metrics._checkedOutEvent)
+            event.remove(metrics._engine, 'checkin', metrics._checkedInEvent)
+
+            if isinstance(metrics._engine.pool, SqlaMeteredQueuePool):
+                metrics._engine.pool.poolMetrics = None
+
+        if stopReporting and cls.__reportLoopingCall:
+            cls.__reportLoopingCall.stop()
+            cls.__reportLoopingCall = None
+
+    @classmethod
+    def allMetrics(cls) -> Dict[str, Dict]:
+        """ All Metrics
+
+        :return: The metrics of every attached engine, keyed by name.
+
+        """
+        with cls.__lock:
+            metricsByName = dict(cls.__metricsByName)
+
+        return {name: m.metrics() for name, m in metricsByName.items()}
+
+    @classmethod
+    def _startReporting(cls) -> None:
+        if cls.__reportLoopingCall or not cls.__metricsByName:
+            return
+
+        cls.__reportLoopingCall = LoopingCall(cls.logAllMetrics)
+        d = cls.__reportLoopingCall.start(cls.REPORT_INTERVAL, now=False)
+        d.addErrback(vortexLogFailure, logger, consumeError=True)
+
+    @classmethod
+    def logAllMetrics(cls) -> None:
+        """ Log All Metrics
+
+        Log the metrics of the engines that have had checkouts since they were last
+        logged.
+
+        """
+        with cls.__lock:
+            metricsByName = dict(cls.__metricsByName)
+
+        for name, metrics in sorted(metricsByName.items()):
+            if not metrics._checkoutsSinceReport():
+                continue
+
+            logger.info("DB connection pool %s : %s", name, metrics.metrics())
+
+    def _checkoutsSinceReport(self) -> int:
+        with self._lock:
+            count = self._checkoutCount - self._reportedCheckoutCount
+            self._reportedCheckoutCount = self._checkoutCount
+            return count
+
+    def _connected(self, dbapiConnection, connectionRecord) -> None:
+        with self._lock:
+            self._connectCount += 1
+
+    def _checkedOutEvent(self, dbapiConnection, connectionRecord,
+                         connectionProxy) -> None:
+        connectionRecord.info[self._CHECKOUT_TIME_KEY] = time.monotonic()
+
+        pool = self._engine.pool
+        isQueuePool = isinstance(pool, QueuePool)
+        overflow = max(0, pool.overflow()) if isQueuePool else 0
+
+        with self._lock:
+            self._checkoutCount += 1
+            self._checkedOut += 1
+            self._checkedOutPeak = max(self._checkedOutPeak, self._checkedOut)
+
+            if overflow and isQueuePool and pool.size() < self._checkedOut:
+                self._overflowCount += 1
+                self._overflowPeak = max(self._overflowPeak, overflow)
+
+            if (isQueuePool and 0 <= pool._max_overflow
+                    and pool.size() + pool._max_overflow <= self._checkedOut):
+                self._saturatedCount += 1
+
+    def _checkedInEvent(self, dbapiConnection, connectionRecord) -> None:
+        checkoutTime = connectionRecord.info.pop(self._CHECKOUT_TIME_KEY, None)
+        if checkoutTime is None:
+            return
+
+        holdSeconds = time.monotonic() - checkoutTime
+
+        with self._lock:
+            self._checkedOut -= 1
+            self._holdTotal += holdSeconds
+            self._holdMax = max(self._holdMax, holdSeconds)
+            self._holdHistogram[self._bucketIndex(self.HOLD_BUCKETS_MS,
+                                                  holdSeconds)] += 1
+
+    def _checkoutWaited(self, waitSeconds: float, timedOut: bool) -> None:
+        with self._lock:
+            self._waitTotal += waitSeconds
+            self._waitMax = max(self._waitMax, waitSeconds)
+            self._waitHistogram[self._bucketIndex(self.WAIT_BUCKETS_MS,
+                                                  waitSeconds)] += 1
+            if timedOut:
+                self._timeoutCount += 1
+
+    @staticmethod
+    def _bucketIndex(bucketsMs, seconds: float) -> int:
+        ms = seconds * 1000
+        for index, bucketMs in enumerate(bucketsMs):
+            if ms <= bucketMs:
+                return index
+
+        return len(bucketsMs) - 1
+
+    def metrics(self) -> Dict:
+        """ Metrics
+
+        :return: A dict of the pool size settings, the current checked out and overflow
+            connection counts, and the totals since the metrics were attached.
+            The checkout wait metrics are None if the engine doesn't have a
+            `SqlaMeteredQueuePool`.
+
+        """
+        pool = self._engine.pool
+        isQueuePool = isinstance(pool, QueuePool)
+        isMetered = isinstance(pool, SqlaMeteredQueuePool)
+        checkins = sum(self._holdHistogram)
+        waits = sum(self._waitHistogram)
+
+        with self._lock:
+            return dict(
+                poolSize=pool.size() if isQueuePool else None,
+                maxOverflow=pool._max_overflow if isQueuePool else None,
+                checkedOut=self._checkedOut,
+                checkedOutPeak=self._checkedOutPeak,
+                overflow=max(0, pool.overflow()) if isQueuePool else 0,
+                connects=self._connectCount,
+                checkouts=self._checkoutCount,
+                holdAvgMs=(self._holdTotal / checkins * 1000 if checkins else 0.0),
+                holdMaxMs=self._holdMax * 1000,
+                holdHistogramMs={str(b): c for b, c in zip(self.HOLD_BUCKETS_MS,
+                                                           self._holdHistogram)},
+                overflowCheckouts=self._overflowCount,
+                overflowPeak=self._overflowPeak,
+                saturatedCheckouts=self._saturatedCount,
+                waitAvgMs=((self._waitTotal / waits * 1000 if waits else 0.0)
+                           if isMetered else None),
+                waitMaxMs=self._waitMax * 1000 if isMetered else None,
+                waitHistogramMs=({str(b): c for b, c in zip(self.WAIT_BUCKETS_MS,
+                                                            self._waitHistogram)}
+                                 if isMetered else None),
+                checkoutTimeouts=self._timeoutCount if isMetered else None
+            )
+
+
+class SqlaMeteredQueuePool(QueuePool):
+    """ SQLAlchemy Metered Queue Pool
+
+    This QueuePool records how long each checkout waits for a connection, and the
+    checkouts that time out, in the `SqlaPoolMetrics` of its engine.
+
+    """
+
+    #: The metrics to record the checkouts in, set by `SqlaPoolMetrics`
+    poolMetrics: Optional[SqlaPoolMetrics] = None
+
+    def connect(self):
+        startTime = time.monotonic()
+        timedOut = False
+        try:
+            return super().connect()
+
+        except SqlaTimeoutError:
+            timedOut = True
+            raise
+
+        finally:
+            poolMetrics = self.poolMetrics
+            if poolMetrics:
+                poolMetrics._checkoutWaited(time.monotonic() - startTime, timedOut)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.poolMetrics = self.poolMetrics
+        return pool
+
+
+class SqlaPoolMetricsPlugin(CreateEnginePlugin):
+    """ SQLAlchemy Pool Metrics Plugin
+
+    This create_engine plugin attaches `SqlaPoolMetrics` to each engine that's
+    created with SQLA_POOL_METRICS_PLUGIN in its "plugins" argument.
+
+    Engines that would have a QueuePool are given a `SqlaMeteredQueuePool`.
+
+    """
+
+    def __init__(self, url, kwargs):
+        CreateEnginePlugin.__init__(self, url, kwargs)
+
+        if 'pool' in kwargs:
+            return
+
+        poolclass = kwargs.get('poolclass') or url.get_dialect().get_pool_class(url)
+        if poolclass is QueuePool:
+            kwargs['poolclass'] = SqlaMeteredQueuePool
+
+    def update_url(self, url):
+        # Only called by SQLAlchemy >= 1.4
+        return url
+
+    def engine_created(self, engine) -> None:
+        # repr() hides the password, on every SQLAlchemy version
+        SqlaPoolMetrics.attach(engine, repr(engine.url))
+
+
+def registerSqlaPoolMetricsPlugin() -> None:
+    """ Register SQLAlchemy Pool Metrics Plugin
+
+    Register the create_engine plugin, so engines can be created with
+    ``plugins=[SQLA_POOL_METRICS_PLUGIN]``
+
+    """
+    from sqlalchemy.dialects import plugins
+
+    plugins.register(SQLA_POOL_METRICS_PLUGIN, __name__, 'SqlaPoolMetricsPlugin')
@@ -0,0 +1,93 @@
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as SqlaTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from peek_platform.util.SqlaPoolMetrics import SqlaMeteredQueuePool, \
+    SqlaPoolMetrics, SQLA_POOL_METRICS_PLUGIN, registerSqlaPoolMetricsPlugin
+
+
+class SqlaPoolMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        registerSqlaPoolMetricsPlugin()
+        namesBefore = set(SqlaPoolMetrics.allMetrics())
+
+        self._engine = create_engine('sqlite:///:memory:', poolclass=QueuePool,
+                                     pool_size=1, max_overflow=1, pool_timeout=0.1,
+                                     plugins=[SQLA_POOL_METRICS_PLUGIN])
+
+        self._name, = set(SqlaPoolMetrics.allMetrics()) - namesBefore
+
+    def tearDown(self):
+        SqlaPoolMetrics.detach(self._name)
+        self._engine.dispose()
+
+    def _engineMetrics(self):
+        return SqlaPoolMetrics.allMetrics()[self._name]
+
+    def testCheckoutsAreRecorded(self):
+        for _ in range(3):
+            with self._engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+
+        metrics = self._engineMetrics()
+        self.assertEqual(metrics['checkouts'], 3)
+        self.assertEqual(metrics['checkedOut'], 0)
+        self.assertEqual(metrics['connects'], 1)
+        self.assertEqual(sum(metrics['holdHistogramMs'].values()), 3)
+        self.assertEqual(metrics['poolSize'], 1)
+
+    def testOverflowAndSaturation(self):
+        conn1 = self._engine.connect()
+        conn2 = self._engine.connect()
+
+        metrics = self._engineMetrics()
+        self.assertEqual(metrics['checkedOut'], 2)
+        self.assertEqual(metrics['checkedOutPeak'], 2)
+        self.assertEqual(metrics['overflowCheckouts'], 1)
+        self.assertEqual(metrics['saturatedCheckouts'], 1)
+
+        conn1.close()
+        conn2.close()
+        self.assertEqual(self._engineMetrics()['checkedOut'], 0)
+
+    def testCheckoutWaitsAndTimeouts(self):
+        self.assertIsInstance(self._engine.pool, SqlaMeteredQueuePool)
+
+        conn1 = self._engine.connect()
+        conn2 = self._engine.connect()
+
+        with self.assertRaises(SqlaTimeoutError):
+            self._engine.connect()
+
+        conn1.close()
+        conn2.close()
+
+        metrics = self._engineMetrics()
+        self.assertEqual(metrics['checkoutTimeouts'], 1)
+        self.assertEqual(sum(metrics['waitHistogramMs'].values()), 3)
+        self.assertGreaterEqual(metrics['waitMaxMs'], 100)
+        self.assertEqual(metrics['waitHistogramMs']['500'], 1)
+
+    def testMetricsFollowARecreatedPool(self):
+        with self._engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+
+        self._engine.dispose()
+
+        with self._engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+
+        metrics = self._engineMetrics()
+        self.assertEqual(metrics['checkouts'], 2)
+        self.assertEqual(metrics['connects'], 2)
+        self.assertEqual(sum(metrics['waitHistogramMs'].values()), 2)
+
+    def testDetachedMetricsAreForgotten(self):
+        SqlaPoolMetrics.detach(self._name)
+        self.assertNotIn(self._name, SqlaPoolMetrics.allMetrics())
+
+        with self._engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
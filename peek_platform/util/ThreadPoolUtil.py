@@ -0,0 +1,206 @@
+import logging
+import threading
+import time
+from typing import Dict
+
+from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+from twisted.python.threadpool import ThreadPool
+from vortex.DeferUtil import vortexLogFailure
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveThreadPool(ThreadPool):
+    """ Adaptive Thread Pool
+
+    This thread pool starts with a limit of `minSize` threads, and raises the limit
+    towards `maxSize` when work is queued and has to wait for a thread.
+
+    When the pool has had idle threads and no queued work for a while, the limit is
+    lowered again, and the idle threads are stopped.
+
+    The queue depth and the time work waits for a thread are exported with
+    `metrics()`, and logged periodically.
+
+    """
+
+    #: How often the pool size is reassessed, in seconds
+    ADJUST_INTERVAL = 1.0
+
+    #: Grow the pool if queued work has waited longer than this, in seconds
+    GROW_WAIT_SECONDS = 0.05
+
+    #: Shrink the pool after this many intervals with idle threads and no backlog
+    SHRINK_AFTER_IDLE_INTERVALS = 30
+
+    #: Log the metrics every this many intervals
+    LOG_METRICS_INTERVALS = 60
+
+    def __init__(self, minSize: int, maxSize: int,
+                 name: str = "PeekAdaptiveThreadPool"):
+        assert 0 < minSize <= maxSize, "Expected 0 < minSize <= maxSize"
+
+        ThreadPool.__init__(self, minSize, minSize, name=name)
+
+        self._minSize = minSize
+        self._maxSize = maxSize
+
+        self._waitLock = threading.Lock()
+        self._waitCount = 0
+        self._waitTotal = 0.0
+        self._waitMax = 0.0
+
+        self._idleIntervals = 0
+        self._intervalCount = 0
+        self._metrics = {}
+
+        self._adjustLoopingCall = None
+
+    def setLimits(self, minSize: int, maxSize: int) -> None:
+        """ Set Limits
+
+        Change the minimum and maximum number of threads the pool can adapt between.
+
+        """
+        assert 0 < minSize <= maxSize, "Expected 0 < minSize <= maxSize"
+        self._minSize = minSize
+        self._maxSize = maxSize
+
+        limit = min(maxSize, max(minSize, self.max))
+        self.adjustPoolsize(minthreads=minSize, maxthreads=limit)
+
+    def start(self) -> None:
+        ThreadPool.start(self)
+
+        self._adjustLoopingCall = LoopingCall(self._adjust)
+        d = self._adjustLoopingCall.start(self.ADJUST_INTERVAL, now=False)
+        d.addErrback(vortexLogFailure, logger, consumeError=True)
+
+    def stop(self) -> None:
+        if self._adjustLoopingCall and self._adjustLoopingCall.running:
+            self._adjustLoopingCall.stop()
+        self._adjustLoopingCall = None
+
+        ThreadPool.stop(self)
+
+    def callInThreadWithCallback(self, onResult, func, *args, **kw):
+        queuedTime = time.monotonic()
+
+        def timedFunc(*args_, **kw_):
+            self._recordWait(time.monotonic() - queuedTime)
+            return func(*args_, **kw_)
+
+        ThreadPool.callInThreadWithCallback(self, onResult, timedFunc, *args, **kw)
+
+    def _recordWait(self, waitSeconds: float) -> None:
+        with self._waitLock:
+            self._waitCount += 1
+            self._waitTotal += waitSeconds
+            self._waitMax = max(self._waitMax, waitSeconds)
+
+    def metrics(self) -> Dict[str, float]:
+        """ Metrics
+
+        :return: The pool metrics for the last interval, these are
+            limit, workers, busy, idle, queueDepth, tasks, waitAvgMs and waitMaxMs
+
+        """
+        return dict(self._metrics)
+
+    def _adjust(self) -> None:
+        stats = self._team.statistics()
+
+        with self._waitLock:
+            waitCount, waitTotal, waitMax = \
+                self._waitCount, self._waitTotal, self._waitMax
+            self._waitCount, self._waitTotal, self._waitMax = 0, 0.0, 0.0
+
+        self._metrics = dict(
+            limit=self.max,
+            workers=stats.busyWorkerCount + stats.idleWorkerCount,
+            busy=stats.busyWorkerCount,
+            idle=stats.idleWorkerCount,
+            queueDepth=stats.backloggedWorkCount,
+            tasks=waitCount,
+            waitAvgMs=(waitTotal / waitCount * 1000) if waitCount else 0.0,
+            waitMaxMs=waitMax * 1000
+        )
+
+        self._intervalCount += 1
+        if not self._intervalCount % self.LOG_METRICS_INTERVALS:
+            logger.debug("%s metrics %s", self.name, self._metrics)
+
+        backlog = stats.backloggedWorkCount
+
+        if backlog and (waitMax >= self.GROW_WAIT_SECONDS
+                        or not stats.idleWorkerCount):
+            self._idleIntervals = 0
+            if self.max >= self._maxSize:
+                return
+
+            newLimit = min(self._maxSize, self.max + max(self.max // 2, backlog))
+            logger.debug("%s growing from %s to %s threads, %s queued",
+                         self.name, self.max, newLimit, backlog)
+            self.adjustPoolsize(maxthreads=newLimit)
+
+            # The team only creates threads when work is added, so start the
+            # threads for the work that is already queued.
+            self._team.grow(min(backlog, newLimit - self.workers))
+            return
+
+        if backlog or not stats.idleWorkerCount or self.max <= self._minSize:
+            self._idleIntervals = 0
+            return
+
+        self._idleIntervals += 1
+        if self._idleIntervals < self.SHRINK_AFTER_IDLE_INTERVALS:
+            return
+
+        self._idleIntervals = 0
+        newLimit = max(self._minSize,
+                       stats.busyWorkerCount + (stats.idleWorkerCount + 1) // 2)
+        if newLimit < self.max:
+            logger.debug("%s shrinking from %s to %s threads",
+                         self.name, self.max, newLimit)
+            self.adjustPoolsize(maxthreads=newLimit)
+
+
+def setupTwistedThreadPool(platformConfig) -> None:
+    """ Setup Twisted Thread Pool
+
+    Size the reactors thread pool from the config, installing an
+    `AdaptiveThreadPool` if twistedThreadPoolAdaptive is enabled.
+
+    This is called when the plugin loader is created, before the plugins are loaded,
+    calling it again applies the current config to the pool.
+
+    :param platformConfig: The services config, a PeekFileConfigPlatformMixin
+
+    """
+    if isinstance(reactor.threadpool, AdaptiveThreadPool):
+        reactor.threadpool.setLimits(platformConfig.twistedThreadPoolMinSize,
+                                     platformConfig.twistedThreadPoolSize)
+        return
+
+    if not platformConfig.twistedThreadPoolAdaptive:
+        reactor.suggestThreadPoolSize(platformConfig.twistedThreadPoolSize)
+        return
+
+    pool = AdaptiveThreadPool(platformConfig.twistedThreadPoolMinSize,
+                              platformConfig.twistedThreadPoolSize)
+
+    # Replace the reactors default pool, the same way the reactor creates it.
+    if reactor.threadpool is not None:
+        reactor.removeSystemEventTrigger(reactor.threadpoolShutdownID)
+        if reactor.threadpool.started:
+            reactor.threadpool.stop()
+
+    reactor.threadpool = pool
+    reactor.threadpoolShutdownID = reactor.addSystemEventTrigger(
+        'during', 'shutdown', reactor._stopThreadPool)
+    reactor.callWhenRunning(pool.start)
+
+    logger.info("Using an adaptive thread pool, between %s and %s threads",
+                platformConfig.twistedThreadPoolMinSize,
+                platformConfig.twistedThreadPoolSize)
@@ -0,0 +1,75 @@
+import threading
+import time
+import unittest
+
+from twisted.python.threadpool import ThreadPool
+
+from peek_platform.util.ThreadPoolUtil import AdaptiveThreadPool
+
+
+class AdaptiveThreadPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self._pool = AdaptiveThreadPool(1, 4, name="AdaptiveThreadPoolTest")
+        self._release = threading.Event()
+
+        # Start the threads without the reactor, _adjust is called by the tests
+        ThreadPool.start(self._pool)
+
+    def tearDown(self):
+        self._release.set()
+        ThreadPool.stop(self._pool)
+
+    def _queueBlockedWork(self, count: int) -> None:
+        for _ in range(count):
+            self._pool.callInThread(self._release.wait, 5)
+
+    def _waitFor(self, check) -> None:
+        deadline = time.monotonic() + 5
+        while not check():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def testGrowsWhenWorkIsQueued(self):
+        self._queueBlockedWork(4)
+        self._waitFor(lambda: self._pool._team.statistics().busyWorkerCount == 1)
+        self.assertEqual(self._pool.max, 1)
+
+        self._pool._adjust()
+
+        self.assertEqual(self._pool.max, 4)
+        self._waitFor(lambda: self._pool._team.statistics().busyWorkerCount == 4)
+
+        metrics = self._pool.metrics()
+        self.assertEqual(metrics['queueDepth'], 3)
+        self.assertEqual(metrics['limit'], 1)
+
+    def testNeverGrowsPastMaxSize(self):
+        self._queueBlockedWork(10)
+        self._waitFor(lambda: self._pool._team.statistics().busyWorkerCount == 1)
+
+        self._pool._adjust()
+        self._pool._adjust()
+
+        self.assertEqual(self._pool.max, 4)
+
+    def testShrinksAfterIdleIntervals(self):
+        self._pool.adjustPoolsize(maxthreads=4)
+        self._pool._team.grow(4)
+        self._waitFor(lambda: self._pool._team.statistics().idleWorkerCount == 4)
+
+        for _ in range(AdaptiveThreadPool.SHRINK_AFTER_IDLE_INTERVALS - 1):
+            self._pool._adjust()
+        self.assertEqual(self._pool.max, 4)
+
+        self._pool._adjust()
+        self.assertLess(self._pool.max, 4)
+        self.assertGreaterEqual(self._pool.max, 1)
+
+    def testSetLimits(self):
+        self._pool.setLimits(2, 3)
+        self.assertEqual(self._pool.min, 2)
+        self.assertEqual(self._pool.max, 2)
+
+        with self.assertRaises(AssertionError):
+            self._pool.setLimits(3, 2)
@@ -115,6 +115,7 @@ dev_requirements = [
     "coverage >= 4.2",
     "mock >= 2.0.0",
     "selenium >= 2.53.6",
+    "pytest-benchmark",
 ]
 
 requirements.extend(dev_requirements)